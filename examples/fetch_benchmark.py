@@ -0,0 +1,70 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare fetching chart images one at a time with urllib to fetching them
+with fetch.FetchImages, from a local stub server with some latency.
+
+Usage: fetch_benchmark.py [charts] [latency in seconds]
+"""
+
+import sys
+import time
+import urllib
+
+from graphy.backends import google_chart_api
+from graphy.backends.google_chart_api import fetch
+from graphy.backends.google_chart_api import stub_server
+
+
+def main(argv):
+  count = 50
+  latency = 0.02
+  if len(argv) > 1:
+    count = int(argv[1])
+  if len(argv) > 2:
+    latency = float(argv[2])
+  server = stub_server.StubChartServer(delay=latency)
+  server.Start()
+  try:
+    charts = []
+    for i in xrange(count):
+      chart = google_chart_api.Sparkline([i, i * 2 % 7, i * 3 % 11, 5])
+      chart.display.url_base = server.url_base
+      # FetchImages only fetches each distinct URL once, so make sure they
+      # all are.
+      chart.display.extra_params['chtt'] = 'Chart %d' % i
+      charts.append(chart)
+    sizes = [(100, 20)]
+
+    start = time.time()
+    for chart in charts:
+      urllib.urlopen(chart.display.Url(*sizes[0])).read()
+    serial = time.time() - start
+    print 'urllib, one at a time:  %6.1f charts/sec' % (count / serial)
+
+    for concurrency in (1, 4, 16):
+      server.connections = 0
+      start = time.time()
+      fetch.FetchImages(charts, sizes, concurrency=concurrency)
+      elapsed = time.time() - start
+      print 'FetchImages, %2d at once: %6.1f charts/sec (%d connections)' % (
+          concurrency, count / elapsed, server.connections)
+  finally:
+    server.Stop()
+
+
+if __name__ == '__main__':
+  main(sys.argv)
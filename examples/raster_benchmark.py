@@ -0,0 +1,84 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure how many 400x200 PNG charts per second the raster backend draws.
+
+Usage: raster_benchmark.py [seconds per chart]
+"""
+
+import math
+import sys
+import time
+
+from graphy.backends import raster
+
+WIDTH = 400
+HEIGHT = 200
+
+
+def LineChart():
+  chart = raster.LineChart()
+  chart.AddLine([100.0 * math.sin(math.radians(i)) for i in xrange(0, 720, 3)])
+  chart.AddLine([80.0 * math.cos(math.radians(i)) for i in xrange(0, 720, 3)])
+  chart.left.grid_spacing = 50
+  return chart
+
+
+def Sparkline():
+  return raster.Sparkline([math.sin(i / 5.0) for i in xrange(100)])
+
+
+def BarChart():
+  chart = raster.BarChart([3, 5, -2, 8, 6, 1, 4, 7])
+  chart.AddBars([2, 4, 3, 5, 1, 6, 2, 3])
+  return chart
+
+
+def PieChart():
+  chart = raster.PieChart([10, 20, 30, 25, 15])
+  chart.AddPie([40, 60])
+  return chart
+
+
+def ChartsPerSecond(chart, seconds):
+  """Draw the chart as a PNG over & over for a while, and return the rate."""
+  count = 0
+  start = time.time()
+  while True:
+    chart.display.Png(WIDTH, HEIGHT)
+    count += 1
+    elapsed = time.time() - start
+    if elapsed >= seconds:
+      return count / elapsed
+
+
+def main(argv):
+  seconds = 1.0
+  if len(argv) > 1:
+    seconds = float(argv[1])
+  print '%-10s %12s %12s' % ('', 'antialiased', 'aliased')
+  for factory in (LineChart, Sparkline, BarChart, PieChart):
+    chart = factory()
+    rates = []
+    for antialias in (True, False):
+      chart.display.antialias = antialias
+      rates.append(ChartsPerSecond(chart, seconds))
+    print '%-10s %12.1f %12.1f' % ((factory.__name__,) + tuple(rates))
+  print '(charts per second, at %dx%d)' % (WIDTH, HEIGHT)
+
+
+if __name__ == '__main__':
+  main(sys.argv)
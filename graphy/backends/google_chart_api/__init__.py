@@ -48,3 +48,58 @@ LineChart = _GetChartFactory(line_chart.LineChart, encoders.LineChartEncoder)
 Sparkline = _GetChartFactory(line_chart.Sparkline, encoders.SparklineEncoder)
 BarChart  = _GetChartFactory(bar_chart.BarChart, encoders.BarChartEncoder)
 PieChart  = _GetChartFactory(pie_chart.PieChart, encoders.PieChartEncoder)
+
+
+def _RenderChunk(args):
+  """Render a chunk of charts for RenderMany.
+
+  Module-level so that process pools can pickle it.
+  """
+  charts, sizes, use_html_entities, tags = args
+  if tags:
+    return [chart.display.Imgs(sizes) for chart in charts]
+  return [chart.display.Urls(sizes, use_html_entities) for chart in charts]
+
+
+def RenderMany(charts, sizes, use_html_entities=False, tags=False,
+               executor=None, chunk_size=16):
+  """Render a batch of charts (like the charts on a dashboard page).
+
+  Charts which render the same (same fingerprint, including their display
+  settings) are only rendered once, and each chart is formatted once for all
+  the sizes (see BaseChartEncoder.Urls).
+
+  Args:
+    charts: List of charts with displays from this backend.
+    sizes: List of (width, height) pairs to render every chart at.
+    use_html_entities: As for BaseChartEncoder.Url.  Ignored if tags is True.
+    tags: If True, return <img> tags instead of URLs.
+    executor: Optional executor (like a concurrent.futures.ProcessPoolExecutor
+              or a multiprocessing.Pool) whose map method is used to render
+              the charts in parallel.  With a process pool the charts are
+              pickled, so their formatters must be picklable.
+    chunk_size: Number of charts to send to the executor at a time.
+  Returns:
+    A list with, for each chart (in the same order), the list of its URLs (or
+    tags), one per size.
+  """
+  unique = {}  # Fingerprint -> index into distinct.
+  distinct = []
+  indexes = []
+  for chart in charts:
+    fingerprint = chart.display.Fingerprint()
+    if fingerprint not in unique:
+      unique[fingerprint] = len(distinct)
+      distinct.append(chart)
+    indexes.append(unique[fingerprint])
+
+  chunks = [(distinct[i:i + chunk_size], sizes, use_html_entities, tags)
+            for i in xrange(0, len(distinct), chunk_size)]
+  if executor is None:
+    results = map(_RenderChunk, chunks)
+  else:
+    results = executor.map(_RenderChunk, chunks)
+  rendered = []
+  for result in results:
+    rendered.extend(result)
+  return [list(rendered[i]) for i in indexes]
@@ -61,6 +61,16 @@ class BarChartTest(base_encoder_test.XYChartTest):
     self.chart.bottom.max = 6
     self.assertEqual(self.Param('chd'), 's:f')  # f is right in the middle.
 
+  def testHorizontalDownsamplingUsesHeight(self):
+    self.AddToChart(self.chart, range(100))
+    self.chart.display.downsampling = 'mean'
+    self.chart.display.points_per_pixel = 1
+    self.chart.display._width = 10
+    self.chart.display._height = 20
+    self.assertEqual(10, len(self.Param('chd')) - 2)
+    self.chart.vertical = False
+    self.assertEqual(20, len(self.Param('chd')) - 2)
+
   def testZeroPoint(self):
     self.AddToChart(self.chart, [-5, 0, 5])
     self.assertEqual(self.Param('chp'), str(.5))    # Auto scaling.
@@ -91,7 +101,7 @@ class BarChartTest(base_encoder_test.XYChartTest):
     self.chart.auto_scale.buffer = 0  # Buffer causes trouble for testing.
     self.AddToChart(self.chart, [1, 5])
     self.chart.left.labels = (1, 5)
-    self.chart.left.labels_positions = (1, 5)
+    self.chart.left.label_positions = (1, 5)
     self.assertEqual(self.Param('chxr'), '0,1,5')
 
   def testCanOverrideChbh(self):
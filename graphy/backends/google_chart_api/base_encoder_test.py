@@ -17,9 +17,15 @@
 """Test for the base encoder.  Also serves as a base class for the
 chart-type-specific tests."""
 
+import pickle
+import threading
+from multiprocessing import pool as multiprocessing_pool
+
 from graphy import common
 from graphy import graphy_test
 from graphy import formatters
+from graphy import util as graphy_util
+from graphy.backends import google_chart_api
 from graphy.backends.google_chart_api import encoders
 from graphy.backends.google_chart_api import util
 
@@ -89,6 +95,10 @@ class BaseChartTest(graphy_test.GraphyTest):
     self.chart.display.extra_params['test'] = 32
     self.assertEqual(self.Param('test'),  '32')
 
+  def testExtraParamsAreNotRounded(self):
+    self.chart.display.extra_params['chls'] = 1234567.891
+    self.assertEqual(self.Param('chls'), '1234567.891')
+
   def testExtraParamsOverideDefaults(self):
     self.assertNotEqual(self.Param('cht'), 'test')  # Sanity check.
     self.chart.display.extra_params['cht'] = 'test'
@@ -142,12 +152,27 @@ class BaseChartTest(graphy_test.GraphyTest):
     self.chart.display.enhanced_encoding = True
     self.assertEqual(self.Param('chd'), 'e:')
 
+  def testEncodingSetting(self):
+    self.chart.display.enhanced_encoding = True
+    self.chart.display.encoding = 'simple'
+    self.assertEqual(self.Param('chd'), 's:')
+    self.chart.display.encoding = 'text'
+    self.assertEqual(self.Param('chd'), 't:')
+
   def testUrlsEscaped(self):
     self.AddToChart(self.chart, [1, 2, 3])
     url = self.chart.display.Url(500, 100)
     self.assertNotIn('chd=s:', url)
     self.assertIn('chd=s%3A', url)
 
+  def testCanonicalUrl(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.display.canonical_url = True
+    url = self.chart.display.Url(500, 100)
+    self.assertIn('chd=s:', url)
+    params = url.split('?')[1].split('&')
+    self.assertEqual(sorted(params), params)
+
   def testUrls_DefaultIsWithoutHtmlEntities(self):
     self.AddToChart(self.chart, [1, 2, 3])
     self.AddToChart(self.chart, [1, 2, 3], label='Ciao&"Mario>Luigi"')
@@ -180,6 +205,185 @@ class BaseChartTest(graphy_test.GraphyTest):
     self.assertNotIn('&amp;ch', url)
     self.assertIn('%7CCiao%26%22Mario%3ELuigi%22', url)
 
+  def testUrlCache(self):
+    cache = graphy_util.LRUCache(10)
+    self.chart.display.url_cache = cache
+    self.AddToChart(self.chart, [1, 2, 3])
+    url = self.chart.display.Url(100, 50)
+    self.assertEqual(url, self.chart.display.Url(100, 50))
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(1, cache.misses)
+    self.chart.display.Url(50, 100)
+    self.chart.display.Img(100, 50)
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(3, cache.misses)
+
+  def testUrlCacheInvalidation(self):
+    self.chart.display.url_cache = graphy_util.LRUCache(10)
+    self.AddToChart(self.chart, [1, 2, 3])
+    def ChangeExtraParams():
+      self.chart.display.extra_params['chtt'] = 'title'
+    def ChangeUrlBase():
+      self.chart.display.url_base = 'http://example.com/chart'
+    def ChangeEscaping():
+      self.chart.display.escape_url = False
+    def ChangeEncoding():
+      self.chart.display.enhanced_encoding = True
+    def ChangeData():
+      self.AddToChart(self.chart, [7, 8])
+    for change in (ChangeExtraParams, ChangeUrlBase, ChangeEscaping,
+                   ChangeEncoding, ChangeData):
+      before = self.chart.display.Url(100, 50)
+      change()
+      self.assertNotEqual(before, self.chart.display.Url(100, 50))
+
+  def testUrlsMatchUrl(self):
+    self.AddToChart(self.chart, [1, 2, 3, 4, 5, 6, 7, 8])
+    sizes = [(100, 50), (400, 300), (3, 2000)]
+    display = self.chart.display
+    for setting, value in (('encoding', 'auto'), ('encoding', 'text'),
+                           ('downsampling', 'minmax'),
+                           ('extra_params', {'chs': '1x1'})):
+      setattr(display, setting, value)
+      self.assertEqual([display.Url(w, h) for w, h in sizes],
+                       display.Urls(sizes))
+    self.assertEqual([display.Img(100, 50).split('"')[1]],
+                     display.Urls([(100, 50)], use_html_entities=True))
+
+  def testUrlsFormatChartOnce(self):
+    calls = []
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.AddFormatter(calls.append)
+    self.chart.display.Urls([(100, 50), (200, 100), (300, 150)])
+    self.assertEqual(1, len(calls))
+
+  def testUrlsUseCache(self):
+    cache = graphy_util.LRUCache(10)
+    self.chart.display.url_cache = cache
+    self.AddToChart(self.chart, [1, 2, 3])
+    url = self.chart.display.Url(100, 50)
+    self.assertEqual(url, self.chart.display.Urls([(200, 100), (100, 50)])[1])
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(self.chart.display.Url(200, 100),
+                     self.chart.display.Urls([(200, 100)])[0])
+    self.assertEqual(3, cache.hits)
+
+  def testRenderingDoesNotModifyEncoder(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.left.labels = ['a', 'b']
+    self.chart.left.label_gridlines = True
+    state = dict(self.chart.display.__dict__)
+    self.chart.display.Urls([(100, 50), (200, 100)])
+    self.chart.display.Img(300, 150)
+    self.assertEqual(state, self.chart.display.__dict__)
+
+  def testSharedEncoder(self):
+    charts = [self.GetChart(), self.GetChart()]
+    self.AddToChart(charts[0], [1, 2, 3])
+    self.AddToChart(charts[1], [4, 1])
+    encoder = charts[0].display.__class__()
+    encoder.encoding = 'auto'
+    for chart in charts:
+      chart.display.encoding = 'auto'
+      self.assertEqual(chart.display.Url(100, 50),
+                       encoder.Url(100, 50, chart=chart))
+      self.assertEqual(chart.display.Img(100, 50),
+                       encoder.Img(100, 50, chart=chart))
+      self.assertEqual(chart.display.Fingerprint(),
+                       encoder.Fingerprint(chart))
+
+  def testConcurrentRendering(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.left.labels = ['a', 'b']
+    self.chart.left.label_gridlines = True
+    sizes = [(100 + i, 50 + 2 * i) for i in range(8)]
+    expected = [self.chart.display.Url(w, h) for w, h in sizes]
+    results = [[] for _ in sizes]
+    def Render(i):
+      for _ in range(20):
+        results[i].append(self.chart.display.Url(*sizes[i]))
+    threads = [threading.Thread(target=Render, args=(i,))
+               for i in range(len(sizes))]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    for url, urls in zip(expected, results):
+      self.assertEqual([url] * 20, urls)
+
+  def testFragmentCache(self):
+    cache = graphy_util.LRUCache(100)
+    display = self.chart.display
+    def CheckUrls():
+      for size in ((100, 50), (300, 200)):
+        display.fragment_cache = None
+        expected = display.Url(*size)
+        display.fragment_cache = cache
+        self.assertEqual(expected, display.Url(*size))
+    first = self.AddToChart(self.chart, [1, 2, 3], label='a')
+    second = self.AddToChart(self.chart, [4, 5, 6])
+    CheckUrls()
+    first.data = [7, 8, 9]
+    CheckUrls()
+    second.label = 'b'
+    CheckUrls()
+    second.style.color = '123456'
+    CheckUrls()
+    self.chart.left.labels = ['x', 'y']
+    CheckUrls()
+    self.chart.left.min = -10
+    self.chart.left.max = 10
+    CheckUrls()
+    first.data = [-1, 0, 1]
+    CheckUrls()
+    display.extra_params['chtt'] = 'title'
+    CheckUrls()
+    display.enhanced_encoding = True
+    CheckUrls()
+    self.AddToChart(self.chart, [1])
+    CheckUrls()
+
+  def testFragmentCacheSeesEmptiedSeries(self):
+    display = self.chart.display
+    display.escape_url = False
+    display.fragment_cache = graphy_util.LRUCache(100)
+    first = self.AddToChart(self.chart, [1, 2, 3], color='0000ff')
+    self.AddToChart(self.chart, [4, 5, 6], color='ff0000')
+    self.assertIn('chco=0000ff,ff0000', display.Url(100, 50))
+    first.data = []
+    url = display.Url(100, 50)
+    self.assertIn('chco=ff0000&', url)
+    display.fragment_cache = None
+    self.assertEqual(display.Url(100, 50), url)
+
+  def testCachesSeeMarkerChanges(self):
+    series = self.AddToChart(self.chart, [1, 2, 3])
+    display = self.chart.display
+    display.escape_url = False
+    for setting in ('url_cache', 'fragment_cache'):
+      marker = common.Marker(common.Marker.x, '0000ff', 5)
+      series.markers = []
+      setattr(display, setting, graphy_util.LRUCache(100))
+      self.assertNotIn('chm=', display.Url(100, 50))
+      series.markers.append((1, marker))
+      self.assertIn('chm=x,0000ff,0,1,5', display.Url(100, 50))
+      marker.color = 'ff0000'
+      self.assertIn('chm=x,ff0000,0,1,5', display.Url(100, 50))
+      setattr(display, setting, None)
+
+  def testFragmentCacheOnlyRebuildsWhatChanged(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    cache = graphy_util.LRUCache(100)
+    self.chart.display.fragment_cache = cache
+    self.chart.display.Url(100, 50)
+    misses = cache.misses
+    self.chart.display.Url(200, 100)
+    # Only the size & the axes (whose tick marks depend on the size).
+    self.assertEqual(misses + 2, cache.misses)
+    self.chart.AddFormatter(lambda chart: None)
+    self.chart.display.Url(200, 100)
+    self.assertEqual(misses + 2, cache.misses)  # Not used.
+
   def testCanRemoveDefaultFormatters(self):
     self.assertEqual(3, len(self.chart.formatters))
     # I don't know why you'd want to remove the default formatters like this.
@@ -290,6 +494,88 @@ class XYChartTest(BaseChartTest):
     self.assertEqual(self.Param('chd'), 's:A,9')
     self.assertEqual(self.Param('chco'), '111111,222222')
 
+  def AssertTemplateMatches(self, template, data):
+    """Check that template renders data like the chart does."""
+    for series, points in zip(self.chart.data, data):
+      series.data = points
+    for width, height in ((100, 50), (300, 200)):
+      self.assertEqual(self.chart.display.Url(width, height),
+                       template.Render(data, width, height))
+
+  def testTemplate(self):
+    self.AddToChart(self.chart, [1, 2, 3], label='a')
+    self.AddToChart(self.chart, [4, 5, 6], color='00ff00')
+    self.chart.left.labels = ['lo', 'hi']
+    self.chart.bottom.grid_spacing = 1
+    self.chart.bottom.min, self.chart.bottom.max = 0, 2
+    self.chart.display.extra_params['chtt'] = 'A & B'
+    self.chart.display.canonical_url = True
+    template = self.chart.display.Compile()
+    for data in ([[3, 2, 1], [9, -5, 0]], [[100, 200, 300], [None, 1, 2]],
+                 [[], [1, 2]], [[1, 2, 3], [4, 5, 6]]):
+      self.AssertTemplateMatches(template, data)
+    self.chart.display.encoding = 'auto'
+    self.chart.display.downsampling = 'mean'
+    self.AssertTemplateMatches(self.chart.display.Compile(),
+                               [range(500), range(0, 1000, 2)])
+
+  def testTemplateIsFrozen(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    template = self.chart.display.Compile()
+    url = template.Render([[3, 4]], 100, 50)
+    self.chart.display.extra_params['chtt'] = 'title'
+    self.chart.data[0].style.color = '123456'
+    self.chart.left.labels = ['x']
+    self.assertEqual(url, template.Render([[3, 4]], 100, 50))
+    self.assertRaises(ValueError, template.Render, [[3, 4], [5]], 100, 50)
+
+  def testTemplateWithCustomFormatter(self):
+    def LabelWithMax(chart):
+      for series in chart.data:
+        series.label = str(max(series.data))
+    self.chart.formatters.insert(0, LabelWithMax)  # Before AutoLegend.
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.display.canonical_url = True
+    template = self.chart.display.Compile()
+    self.AssertTemplateMatches(template, [[7, 8]])
+    self.assertIn('chdl=8', template.Render([[7, 8]], 10, 10))
+
+  def testAutoEncoding(self):
+    self.chart.display.encoding = 'auto'
+    self.chart.GetDependentAxis().min = 0
+    self.chart.GetDependentAxis().max = 100
+    self.AddToChart(self.chart, [1, 2, 3, 4])
+    self.chart.display._width = self.chart.display._height = 100
+    self.assertEqual('s:BBCC', self.Param('chd'))
+    # Simple encoding is too coarse for 300 pixels.
+    self.chart.display._width = self.chart.display._height = 300
+    self.assertEqual('e:ApBSB7Ck', self.Param('chd'))
+    # Unescaped, the text encoding is shorter.
+    self.chart.display.escape_url = False
+    self.assertEqual('t:1,2,3,4', self.Param('chd'))
+
+  def testUrlsResizeGridlines(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.left.labels = ['a', 'b']
+    self.chart.left.label_gridlines = True
+    sizes = [(100, 50), (30, 400)]
+    urls = self.chart.display.Urls(sizes)
+    self.assertEqual([self.chart.display.Url(w, h) for w, h in sizes], urls)
+    self.assertNotEqual(urls[0].replace('100x50', '30x400'), urls[1])
+
+  def testAxisRangePrecision(self):
+    self.AddToChart(self.chart, [-9.5, 10.1])
+    self.chart.left.labels = ['low', 'high']
+    self.chart.display.significant_digits = 4
+    # AutoScale's buffer makes these -10.48 & 11.08; the chart is 100 pixels
+    # high, so a tenth is plenty.
+    self.chart.display._height = 100
+    self.assertEqual('0,-10.5,11.1', self.Param('chxr'))
+    self.chart.display._height = 0
+    self.assertEqual('0,-10.48,11.08', self.Param('chxr'))
+    self.chart.left.label_positions = [1 / 3.0, 2]
+    self.assertEqual('0,0.3333,2', self.Param('chxp'))
+
   def testDataSeriesCorrectlyConverted(self):
     # To avoid problems caused by floating-point errors, the input in this test
     # is carefully chosen to avoid 0.5 boundries (1.5, 2.5, 3.5, ...).
@@ -574,5 +860,74 @@ class XYChartTest(BaseChartTest):
     CheckExpectations() # Make sure adjustment hasn't changed anything
 
 
+class RenderManyTest(graphy_test.GraphyTest):
+
+  def setUp(self):
+    self.charts = [google_chart_api.LineChart([1, 2, 3]),
+                   google_chart_api.BarChart([4, 5]),
+                   google_chart_api.PieChart([1, 2], ['a', 'b']),
+                   google_chart_api.LineChart([1, 2, 3]),
+                   google_chart_api.LineChart([1, 2, 4])]
+    self.charts[0].left.labels = self.charts[3].left.labels = ['x', 'y']
+    self.sizes = [(100, 50), (300, 200)]
+
+  def Expected(self, render):
+    return [[render(chart.display, w, h) for w, h in self.sizes]
+            for chart in self.charts]
+
+  def testUrls(self):
+    self.assertEqual(self.Expected(encoders.BaseChartEncoder.Url),
+                     google_chart_api.RenderMany(self.charts, self.sizes,
+                                                 chunk_size=2))
+
+  def testTags(self):
+    self.assertEqual(self.Expected(encoders.BaseChartEncoder.Img),
+                     google_chart_api.RenderMany(self.charts, self.sizes,
+                                                 tags=True))
+
+  def testDuplicatesRenderedOnce(self):
+    calls = []
+    for chart in self.charts:
+      chart.AddFormatter(calls.append)
+    google_chart_api.RenderMany(self.charts, self.sizes)
+    self.assertEqual(4, len(calls))
+    self.charts[3].display.enhanced_encoding = True
+    del calls[:]
+    google_chart_api.RenderMany(self.charts, self.sizes)
+    self.assertEqual(5, len(calls))
+
+  def testClosureFormattersNotMerged(self):
+    def Colorer(color):
+      def Color(chart):
+        for series in chart.data:
+          series.style.color = color
+      return Color
+    a = google_chart_api.LineChart([1, 2, 3])
+    b = google_chart_api.LineChart([1, 2, 3])
+    a.AddFormatter(Colorer('ff0000'))
+    b.AddFormatter(Colorer('00ff00'))
+    (a_url,), (b_url,) = google_chart_api.RenderMany([a, b], [(100, 50)])
+    self.assertIn('chco=ff0000', a_url)
+    self.assertIn('chco=00ff00', b_url)
+
+  def testExecutor(self):
+    expected = google_chart_api.RenderMany(self.charts, self.sizes)
+    pool = multiprocessing_pool.ThreadPool(2)
+    try:
+      self.assertEqual(expected, google_chart_api.RenderMany(
+          self.charts, self.sizes, executor=pool, chunk_size=1))
+    finally:
+      pool.close()
+      pool.join()
+
+  def testChartsCanBePickled(self):
+    for chart in self.charts:
+      chart.display.url_cache = graphy_util.LRUCache(10)
+      copy = pickle.loads(pickle.dumps(chart, 2))
+      self.assertEqual(chart.display.Url(100, 50), copy.display.Url(100, 50))
+      self.assertTrue(copy.display.chart is copy)
+      self.assertEqual(None, copy.display.url_cache)
+
+
 if __name__ == '__main__':
   graphy_test.main()
@@ -18,10 +18,24 @@
 
 Not intended for end users, use the methods in __init__ instead."""
 
+import base64
+import copy
+import hashlib
+import math
+import urllib
 import warnings
+from graphy import common
+from graphy import downsample
+from graphy import formatters as chart_formatters
+from graphy import util as graphy_util
 from graphy.backends.google_chart_api import util
 
 
+# The size of the image being rendered.  It's shared with the chart formatters
+# & the other backends, so it lives in common.
+RenderContext = common.RenderContext
+
+
 class BaseChartEncoder(object):
 
   """Base class for encoders which turn chart objects into Google Chart URLS.
@@ -32,43 +46,408 @@ class BaseChartEncoder(object):
                   For example, 'cht':'lti' becomes ?cht=lti in the URL.
     url_base: The prefix to use for URLs.  If you want to point to a different
               server for some reason, you would override this.
-    formatters: TODO: Need to explain how these work, and how they are
-                different from chart formatters.
+    formatters: List of callables which each take the formatted chart and
+                return a dict of URL params.  (Unlike chart formatters, they
+                don't modify the chart.)  The size of the image being rendered
+                is in chart.render_context (see RenderContext).
     enhanced_encoding: If True, uses enhanced encoding.  If
-                       False, simple encoding is used.
+                       False, simple encoding is used.  Ignored if encoding
+                       is set.
+    encoding: One of 'simple', 'enhanced', 'text' or 'auto'.  'auto' picks
+              whichever encoding gives the shortest URL while keeping the
+              rounding error under a pixel for the chart's size.  (So short
+              charts use simple encoding, and taller ones enhanced.)  Text
+              encoding always uses as few decimals as that allows.  Default is
+              None (use enhanced_encoding).
     escape_url: If True, URL will be properly escaped.  If False, characters
                 like | and , will be unescapped (which makes the URL easier to
                 read).
+    canonical_url: If True, the URL params are always in the same (sorted)
+                   order, and only the characters which need it are escaped,
+                   so identical charts always give byte-identical URLs.
+                   Default is False.
+    downsampling: If set, series with more points than the chart has room for
+                  are reduced before encoding.  One of the algorithm names in
+                  graphy.downsample.ALGORITHMS ('lttb', 'minmax', 'mean'), or
+                  a callable taking (points, threshold).  Default is None (send
+                  every point).
+    points_per_pixel: How many points to keep per pixel when downsampling.
+    significant_digits: How many significant digits to keep in the numbers in
+                        the URL (axis ranges & positions, markers, the zero
+                        point...).  Axis ranges are also only kept as precise
+                        as the chart's resolution in pixels.  See
+                        util.FormatNumber.  Default is 6.
+    url_cache: If set to a graphy.util.LRUCache, the results of Url() (and
+               Img()) are cached there, keyed on the chart's version, the size
+               and the encoder settings, so changing the chart or the encoder
+               invalidates them.  Set it on one encoder, share one cache
+               between several encoders, or set BaseChartEncoder.url_cache to
+               cache for every encoder in the process.  Default is None (no
+               caching).
+    fragment_cache: If set to a graphy.util.LRUCache, the (escaped) params
+                    from each formatter are cached there, keyed on the parts
+                    of the chart the formatter reads (see _FORMATTER_READS).
+                    So when only some of the chart changes (like the labels
+                    of an axis), only the params which depend on that part
+                    are rebuilt, and if none of them depend on the points,
+                    the chart isn't even formatted.  Only used with the
+                    default chart formatters.  Can be shared like url_cache.
+                    Default is None.
+    inline_renderer: If set to a renderer from one of the local backends (for
+                     the type of chart, like svg.renderers.LineChartRenderer()
+                     or raster.renderers.LineChartRenderer()), Img() & Imgs()
+                     draw the chart with it, in-process, and inline the image
+                     in the tag as a data: URI (a PNG if the renderer can draw
+                     one, SVG otherwise).  So the browser doesn't have to
+                     fetch each chart.  Url() isn't affected.  Default is None.
+    inline_cache: If set to a graphy.util.LRUCache, the data: URIs are cached
+                  there, keyed on the fingerprints of the chart & renderer and
+                  the size.  So identical charts (even different chart
+                  objects) are only drawn & encoded once: use one for each
+                  page with many copies of a chart (like sparklines), or share
+                  one like url_cache.  Default is None.
   """
 
-  def __init__(self, chart):
+  url_cache = None
+  fragment_cache = None
+  inline_renderer = None
+  inline_cache = None
+
+  # The parts of the chart (see _ChartPartKeys) which the params from each
+  # formatter depend on, apart from the chart's own attributes & formatters,
+  # which they may all depend on.  Formatters which aren't listed aren't
+  # cached.
+  _FORMATTER_READS = {
+      '_GetLegendParams': ('labels',),
+      '_GetDataSeriesParams': ('data', 'axes'),
+      '_GetColors': ('styles', 'empty'),
+      '_GetAxisParams': ('axes',),
+      '_GetGridParams': ('axes',),
+      '_GetType': (),
+      '_GetExtraParams': (),
+      '_GetSizeParams': (),
+      '_GetLineStyles': ('styles', 'empty'),
+      '_ZeroPoint': ('axes',),
+      '_ApplyBarChartStyle': (),
+      '_GetAngleParams': (),
+  }
+
+  def __init__(self, chart=None):
     self.extra_params = {}  # You can add specific params here.
     self.url_base = 'http://chart.apis.google.com/chart'
     self.formatters = self._GetFormatters()
     self.chart = chart
     self.enhanced_encoding = False
+    self.encoding = None
     self.escape_url = True  # You can turn off URL escaping for debugging.
-    self._width = 0   # These are set when someone calls Url()
+    self.canonical_url = False
+    self.downsampling = None
+    self.points_per_pixel = 2
+    self.significant_digits = 6
+    # The size used by _Params when it isn't given a RenderContext.  Url()
+    # never sets these, so they are only for testing.
+    self._width = 0
     self._height = 0
+    self._cache_id = graphy_util.NextVersion()
 
-  def Url(self, width, height, use_html_entities=False):
+  def Url(self, width, height, use_html_entities=False, chart=None):
     """Get the URL for our graph.
 
+    Rendering doesn't modify the encoder, so it is safe to render from
+    several threads at once.  One encoder can also be shared by many charts
+    (of the type it is for), by passing them in as chart.
+
     Args:
       use_html_entities: If True, reserved HTML characters (&, <, >, ") in the
       URL are replaced with HTML entities (&amp;, &lt;, etc.). Default is False.
+      chart: The chart to render.  Defaults to self.chart.
+    """
+    return self.Urls([(width, height)], use_html_entities, chart)[0]
+
+  def Urls(self, sizes, use_html_entities=False, chart=None):
+    """Get the URLs for our graph at several sizes.
+
+    This is much cheaper than calling Url() for each size: the chart is only
+    formatted once, and only the params which depend on the size (see
+    _DependsOnSize) are recomputed for each one.  (Unless one of the chart's
+    formatters has a true uses_render_context attribute, like
+    formatters.LabelThinner, in which case the chart is formatted for each
+    size.)
+
+    Args:
+      sizes: List of (width, height) pairs.
+      use_html_entities: As for Url().
+      chart: As for Url().
+    Returns:
+      A list with the URL for each size, in the same order.
+    """
+    if chart is None:
+      chart = self.chart
+    cache = self.url_cache
+    urls = [None] * len(sizes)
+    keys = [None] * len(sizes)
+    for i, (width, height) in enumerate(sizes):
+      if cache is not None:
+        keys[i] = self._UrlCacheKey(chart, width, height, use_html_entities)
+        if keys[i] is not None:
+          urls[i] = cache.Get(keys[i])
+    missing = [i for i, url in enumerate(urls) if url is None]
+    if not missing:
+      return urls
+
+    part_keys = None
+    if self.fragment_cache is not None:
+      part_keys = self._ChartPartKeys(chart)
+    per_size = any(getattr(formatter, 'uses_render_context', False)
+                   for formatter in chart.formatters)
+    formatted = []  # The formatted chart, once some formatter needs it.
+    def Format(formatter, context):
+      if not formatted or (per_size and
+                           formatted[0].render_context is not context):
+        formatted[:] = [chart._GetFormattedView(context)]
+      formatted[0].render_context = context
+      return formatter(formatted[0])
+
+    shared = {}  # Index of formatter -> its size-independent fragment.
+    for i in missing:
+      context = RenderContext(*sizes[i])
+      results = []
+      escaped = {}
+      for j, formatter in enumerate(self.formatters):
+        fragment = shared.get(j)
+        if fragment is None:
+          fragment = self._GetFragment(formatter, context, part_keys, Format)
+          if not per_size and not self._DependsOnSize(formatter):
+            shared[j] = fragment
+        results.append(fragment[0])
+        escaped.update(fragment[1])
+      urls[i] = util.EncodeUrl(self.url_base, self._MergeParams(results),
+                               self.escape_url, use_html_entities,
+                               canonical=self.canonical_url, escaped=escaped)
+      if keys[i] is not None:
+        cache.Put(keys[i], urls[i])
+    return urls
+
+  def _GetFragment(self, formatter, context, part_keys, format):
+    """Return (params, escaped params) from formatter, using the
+    fragment_cache if possible.
+
+    Args:
+      formatter: One of self.formatters.
+      context: The RenderContext.
+      part_keys: Result of _ChartPartKeys, or None to not use the cache.
+      format: Function taking (formatter, context), which runs the formatter
+              on the formatted chart.
+    """
+    reads = None
+    if part_keys is not None and getattr(formatter, 'im_self', None) is self:
+      reads = self._FORMATTER_READS.get(formatter.__name__)
+    if reads is None:
+      return format(formatter, context), {}
+    size = None
+    if self._DependsOnSize(formatter):
+      size = (context.width, context.height)
+    key = (self._cache_id, formatter.__name__, part_keys['chart'],
+           tuple(part_keys[part] for part in reads), size)
+    cache = self.fragment_cache
+    fragment = cache.Get(key)
+    if fragment is None:
+      params = self._MergeParams([format(formatter, context)])
+      escaped = {}
+      if self.escape_url:
+        escaped = util.EscapeParams(params, self.canonical_url)
+      fragment = (params, escaped)
+      cache.Put(key, fragment)
+    return fragment
+
+  def _ChartPartKeys(self, chart):
+    """Return a dict with a key for each part of the chart which formatters
+    can read (see _FORMATTER_READS), which changes when that part changes.
+    Returns None if the chart's params can't be cached by parts, because it
+    has formatters which may change anything or our settings can't be hashed.
+
+    The parts are:
+      chart:  The chart's own attributes (apart from the data & axes), its
+              formatters, the number of series and our settings.
+      data:   The series (points, labels, styles and markers).
+      styles: The series' styles.
+      labels: The series' labels.
+      empty:  Which series have no points (formatters skip those).
+      axes:   The axes, and the data too if AutoScale sets their range from
+              it.
+    """
+    if not common._HasDefaultFormatters(chart.formatters):
+      return None
+    data = chart.data
+    version = chart._version
+    for name, value in chart.__dict__.iteritems():
+      if name not in ('display', 'data', '_axes'):
+        version = max(version, graphy_util.GetVersion(value))
+    for formatter in chart.formatters:
+      version = max(version, graphy_util.GetVersion(formatter))
+    if isinstance(data, common.ChartData):
+      labels = tuple(data.labels)
+      styles = (data.styles.version,) + tuple(
+          (style, graphy_util.GetVersion(style)) for style in data.styles)
+      empty = (not data.num_points,) * len(data)
+    else:
+      version = max(version, graphy_util.GetVersion(data))
+      series = list(common._IterSeries(data))
+      labels = tuple(s.label for s in series)
+      styles = tuple((s.style, graphy_util.GetVersion(s.style))
+                     for s in series)
+      empty = tuple(not len(s._data) for s in series)
+    data_version = common._DataVersion(data)
+    axes = tuple((axis, axis.version) for _, axis in chart._GetAxes())
+    if (any(isinstance(formatter, chart_formatters.AutoScale)
+            for formatter in chart.formatters) and
+        any(axis.min is None or axis.max is None
+            for axis in chart.GetDependentAxes())):
+      axes += (data_version,)
+    keys = {
+        'chart': (id(chart), version, len(data), self._GetSettings()),
+        'data': data_version,
+        'styles': styles,
+        'labels': labels,
+        'empty': empty,
+        'axes': axes,
+    }
+    try:
+      hash(tuple(keys.itervalues()))
+    except TypeError:
+      return None
+    return keys
+
+  def Fingerprint(self, chart=None):
+    """Return a digest (as a hex string) of the chart (default self.chart) and
+    the encoder settings, i.e. of everything which affects the URL apart from
+    the size.
+    """
+    if chart is None:
+      chart = self.chart
+    digest = hashlib.md5()
+    graphy_util.UpdateDigest(digest, (self.__class__, self._GetSettings()))
+    digest.update(chart.Fingerprint())
+    return digest.hexdigest()
+
+  def _GetSettings(self):
+    """Return the public settings of this encoder as a tuple of (name, value)
+    pairs.
     """
-    self._width = width
-    self._height = height
-    params = self._Params(self.chart)
-    return util.EncodeUrl(self.url_base, params, self.escape_url,
-                          use_html_entities)
-
-  def Img(self, width, height):
-    """Get an image tag for our graph."""
-    url = self.Url(width, height, use_html_entities=True)
+    settings = []
+    for name, value in sorted(self.__dict__.iteritems()):
+      if name.startswith('_') or name in ('chart', 'url_cache',
+                                          'fragment_cache', 'inline_renderer',
+                                          'inline_cache'):
+        continue
+      if isinstance(value, dict):
+        value = tuple(sorted(value.iteritems()))
+      elif isinstance(value, list):
+        value = tuple(value)
+      settings.append((name, value))
+    return tuple(settings)
+
+  def _UrlCacheKey(self, chart, width, height, use_html_entities):
+    """Return a key identifying the URL of chart at the given size, or None if
+    the settings can't be used as a key.
+    """
+    key = (self._cache_id, id(chart), chart.version,
+           self._GetSettings(), width, height, use_html_entities)
+    try:
+      hash(key)
+    except TypeError:
+      return None
+    return key
+
+  def Img(self, width, height, chart=None):
+    """Get an image tag for our graph (see Url)."""
+    return self.Imgs([(width, height)], chart)[0]
+
+  def Imgs(self, sizes, chart=None):
+    """Get image tags for our graph at several sizes (see Urls).  If
+    inline_renderer is set, the images are inlined instead (see DataUri).
+    """
+    if self.inline_renderer is None:
+      urls = self.Urls(sizes, use_html_entities=True, chart=chart)
+    else:
+      urls = [self.DataUri(width, height, chart) for width, height in sizes]
     tag = '<img src="%s" width="%s" height="%s" alt="chart"/>'
-    return tag % (url, width, height)
+    return [tag % (url, width, height)
+            for url, (width, height) in zip(urls, sizes)]
+
+  def DataUri(self, width, height, chart=None):
+    """Draw our graph with inline_renderer, and return the image as a data:
+    URI (which needs no HTML escaping).
+
+    Args:
+      width, height: The size of the image, in pixels.
+      chart: The chart to render.  Defaults to self.chart.
+    """
+    renderer = self.inline_renderer
+    if renderer is None:
+      raise ValueError('DataUri requires an inline_renderer')
+    if chart is None:
+      chart = self.chart
+    cache = self.inline_cache
+    key = None
+    if cache is not None:
+      key = (self._InlineFingerprint(renderer, chart), width, height)
+      uri = cache.Get(key)
+      if uri is not None:
+        return uri
+    if hasattr(renderer, 'Png'):
+      image_type = 'image/png'
+      image = renderer.Png(width, height, chart=chart)
+    else:
+      image_type = 'image/svg+xml'
+      image = renderer.Svg(width, height, chart=chart).encode('utf-8')
+    uri = 'data:%s;base64,%s' % (image_type, base64.b64encode(image))
+    if key is not None:
+      cache.Put(key, uri)
+    return uri
+
+  def _InlineFingerprint(self, renderer, chart):
+    """Return a digest of everything which affects the image renderer draws
+    of chart, apart from the size.
+    """
+    digest = hashlib.md5()
+    settings = dict((name, value) for name, value
+                    in renderer.__dict__.iteritems() if name != 'chart')
+    graphy_util.UpdateDigest(digest, (renderer.__class__, settings))
+    digest.update(chart.Fingerprint())
+    return digest.hexdigest()
+
+  def Compile(self, chart=None):
+    """Freeze the chart (default self.chart) and this encoder's settings into
+    a ChartTemplate, for drawing the same chart with different data.
+    """
+    if chart is None:
+      chart = self.chart
+    state = self.__getstate__()
+    state['chart'] = None
+    encoder = self.__class__.__new__(self.__class__)
+    encoder.__setstate__(copy.deepcopy(state))
+    return ChartTemplate(encoder, chart)
+
+  def __getstate__(self):
+    # Bound methods & caches (which hold a lock) can't be pickled.  Our own
+    # formatters are pickled by name and bound again by __setstate__; other
+    # formatters have to be picklable themselves.  A copy doesn't share the
+    # caches (unless they were set on the class).
+    state = self.__dict__.copy()
+    state.pop('url_cache', None)
+    state.pop('fragment_cache', None)
+    state.pop('inline_cache', None)
+    state['formatters'] = [
+        formatter.__name__ if getattr(formatter, 'im_self', None) is self
+        else formatter for formatter in self.formatters]
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self.formatters = [
+        getattr(self, formatter) if isinstance(formatter, basestring)
+        else formatter for formatter in self.formatters]
 
   def _GetType(self, chart):
     """Return the correct chart_type param for the chart."""
@@ -87,25 +466,74 @@ class BaseChartEncoder(object):
                   ]
     return formatters
 
-  def _Params(self, chart):
+  def _Params(self, chart, context=None):
     """Collect all the different params we need for the URL.  Collecting
     all params as a dict before converting to a URL makes testing easier.
+
+    Args:
+      context: The RenderContext.  Defaults to one for self._width by
+               self._height.
+    """
+    if context is None:
+      context = RenderContext(self._width, self._height)
+    chart = chart._GetFormattedView(context)
+    chart.render_context = context
+    return self._MergeParams([formatter(chart)
+                              for formatter in self.formatters])
+
+  def _MergeParams(self, results):
+    """Merge the params returned by the formatters (later ones win) into one
+    dict of strings, with the short param names.
     """
-    chart = chart.GetFormattedChart()
     params = {}
-    def Add(new_params):
-      params.update(util.ShortenParameterNames(new_params))
-
-    for formatter in self.formatters:
-      Add(formatter(chart))
-
-    for key in params:
-      params[key] = str(params[key])
+    for new_params in results:
+      if new_params is self.extra_params:
+        # The user's own params are sent as they are.
+        convert = str
+      else:
+        convert = self._FormatNumber
+      params.update(util.ShortenParameterNames(
+          dict((key, convert(value)) for key, value in new_params.iteritems())))
     return params
 
+  def _FormatNumber(self, value, resolution=None):
+    """Format a number for the URL (see util.FormatNumber)."""
+    return util.FormatNumber(value, self.significant_digits, resolution)
+
+  # Formatters whose params never depend on the chart's size.  Any formatter
+  # which isn't listed (including ones added by users) is assumed to depend
+  # on it.
+  _SIZE_INDEPENDENT_FORMATTERS = frozenset([
+      '_GetLegendParams', '_GetColors', '_GetGridParams', '_GetType',
+      '_GetExtraParams', '_GetLineStyles', '_ZeroPoint',
+      '_ApplyBarChartStyle', '_GetAngleParams'])
+
+  def _DependsOnSize(self, formatter):
+    """Return True if the params from formatter may change with the size."""
+    if getattr(formatter, 'im_self', None) is not self:
+      return True
+    name = formatter.__name__
+    if name == '_GetDataSeriesParams':
+      # Downsampling & the text/auto encodings use the size in pixels.
+      return bool(self.downsampling) or self.encoding in ('text', 'auto')
+    return name not in self._SIZE_INDEPENDENT_FORMATTERS
+
+  # Formatters whose params only depend on the chart's settings (labels,
+  # styles, colors...), not on its points, as long as no series is empty.
+  _DATA_INDEPENDENT_FORMATTERS = frozenset([
+      '_GetLegendParams', '_GetColors', '_GetType', '_GetExtraParams',
+      '_GetLineStyles', '_ApplyBarChartStyle', '_GetAngleParams'])
+
+  def _DependsOnData(self, formatter):
+    """Return True if the params from formatter may change with the points."""
+    if getattr(formatter, 'im_self', None) is not self:
+      return True
+    return formatter.__name__ not in self._DATA_INDEPENDENT_FORMATTERS
+
   def _GetSizeParams(self, chart):
     """Get the size param."""
-    return {'size': '%sx%s' % (int(self._width), int(self._height))}
+    context = chart.render_context
+    return {'size': '%sx%s' % (int(context.width), int(context.height))}
 
   def _GetExtraParams(self, chart):
     """Get any extra params (from extra_params)."""
@@ -114,37 +542,97 @@ class BaseChartEncoder(object):
   def _GetDataSeriesParams(self, chart):
     """Collect params related to the data series."""
     y_min, y_max = chart.GetDependentAxis().min, chart.GetDependentAxis().max
+    threshold = None
+    if self.downsampling:
+      threshold = int(self._GetSeriesPixels(chart) * self.points_per_pixel)
     series_data = []
     markers = []
     for i, series in enumerate(chart.data):
       data = series.data
-      if not data:  # Drop empty series.
+      if not len(data):  # Drop empty series.
         continue
+      num_points = len(data)
+      if threshold:
+        data = downsample.Downsample(data, threshold, self.downsampling)
       series_data.append(data)
 
       for x, marker in series.markers:
+        if marker.IsAtPoint():
+          x = downsample.RemapPosition(x, num_points, len(data))
         args = [marker.shape, marker.color, i, x, marker.size]
-        markers.append(','.join(str(arg) for arg in args))
+        markers.append(','.join(self._FormatNumber(arg) for arg in args))
 
-    encoder = self._GetDataEncoder(chart)
-    result = util.EncodeData(chart, series_data, y_min, y_max, encoder)
+    if (isinstance(chart.data, common.ChartData) and series_data and
+        not (threshold and chart.data.num_points > threshold)):
+      # Scale & encode the whole 2-D array at once.
+      series_data = chart.data._values
+    result = self._EncodeData(chart, series_data, y_min, y_max)
     result.update(util.JoinLists(marker     = markers))
     return result
 
+  def _GetSeriesPixels(self, chart):
+    """Return the number of pixels available along the series' x-axis."""
+    return chart.render_context.width
+
+  def _GetValuePixels(self, chart):
+    """Return the number of pixels available for the data values (along the
+    dependent axis).
+    """
+    return chart.render_context.height
+
   def _GetColors(self, chart):
     """Color series color parameter."""
     colors = []
     for series in chart.data:
-      if not series.data:
+      if not len(series.data):
         continue
       colors.append(series.style.color)
     return util.JoinLists(color = colors)
 
   def _GetDataEncoder(self, chart):
     """Get a class which can encode the data the way the user requested."""
-    if not self.enhanced_encoding:
-      return util.SimpleDataEncoder()
-    return util.EnhancedDataEncoder()
+    if self.encoding == 'text':
+      decimals = util.TextDecimalsForPixels(self._GetValuePixels(chart))
+      return util.TextDataEncoder(decimals)
+    if self.encoding == 'enhanced' or (self.encoding is None and
+                                       self.enhanced_encoding):
+      return util.EnhancedDataEncoder()
+    return util.SimpleDataEncoder()
+
+  def _GetAutoDataEncoders(self, chart):
+    """Return the encoders which are accurate to a pixel, with the lower bound
+    of the number of characters each needs per point.
+    """
+    pixels = self._GetValuePixels(chart)
+    candidates = [(util.SimpleDataEncoder(), 1),
+                  (util.EnhancedDataEncoder(), 2),
+                  (util.TextDataEncoder(util.TextDecimalsForPixels(pixels)),
+                   2)]
+    return [(encoder, min_length) for encoder, min_length in candidates
+            if util.QuantizationError(encoder, pixels) < 1]
+
+  def _EncodeData(self, chart, series, y_min, y_max):
+    """Encode the data series (see util.EncodeData) with the encoder the user
+    asked for.  For encoding='auto', try the encoders which are accurate
+    enough and return the shortest result.
+    """
+    if self.encoding != 'auto':
+      encoder = self._GetDataEncoder(chart)
+      return util.EncodeData(chart, series, y_min, y_max, encoder)
+    num_points = sum(len(s) for s in series)
+    best = best_length = None
+    for encoder, min_length in self._GetAutoDataEncoders(chart):
+      if best is not None and min_length * num_points >= best_length:
+        continue  # Can't be shorter.
+      result = util.EncodeData(chart, series, y_min, y_max, encoder)
+      data = result['data']
+      if self.escape_url and self.canonical_url:
+        data = util.EscapeValues([data])[0]
+      elif self.escape_url:
+        data = urllib.quote(data)
+      if best is None or len(data) < best_length:
+        best, best_length = result, len(data)
+    return best
 
   def _GetLegendParams(self, chart):
     """Get params for showing a legend."""
@@ -163,14 +651,25 @@ class BaseChartEncoder(object):
     axis_labels = []
     axis_label_positions = []
     axis_label_gridlines = []
-    mark_length = max(self._width, self._height)
+    mark_length = max(chart.render_context.width,
+                      chart.render_context.height)
     for i, axis_pair in enumerate(a for a in chart._GetAxes() if a[1].labels):
       axis_type_code, axis = axis_pair
       axis_types.append(axis_type_code)
       if axis.min is not None or axis.max is not None:
         assert axis.min is not None  # Sanity check: both min & max must be set.
         assert axis.max is not None
-        axis_ranges.append('%s,%s,%s' % (i, axis.min, axis.max))
+        # There's no point being more precise than a pixel.
+        if axis_type_code in 'xt':
+          pixels = chart.render_context.width
+        else:
+          pixels = chart.render_context.height
+        resolution = None
+        if pixels > 0 and axis.max != axis.min:
+          resolution = abs(axis.max - axis.min) / float(pixels)
+        axis_ranges.append('%s,%s,%s' % (
+            i, self._FormatNumber(axis.min, resolution),
+            self._FormatNumber(axis.max, resolution)))
 
       labels, positions = self._GetAxisLabelsAndPositions(axis, chart)
       if labels:
@@ -178,7 +677,8 @@ class BaseChartEncoder(object):
         axis_labels.extend(labels)
       if positions:
         positions = [i] + list(positions)
-        axis_label_positions.append(','.join(str(x) for x in positions))
+        axis_label_positions.append(','.join(self._FormatNumber(x)
+                                             for x in positions))
       if axis.label_gridlines:
         axis_label_gridlines.append("%d,%d" % (i, -mark_length))
 
@@ -206,7 +706,8 @@ class BaseChartEncoder(object):
       total = float(chart.left.max - chart.left.min)
       y = 100 * chart.left.grid_spacing / total
     if x or y:
-      return dict(grid = '%.3g,%.3g,1,0' % (x, y))
+      return dict(grid = '%s,%s,1,0' % (util.FormatNumber(x, 3),
+                                        util.FormatNumber(y, 3)))
     return {}
 
 
@@ -223,7 +724,8 @@ class LineChartEncoder(BaseChartEncoder):
     for series in chart.data:
       style = series.style
       if style:
-        styles.append('%s,%s,%s' % (style.width, style.on, style.off))
+        styles.append(','.join(self._FormatNumber(x)
+                               for x in (style.width, style.on, style.off)))
       else:
         # If one style is missing, they must all be missing
         # TODO: Add a test for this; throw a more meaningful exception
@@ -251,7 +753,7 @@ class BarChartEncoder(BaseChartEncoder):
   __STYLE_DEPRECATION = ('BarChart.display.style is deprecated.' +
                          ' Use BarChart.style, instead.')
 
-  def __init__(self, chart, style=None):
+  def __init__(self, chart=None, style=None):
     """Construct a new BarChartEncoder.
 
     Args:
@@ -270,6 +772,18 @@ class BarChartEncoder(BaseChartEncoder):
              (False,   True):  'bhs'}
     return {'chart_type': types[(chart.vertical, chart.stacked)]}
 
+  def _GetSeriesPixels(self, chart):
+    """Horizontal bar charts lay their series out along the height."""
+    if chart.vertical:
+      return chart.render_context.width
+    return chart.render_context.height
+
+  def _GetValuePixels(self, chart):
+    """Horizontal bar charts show their values along the width."""
+    if chart.vertical:
+      return chart.render_context.height
+    return chart.render_context.width
+
   def _GetAxisLabelsAndPositions(self, axis, chart):
     """Reverse labels on the y-axis in horizontal bar charts.
     (Otherwise the labels come out backwards from what you would expect)
@@ -357,7 +871,7 @@ class PieChartEncoder(BaseChartEncoder):
     is3d: if True, draw a 3d pie chart. Default is False.
   """
 
-  def __init__(self, chart, is3d=False, angle=None):
+  def __init__(self, chart=None, is3d=False, angle=None):
     """Construct a new PieChartEncoder.
 
     Args:
@@ -405,11 +919,15 @@ class PieChartEncoder(BaseChartEncoder):
       if points:
         pie_points.append(points)
 
-    encoder = self._GetDataEncoder(chart)
-    result = util.EncodeData(chart, pie_points, 0, max_val, encoder)
+    result = self._EncodeData(chart, pie_points, 0, max_val)
     result.update(util.JoinLists(label=labels))
     return result
 
+  def _GetValuePixels(self, chart):
+    """Pie segments are drawn around the circumference of the pie."""
+    context = chart.render_context
+    return math.pi * min(context.width, context.height)
+
   def _GetColors(self, chart):
     if chart._colors:
       # Colors were overridden by the user
@@ -426,5 +944,136 @@ class PieChartEncoder(BaseChartEncoder):
   def _GetAngleParams(self, chart):
     """If the user specified an angle, add it to the params."""
     if self.angle:
-      return {'chp' : str(self.angle)}
+      return {'chp' : self._FormatNumber(self.angle)}
     return {}
+
+
+class ChartTemplate(object):
+
+  """A chart with frozen settings, for drawing it quickly with other data.
+
+  Made by BaseChartEncoder.Compile().  The URL params which depend on neither
+  the data nor the size (like the legend, colors, line styles and
+  extra_params) are computed & escaped once.  Render() only scales & encodes
+  the new data, and redoes the params which depend on it (like the axis
+  ranges set by AutoScale, and the zero point of bar charts).  Changing the
+  chart or the encoder after compiling doesn't affect the template.
+
+  The params are only reused if the chart's formatters are the default ones
+  (AutoColor, AutoScale & AutoLegend), since other formatters may change
+  anything based on the data.  Otherwise every param is recomputed, which
+  still gives the right URL.
+  """
+
+  def __init__(self, encoder, chart):
+    """Construct a ChartTemplate.  Use BaseChartEncoder.Compile() instead."""
+    self._encoder = encoder
+    self._num_series = len(chart.data)
+    self._formatters = copy.deepcopy(chart.formatters)
+    reusable = common._HasDefaultFormatters(self._formatters)
+    self._chart = chart._Clone()
+    self._prepared = None
+    if reusable:
+      # Of the default formatters, only AutoScale looks at the points, so
+      # the others can be applied once & for all.
+      self._prepared = chart._Clone()
+      for formatter in self._formatters:
+        if not isinstance(formatter, chart_formatters.AutoScale):
+          formatter(self._prepared)
+    view = self._Format(None, RenderContext(0, 0))
+    self._shared = []
+    for formatter in encoder.formatters:
+      if (reusable and not encoder._DependsOnData(formatter) and
+          not encoder._DependsOnSize(formatter)):
+        self._shared.append((formatter, formatter(view)))
+      else:
+        self._shared.append((formatter, None))
+    static = encoder._MergeParams(
+        [params for _, params in self._shared if params is not None])
+    self._escaped = util.EscapeParams(static, encoder.canonical_url)
+
+  def _Format(self, data, context):
+    """Return a formatted copy of the chart, with data (or the chart's own
+    data if data is None) bound to its series, for drawing with the given
+    RenderContext.  Like BaseChart._GetFormattedView, the points aren't
+    copied.
+    """
+    if self._prepared is None:
+      chart = self._chart._Clone()
+      chart.render_context = context
+      if data is not None:
+        self._Bind(chart, data)
+      for formatter in self._formatters:
+        formatter(chart)
+    else:
+      # AutoScale only sets the min & max of the dependent axes, so we only
+      # need to copy the axes & series (not their labels, styles...).
+      prepared = self._prepared
+      chart = copy.copy(prepared)
+      chart._axes = dict((position, [copy.copy(axis) for axis in axes])
+                         for position, axes in prepared._axes.iteritems())
+      chart.data = _ShallowCopySeries(prepared.data)
+      if data is not None:
+        self._Bind(chart, data)
+      for formatter in self._formatters:
+        if isinstance(formatter, chart_formatters.AutoScale):
+          formatter(chart)
+    if isinstance(chart.data, common.ChartData):
+      chart.data._copy_on_access = False
+    for series in common._IterSeries(chart.data):
+      series._copy_on_access = False
+    chart.render_context = context
+    return chart
+
+  def _Bind(self, chart, data):
+    """Replace the points of the chart's series with data."""
+    if len(data) != self._num_series:
+      raise ValueError('The template has %d series, but got data for %d.' %
+                       (self._num_series, len(data)))
+    if isinstance(chart.data, common.ChartData):
+      chart.data.values = data
+      return
+    for series, points in zip(chart.data, data):
+      if isinstance(series, common.DataSeries):
+        series.data = points
+        series._copy_on_access = True  # Formatters mustn't change our input.
+        continue
+      # A pie, which takes one size per segment.
+      if len(points) != len(series):
+        raise ValueError('The pie has %d segments, but got %d sizes.' %
+                         (len(series), len(points)))
+      for segment, size in zip(series, points):
+        segment.data = [size]
+
+  def Render(self, data, width, height, use_html_entities=False):
+    """Get the URL for the chart with the given data.
+
+    Args:
+      data: List with the points for each series of the chart, in order (or,
+            for pie charts, the segment sizes for each pie).
+      width, height: The size of the image.
+      use_html_entities: As for BaseChartEncoder.Url().
+    """
+    encoder = self._encoder
+    chart = self._Format(data, RenderContext(width, height))
+    if all(len(points) for points in data):
+      shared = self._shared
+    else:
+      # Empty series are dropped from the colors etc. too.
+      shared = [(formatter, None) for formatter, _ in self._shared]
+    results = [params if params is not None else formatter(chart)
+               for formatter, params in shared]
+    return util.EncodeUrl(encoder.url_base, encoder._MergeParams(results),
+                          encoder.escape_url, use_html_entities,
+                          canonical=encoder.canonical_url,
+                          escaped=self._escaped)
+
+
+def _ShallowCopySeries(item):
+  """Copy item (a DataSeries, a ChartData or a possibly nested list of
+  DataSeries) so that the points of the copy can be replaced.  Everything
+  else is shared with the original.
+  """
+  if isinstance(item, list):
+    return graphy_util.VersionedList(_ShallowCopySeries(x) for x in item)
+  return copy.copy(item)
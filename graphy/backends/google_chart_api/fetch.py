@@ -0,0 +1,191 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fetch the images of charts from the chart server, for when the image
+itself is needed (to embed in a PDF, say) rather than its URL.
+
+The images are fetched by a few worker threads at once, and each worker
+keeps its connections to the server open between requests (HTTP/1.1
+keep-alive), so a batch of charts doesn't cost a connection per chart.
+"""
+
+import httplib
+import Queue
+import socket
+import threading
+import time
+import urlparse
+
+from graphy.backends import google_chart_api
+
+
+class FetchError(Exception):
+
+  """Raised when an image can't be fetched, even after retrying.
+
+  Object attributes:
+    url: The URL of the image.
+    status: The HTTP status of the last response, or None if the last try
+            failed before there was one (like a timeout).
+  """
+
+  def __init__(self, url, status, reason):
+    Exception.__init__(self, 'Fetching %s failed: %s' % (url, reason))
+    self.url = url
+    self.status = status
+
+
+class _Worker(object):
+
+  """Fetches URLs over connections which it keeps open."""
+
+  def __init__(self, timeout, retries, retry_delay):
+    self.timeout = timeout
+    self.retries = retries
+    self.retry_delay = retry_delay
+    self._connections = {}  # (scheme, host:port) -> HTTPConnection
+
+  def _Connection(self, scheme, netloc):
+    connection = self._connections.get((scheme, netloc))
+    if connection is None:
+      if scheme == 'https':
+        connection = httplib.HTTPSConnection(netloc, timeout=self.timeout)
+      else:
+        connection = httplib.HTTPConnection(netloc, timeout=self.timeout)
+      self._connections[(scheme, netloc)] = connection
+    return connection
+
+  def _Drop(self, scheme, netloc):
+    connection = self._connections.pop((scheme, netloc), None)
+    if connection is not None:
+      connection.close()
+
+  def Fetch(self, url):
+    """Return the body of the response to a GET of url.  Connection errors,
+    timeouts & server errors (5xx) are retried, on a new connection.
+
+    Raises:
+      FetchError: If the last try failed, or the server refused the request.
+    """
+    scheme, netloc, path, query, _ = urlparse.urlsplit(url)
+    if query:
+      path += '?' + query
+    delay = self.retry_delay
+    for attempt in xrange(self.retries + 1):
+      if attempt:
+        time.sleep(delay)
+        delay *= 2
+      try:
+        connection = self._Connection(scheme, netloc)
+        connection.request('GET', path or '/')
+        response = connection.getresponse()
+        # The whole body has to be read before the connection can be reused.
+        body = response.read()
+      except (httplib.HTTPException, socket.error), e:
+        self._Drop(scheme, netloc)
+        status, reason = None, str(e) or e.__class__.__name__
+        continue
+      if response.will_close:
+        self._Drop(scheme, netloc)
+      if response.status == 200:
+        return body
+      status, reason = response.status, '%d %s' % (response.status,
+                                                   response.reason)
+      if response.status < 500:
+        break
+    raise FetchError(url, status, reason)
+
+  def Close(self):
+    for connection in self._connections.itervalues():
+      connection.close()
+    self._connections.clear()
+
+
+def FetchUrls(urls, concurrency=4, timeout=10, retries=2, retry_delay=0.1):
+  """Fetch a batch of URLs, several at a time.
+
+  Args:
+    urls: List of URLs.  Each distinct URL is fetched once.
+    concurrency: The most requests to have in flight at once (which is also
+                 the most connections open to each server).
+    timeout: Seconds to wait for the server to connect or respond, per try.
+    retries: How many times to retry a URL after a connection error, a
+             timeout or a server error (5xx), waiting retry_delay seconds
+             before the first retry & twice as long before each next one.
+    retry_delay: See retries.
+  Returns:
+    A list with the body of the response for each URL, in the same order.
+  Raises:
+    FetchError: If any of the URLs couldn't be fetched.  The other fetches
+                are finished first.
+  """
+  distinct = list(set(urls))
+  bodies = {}
+  errors = []
+  queue = Queue.Queue()
+  for url in distinct:
+    queue.put(url)
+
+  def Work():
+    worker = _Worker(timeout, retries, retry_delay)
+    try:
+      while True:
+        try:
+          url = queue.get_nowait()
+        except Queue.Empty:
+          return
+        try:
+          bodies[url] = worker.Fetch(url)
+        except FetchError, e:
+          errors.append(e)
+    finally:
+      worker.Close()
+
+  threads = [threading.Thread(target=Work)
+             for _ in xrange(min(concurrency, len(distinct)))]
+  for thread in threads:
+    thread.setDaemon(True)
+    thread.start()
+  for thread in threads:
+    thread.join()
+  if errors:
+    raise errors[0]
+  return [bodies[url] for url in urls]
+
+
+def FetchImages(charts, sizes, concurrency=4, timeout=10, retries=2,
+                retry_delay=0.1):
+  """Fetch the images of a batch of charts from the chart server.
+
+  The URLs are made by google_chart_api.RenderMany, so charts which render
+  the same are only fetched once.
+
+  Args:
+    charts: List of charts with displays from the google_chart_api backend.
+    sizes: List of (width, height) pairs to fetch every chart at.
+    The other args are as for FetchUrls.
+  Returns:
+    A list with, for each chart (in the same order), the list of its images
+    (as strings, usually the contents of PNG files), one per size.
+  Raises:
+    FetchError: If any of the images couldn't be fetched.
+  """
+  if not sizes:
+    return [[] for _ in charts]
+  urls = google_chart_api.RenderMany(charts, sizes)
+  bodies = FetchUrls([url for chart_urls in urls for url in chart_urls],
+                     concurrency, timeout, retries, retry_delay)
+  return [bodies[i:i + len(sizes)] for i in xrange(0, len(bodies), len(sizes))]
@@ -0,0 +1,119 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for fetching chart images, from the stub server."""
+
+import threading
+import time
+
+from graphy import graphy_test
+from graphy.backends import google_chart_api
+from graphy.backends.google_chart_api import fetch
+from graphy.backends.google_chart_api import stub_server
+
+
+class FetchTest(graphy_test.GraphyTest):
+
+  def setUp(self):
+    self.server = stub_server.StubChartServer()
+    self.server.image_for = lambda path: path
+    self.server.Start()
+    self.charts = [google_chart_api.LineChart([1, 2, 3]),
+                   google_chart_api.BarChart([4, 5]),
+                   google_chart_api.LineChart([1, 2, 3])]
+    for chart in self.charts:
+      chart.display.url_base = self.server.url_base
+    self.sizes = [(100, 50), (200, 100)]
+
+  def tearDown(self):
+    self.server.Stop()
+
+  def Path(self, chart, width, height):
+    """Return the path the chart's URL asks the server for."""
+    url = chart.display.Url(width, height)
+    return url[len(self.server.url_base) - len(self.server.path):]
+
+  def testFetchImages(self):
+    images = fetch.FetchImages(self.charts, self.sizes, concurrency=2)
+    self.assertEqual([[self.Path(chart, w, h) for w, h in self.sizes]
+                      for chart in self.charts], images)
+    # The identical charts are only fetched once.
+    self.assertEqual(4, self.server.requests)
+
+  def testStubServerImage(self):
+    self.server.image_for = lambda path: stub_server.PNG
+    image, = fetch.FetchImages(self.charts[:1], [(100, 50)])[0]
+    self.assertEqual('\x89PNG\r\n\x1a\n', image[:8])
+
+  def testConnectionsAreReused(self):
+    urls = [self.server.url_base + '?chs=%dx10' % i for i in range(20)]
+    fetch.FetchUrls(urls, concurrency=3)
+    self.assertEqual(20, self.server.requests)
+    self.assertTrue(self.server.connections <= 3)
+
+  def testConcurrencyIsBounded(self):
+    lock = threading.Lock()
+    in_flight = [0, 0]  # Current & most.
+    def ImageFor(path):
+      lock.acquire()
+      in_flight[0] += 1
+      in_flight[1] = max(in_flight)
+      lock.release()
+      time.sleep(0.02)
+      lock.acquire()
+      in_flight[0] -= 1
+      lock.release()
+      return path
+    self.server.image_for = ImageFor
+    urls = [self.server.url_base + '?chs=%dx10' % i for i in range(12)]
+    self.assertEqual(['/chart?chs=%dx10' % i for i in range(12)],
+                     fetch.FetchUrls(urls, concurrency=3))
+    self.assertTrue(1 < in_flight[1] <= 3)
+
+  def testRetries(self):
+    self.server.failures = 2
+    self.assertEqual(['/chart?a'], fetch.FetchUrls(
+        [self.server.url_base + '?a'], retries=2, retry_delay=0))
+    self.assertEqual(3, self.server.requests)
+
+  def testGivesUp(self):
+    self.server.failures = 5
+    try:
+      fetch.FetchUrls([self.server.url_base + '?a'], retries=2, retry_delay=0)
+      self.fail('No FetchError')
+    except fetch.FetchError, e:
+      self.assertEqual(503, e.status)
+    self.assertEqual(3, self.server.requests)
+
+  def testClientErrorsAreNotRetried(self):
+    url = self.server.url_base.replace('/chart', '/nothing')
+    self.assertRaises(fetch.FetchError, fetch.FetchUrls, [url],
+                      retry_delay=0)
+    self.assertEqual(1, self.server.requests)
+
+  def testTimeout(self):
+    self.server.delay = 0.3
+    try:
+      fetch.FetchUrls([self.server.url_base], timeout=0.05, retries=1,
+                      retry_delay=0)
+      self.fail('No FetchError')
+    except fetch.FetchError, e:
+      self.assertEqual(None, e.status)
+    self.assertEqual(2, self.server.requests)
+
+
+if __name__ == '__main__':
+  graphy_test.main()
@@ -16,11 +16,16 @@
 
 """Unittest for Graphy and Google Chart API backend."""
 
+import base64
+
 from graphy import common
 from graphy import graphy_test
 from graphy import line_chart
+from graphy import util
 from graphy.backends import google_chart_api
 from graphy.backends.google_chart_api import base_encoder_test
+from graphy.backends.raster import renderers as raster_renderers
+from graphy.backends.svg import renderers as svg_renderers
 
 
 # Extend XYChartTest so that we pick up & repeat all the basic tests which
@@ -51,6 +56,35 @@ class LineChartTest(base_encoder_test.XYChartTest):
     error_msg = '\n%s\n!=\n%s' % (actual, expected)
     self.assertEqual(actual, expected, error_msg)
 
+  def testDownsampling(self):
+    self.chart.auto_scale.buffer = 0
+    self.chart.AddLine(range(1000))
+    self.assertEqual(1000, len(self.Param('chd')) - 2)
+    self.chart.display.downsampling = 'minmax'
+    self.chart.display._width = 50
+    self.assertEqual(100, len(self.Param('chd')) - 2)
+    self.chart.display.points_per_pixel = 1
+    self.assertEqual(50, len(self.Param('chd')) - 2)
+
+  def testDownsamplingRemapsMarkers(self):
+    x = common.Marker('x', '0000FF', 5)
+    self.chart.AddLine(range(101), markers=[(0, x), (50, x), (100, x)])
+    self.chart.display.downsampling = 'mean'
+    self.chart.display.points_per_pixel = 1
+    self.chart.display._width = 11
+    self.assertEqual('x,0000FF,0,0,5|x,0000FF,0,5,5|x,0000FF,0,10,5',
+                     self.Param('chm'))
+
+  def testDownsamplingKeepsFillMarkers(self):
+    fill = common.Marker('b', 'ff0000', 1)
+    band = common.Marker('r', '00ff00', 0.75)
+    self.chart.AddLine(range(101), markers=[(1, fill), (0.25, band)])
+    self.chart.AddLine(range(101))
+    self.chart.display.downsampling = 'lttb'
+    self.chart.display.points_per_pixel = 1
+    self.chart.display._width = 11
+    self.assertEqual('b,ff0000,0,1,1|r,00ff00,0,0.25,0.75', self.Param('chm'))
+
   def testLinePatterns(self):
     self.chart.AddLine([1, 2, 3])
     self.chart.AddLine([4, 5, 6], pattern=line_chart.LineStyle.DASHED)
@@ -108,6 +142,54 @@ class LineChartTest(base_encoder_test.XYChartTest):
                     '0,0,50,100|1,0,33,66|2,0,50|3,3.7,10,-22.9')
     self.assertEqual(self.Param('chxt'), 'y,x,x,t')
 
+  def testInlineSvg(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    url = self.chart.display.Url(100, 50)
+    renderer = svg_renderers.LineChartRenderer()
+    self.chart.display.inline_renderer = renderer
+    self.assertEqual(url, self.chart.display.Url(100, 50))
+    img = self.chart.display.Img(100, 50)
+    prefix = '<img src="data:image/svg+xml;base64,'
+    self.assertTrue(img.startswith(prefix))
+    self.assertTrue(img.endswith('" width="100" height="50" alt="chart"/>'))
+    encoded = img[len(prefix):img.index('"', len(prefix))]
+    self.assertEqual(renderer.Svg(100, 50, chart=self.chart),
+                     base64.b64decode(encoded))
+
+  def testInlinePng(self):
+    self.RequireNumpy()
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.chart.display.inline_renderer = raster_renderers.LineChartRenderer()
+    uri = self.chart.display.DataUri(100, 50)
+    self.assertTrue(uri.startswith('data:image/png;base64,'))
+    self.assertEqual('\x89PNG', base64.b64decode(uri.split(',')[1])[:4])
+
+  def testInlineCache(self):
+    cache = util.LRUCache(10)
+    self.chart.display.inline_renderer = svg_renderers.LineChartRenderer()
+    self.chart.display.inline_cache = cache
+    self.AddToChart(self.chart, [1, 2, 3])
+    uri = self.chart.display.DataUri(100, 50)
+    # An identical chart, even another object, is only drawn once.
+    other = self.GetChart()
+    self.AddToChart(other, [1, 2, 3])
+    other.display.inline_renderer = self.chart.display.inline_renderer
+    other.display.inline_cache = cache
+    self.assertEqual([uri, uri], [other.display.DataUri(100, 50),
+                                  self.chart.display.DataUri(100, 50)])
+    self.assertEqual((2, 1), (cache.hits, cache.misses))
+    # Changing the chart, the size or the renderer makes a new image.
+    self.chart.display.DataUri(50, 100)
+    self.AddToChart(other, [3, 2, 1])
+    other.display.DataUri(100, 50)
+    self.chart.display.inline_renderer.background = '000000'
+    self.chart.display.DataUri(100, 50)
+    self.assertEqual((2, 4), (cache.hits, cache.misses))
+
+  def testDataUriRequiresRenderer(self):
+    self.AddToChart(self.chart, [1, 2, 3])
+    self.assertRaises(ValueError, self.chart.display.DataUri, 100, 50)
+
 
 # Extend LineChartTest so that we pick up & repeat all the line tests which
 # Sparklines should continue to satisfy
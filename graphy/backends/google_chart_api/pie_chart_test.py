@@ -42,6 +42,14 @@ class PieChartTest(base_encoder_test.BaseChartTest):
     # Override this test, as pie charts don't have default formatters.
     pass
 
+  def testFragmentCacheSeesEmptiedSeries(self):
+    # Override this test, as pie segments always have one point.
+    pass
+
+  def testCachesSeeMarkerChanges(self):
+    # Override this test, as pie charts don't draw markers.
+    pass
+
   def testChartType(self):
     self.chart.display.is3d = False
     self.assertEqual(self.Param('cht'), 'p')
@@ -144,6 +152,19 @@ class PieChartTest(base_encoder_test.BaseChartTest):
     self.chart.display.angle = 0
     self.assertTrue('chp' not in self.chart.display._Params(self.chart))
 
+  def testTemplate(self):
+    self.chart = self.GetChart([1, 2], ['a', 'b'])
+    self.chart.AddPie([5, 5, 5], colors=['ff0000', '00ff00', '0000ff'])
+    self.chart.display.canonical_url = True
+    template = self.chart.display.Compile()
+    data = [[10, 1], [1, 2, 3]]
+    for pie, sizes in zip(self.chart.data, data):
+      for segment, size in zip(pie, sizes):
+        segment.size = size
+    self.assertEqual(self.chart.display.Url(300, 100),
+                     template.Render(data, 300, 100))
+    self.assertRaises(ValueError, template.Render, [[1, 2], [3]], 300, 100)
+
 
 if __name__ == '__main__':
   graphy_test.main()
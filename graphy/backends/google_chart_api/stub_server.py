@@ -0,0 +1,157 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A local HTTP server which stands in for the chart server, for tests and
+benchmarks.
+
+  server = stub_server.StubChartServer()
+  server.Start()
+  chart.display.url_base = server.url_base
+  ...
+  server.Stop()
+
+Every request for the chart path gets the same small PNG (or whatever
+image_for returns), after an optional delay.  Connections are kept alive,
+like the real server's.
+"""
+
+import BaseHTTPServer
+import SocketServer
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+
+def _Png():
+  """Return a 1x1 white PNG."""
+  def Chunk(kind, data):
+    return (struct.pack('>I', len(data)) + kind + data +
+            struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+  return ''.join(['\x89PNG\r\n\x1a\n',
+                  Chunk('IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0)),
+                  Chunk('IDAT', zlib.compress('\x00\xff\xff\xff')),
+                  Chunk('IEND', '')])
+
+PNG = _Png()
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+  protocol_version = 'HTTP/1.1'
+  # The headers are written a line at a time; without this, delayed ACKs
+  # would hold up each response on a kept-alive connection.
+  disable_nagle_algorithm = True
+
+  def setup(self):
+    BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+    self.server.stub._Count('connections')
+
+  def do_GET(self):
+    stub = self.server.stub
+    failing = stub._Count('requests') <= stub.failures
+    if stub.delay:
+      time.sleep(stub.delay)
+    if failing:
+      self._Respond(503, 'text/plain', 'Unavailable')
+    elif self.path.split('?')[0] != stub.path:
+      self._Respond(404, 'text/plain', 'Not found')
+    else:
+      self._Respond(200, 'image/png', stub.image_for(self.path))
+
+  def _Respond(self, status, content_type, body):
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+  daemon_threads = True
+
+  def handle_error(self, request, client_address):
+    # Clients which time out close the connection while we're still writing
+    # to it, which is expected, so don't print its traceback.
+    if not isinstance(sys.exc_info()[1], socket.error):
+      BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class StubChartServer(object):
+
+  """A chart server on localhost, serving from a background thread.
+
+  Object attributes:
+    port: The port to listen on.  Default is 0, for any free port (which
+          Start() sets it to).
+    url_base: The URL to use as the encoders' url_base.  Set by Start().
+    path: The path of the chart URLs.  Default is '/chart'.
+    delay: Seconds to wait before answering each request, to simulate the
+           latency of the real server.  Default is 0.
+    failures: How many requests to answer with 503 (Service Unavailable)
+              before answering the rest properly.  Default is 0.
+    image_for: Function from the path (with the query) of a request to the
+               body of the response.  Default always returns PNG.
+    requests: How many requests have been made.
+    connections: How many connections have been opened.
+  """
+
+  def __init__(self, port=0, delay=0, failures=0):
+    self.port = port
+    self.path = '/chart'
+    self.delay = delay
+    self.failures = failures
+    self.image_for = lambda path: PNG
+    self.url_base = None
+    self.requests = 0
+    self.connections = 0
+    self._lock = threading.Lock()
+    self._server = None
+    self._thread = None
+
+  def _Count(self, name):
+    """Add one to the counter attribute name, & return its new value."""
+    self._lock.acquire()
+    try:
+      count = getattr(self, name) + 1
+      setattr(self, name, count)
+      return count
+    finally:
+      self._lock.release()
+
+  def Start(self):
+    """Start serving, and return url_base."""
+    self._server = _Server(('127.0.0.1', self.port), _Handler)
+    self._server.stub = self
+    self.port = self._server.server_address[1]
+    self.url_base = 'http://127.0.0.1:%d%s' % (self.port, self.path)
+    self._thread = threading.Thread(target=self._server.serve_forever,
+                                    kwargs={'poll_interval': 0.05})
+    self._thread.setDaemon(True)
+    self._thread.start()
+    return self.url_base
+
+  def Stop(self):
+    """Stop serving."""
+    self._server.shutdown()
+    self._server.server_close()
+    self._thread.join()
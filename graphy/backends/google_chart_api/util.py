@@ -18,10 +18,21 @@
 
 Not intended for end users, use the methods in __init__ instead."""
 
+import array
 import cgi
+import math
+import numbers
+import re
 import string
 import urllib
 
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from graphy import util as graphy_util
+
 
 # TODO: Find a better representation
 LONG_NAMES = dict(
@@ -80,64 +91,286 @@ JOIN_DELIMS = dict(
 )
 
 
-class SimpleDataEncoder:
+_SIMPLE_CHARS = string.ascii_uppercase + string.ascii_lowercase + string.digits
+_ENHANCED_CHARS = _SIMPLE_CHARS + '-.'
 
-  """Encode data using simple encoding.  Out-of-range data will
-  be dropped (encoded as '_').
+# The code tables are shared by all encoders and built once per process.
+SIMPLE_CODE = tuple(_SIMPLE_CHARS)
+ENHANCED_CODE = tuple(x + y for x in _ENHANCED_CHARS for y in _ENHANCED_CHARS)
+
+# Lookup tables indexed by (rounded) value.  The entry just past the end of
+# the code holds the marker for missing & out-of-range values.
+_SIMPLE_LOOKUP = SIMPLE_CODE + ('_',)
+_ENHANCED_LOOKUP = ENHANCED_CODE + ('__',)
+
+# Simple encoding fits in a byte, so a whole series can be encoded with a
+# single str.translate call over the indexes.
+_SIMPLE_TRANSLATION = ''.join(_SIMPLE_LOOKUP) + \
+                      '_' * (256 - len(_SIMPLE_LOOKUP))
+
+
+def _ReadOnlyTable(lookup):
+  """Turn a lookup tuple into an immutable numpy array (if numpy is around)."""
+  if numpy is None:
+    return None
+  table = numpy.array(lookup)
+  table.flags.writeable = False
+  return table
+
+_SIMPLE_TABLE = _ReadOnlyTable(_SIMPLE_LOOKUP)
+_ENHANCED_TABLE = _ReadOnlyTable(_ENHANCED_LOOKUP)
+
+
+class _TableDataEncoder:
+
+  """Base class for encoders which map each value to a fixed-width code.
+
+  Subclasses set code (the shared code table), lookup (the code table plus
+  the missing marker), table (lookup as a numpy array) and prefix.
   """
 
+  separator = ','  # Between series.
+  delimiter = ''  # Between values.
+  step = 1  # The smallest difference between two encodable values.
+
   def __init__(self):
-    self.prefix = 's:'
-    self.code = string.ascii_uppercase + string.ascii_lowercase + string.digits
     self.min = 0
     self.max = len(self.code) - 1
 
   def Encode(self, data):
-    return ''.join(self._EncodeItem(i) for i in data)
+    """Encode a single data series."""
+    return self.EncodeMany([data])[0]
 
-  def _EncodeItem(self, x):
-    if x is None:
-      return '_'
-    x = int(round(x))
-    if x < self.min or x > self.max:
-      return '_'
-    return self.code[int(x)]
+  def EncodeMany(self, series_list):
+    """Encode several data series in one pass; return a list of strings."""
+    if numpy is not None:
+      encoded = self._EncodeArray(series_list)
+    else:
+      encoded = self._EncodeIndexes(series_list)
+    width = len(self.lookup[-1])
+    out = []
+    start = 0
+    for series in series_list:
+      end = start + width * len(series)
+      out.append(encoded[start:end])
+      start = end
+    return out
+
+  def _Indexes(self, data):
+    """Map a data series to indexes in the lookup table."""
+    missing = self.max + 1
+    out = []
+    for x in data:
+      if x is None or x != x:  # None & NaN mark missing points.
+        out.append(missing)
+        continue
+      x = int(round(x))
+      if x < self.min or x > self.max:
+        out.append(missing)
+      else:
+        out.append(x)
+    return out
+
+  def _EncodeIndexes(self, series_list):
+    """Pure-python encoding of all series, concatenated."""
+    indexes = []
+    for series in series_list:
+      indexes.extend(self._Indexes(series))
+    return ''.join(map(self.lookup.__getitem__, indexes))
+
+  def _EncodeArray(self, series_list):
+    """Vectorized encoding of all series, concatenated.
+
+    Rounds the data, replaces None/NaN & out-of-range values with the missing
+    marker, and looks up the codes for all points at once.  The output is
+    identical to the pure-python encoding.
+    """
+    if isinstance(series_list, numpy.ndarray):
+      # One series per row; no need to concatenate.
+      data = series_list.ravel()
+    else:
+      series_list = [_AsArray(s) for s in series_list]
+      data = numpy.concatenate(series_list or [[]])
+    if not len(data):
+      return ''
+    data = _RoundHalfAwayFromZero(data)
+    # Move NaNs out of range first, so the comparisons don't trip over them.
+    data[numpy.isnan(data)] = -1
+    data[(data < self.min) | (data > self.max)] = self.max + 1
+    return self.table[data.astype(numpy.intp)].tostring()
 
 
-class EnhancedDataEncoder:
+class SimpleDataEncoder(_TableDataEncoder):
 
-  """Encode data using enhanced encoding.  Out-of-range data will
+  """Encode data using simple encoding.  Out-of-range data will
   be dropped (encoded as '_').
   """
 
-  def __init__(self):
-    self.prefix = 'e:'
-    chars = string.ascii_uppercase + string.ascii_lowercase + string.digits \
-            + '-.'
-    self.code = [x + y for x in chars for y in chars]
+  prefix = 's:'
+  code = SIMPLE_CODE
+  lookup = _SIMPLE_LOOKUP
+  table = _SIMPLE_TABLE
+
+  def _EncodeIndexes(self, series_list):
+    """Translate the indexes as bytes instead of looking them up one by one."""
+    indexes = array.array('B')
+    for series in series_list:
+      indexes.extend(self._Indexes(series))
+    return indexes.tostring().translate(_SIMPLE_TRANSLATION)
+
+
+class EnhancedDataEncoder(_TableDataEncoder):
+
+  """Encode data using enhanced encoding.  Out-of-range data will
+  be dropped (encoded as '__').
+  """
+
+  prefix = 'e:'
+  code = ENHANCED_CODE
+  lookup = _ENHANCED_LOOKUP
+  table = _ENHANCED_TABLE
+
+
+class TextDataEncoder:
+
+  """Encode data using text encoding: comma-separated numbers from 0 to 100,
+  with the given number of decimals (trailing zeros are trimmed).  Missing &
+  out-of-range data will be dropped (encoded as -1).
+  """
+
+  prefix = 't:'
+  separator = '|'
+  delimiter = ','
+
+  def __init__(self, decimals=1):
     self.min = 0
-    self.max = len(self.code) - 1
+    self.max = 100
+    self.decimals = decimals
+    self.step = 10 ** -decimals
+
+  def _FormatPoint(self, x):
+    if x is None or x != x:
+      return '-1'
+    scale = 10 ** self.decimals
+    x = int(round(x * scale))
+    if x < self.min * scale or x > self.max * scale:
+      return '-1'
+    whole, fraction = divmod(x, scale)
+    if not fraction:
+      return str(whole)
+    return ('%d.%0*d' % (whole, self.decimals, fraction)).rstrip('0')
 
   def Encode(self, data):
-    return ''.join(self._EncodeItem(i) for i in data)
+    """Encode a single data series."""
+    return self.delimiter.join(map(self._FormatPoint, data))
 
-  def _EncodeItem(self, x):
-    if x is None:
-      return '__'
-    x = int(round(x))
-    if x < self.min or x > self.max:
-      return '__'
-    return self.code[int(x)]
-
-
-def EncodeUrl(base, params, escape_url, use_html_entities):
-  """Escape params, combine and append them to base to generate a full URL."""
-  real_params = []
-  for key, value in params.iteritems():
-    if escape_url:
-      value = urllib.quote(value)
-    if value:
-      real_params.append('%s=%s' % (key, value))
+  def EncodeMany(self, series_list):
+    """Encode several data series; return a list of strings."""
+    return [self.Encode(series) for series in series_list]
+
+
+def QuantizationError(encoder, pixels):
+  """Return the largest error (in pixels) which rounding to the values the
+  encoder can represent causes, if its whole range is drawn pixels long.
+  """
+  return 0.5 * encoder.step * pixels / float(encoder.max - encoder.min)
+
+
+def TextDecimalsForPixels(pixels):
+  """Return how many decimals text encoding needs to be accurate to less
+  than a pixel, if its whole range is drawn pixels long.
+  """
+  decimals = 0
+  while QuantizationError(TextDataEncoder(decimals), pixels) >= 1:
+    decimals += 1
+  return decimals
+
+
+def _AsArray(data):
+  """Convert a data series to a float64 numpy array, with NaN for None."""
+  return graphy_util.AsFloatArray(data)
+
+
+def _RoundHalfAwayFromZero(data):
+  """Round an array the same way the builtin round() does.
+
+  numpy.rint rounds halves to even, so the halves are fixed up afterwards.
+  """
+  truncated = numpy.trunc(data)
+  rounded = numpy.rint(data)
+  halves = numpy.abs(data - truncated) == 0.5
+  rounded[halves] = (truncated + numpy.sign(data))[halves]
+  return rounded
+
+
+# Characters which are left alone by EscapeValues: the characters allowed in
+# a URL query, minus the ones which mean something in a query string
+# (& = + # %).  NUL is used to separate the values while they are escaped.
+_URL_SAFE_CHARS = string.ascii_letters + string.digits + "-._~!$'()*,;:@/?"
+_URL_UNSAFE = re.compile('[^%s\x00]' % re.escape(_URL_SAFE_CHARS))
+_URL_ESCAPES = dict((chr(i), '%%%02X' % i) for i in xrange(256))
+
+
+def _EscapeChar(match):
+  return _URL_ESCAPES[match.group()]
+
+
+def EscapeValues(values):
+  """Percent-escape the characters of each value which aren't safe in a URL
+  query, in a single pass over all the values.  Returns a list.
+  """
+  if not values:
+    return []
+  joined = '\x00'.join(values)
+  if joined.count('\x00') != len(values) - 1:
+    # Some value contains a NUL itself, so we can't split on NULs.
+    return [_URL_UNSAFE.sub(_EscapeChar, value).replace('\x00', '%00')
+            for value in values]
+  return _URL_UNSAFE.sub(_EscapeChar, joined).split('\x00')
+
+
+def EscapeParams(params, canonical=False):
+  """Escape the values of params (a dict) the way EncodeUrl does.
+
+  Returns a dict of {name: (value, escaped value)}, which can be passed to
+  EncodeUrl as escaped, to avoid escaping the same values again.
+  """
+  names = list(params)
+  values = [params[name] for name in names]
+  if canonical:
+    escaped = EscapeValues(values)
+  else:
+    escaped = [urllib.quote(value) for value in values]
+  return dict(zip(names, zip(values, escaped)))
+
+
+def EncodeUrl(base, params, escape_url, use_html_entities, canonical=False,
+              escaped=None):
+  """Escape params, combine and append them to base to generate a full URL.
+
+  If canonical is True, the params are sorted by name and escaped with
+  EscapeValues, so the same params always give the same URL.  escaped is an
+  optional result of EscapeParams (with the same canonical setting); params
+  which still have the values in it aren't escaped again.
+  """
+  if escape_url:
+    escaped = escaped or {}
+    to_escape = {}
+    escaped_params = {}
+    for name, value in params.iteritems():
+      if escaped.get(name, (None,))[0] == value:
+        escaped_params[name] = escaped[name][1]
+      else:
+        to_escape[name] = value
+    for name, (_, value) in EscapeParams(to_escape, canonical).iteritems():
+      escaped_params[name] = value
+  else:
+    escaped_params = params
+  names = list(params)
+  if canonical:
+    names.sort()
+  real_params = ['%s=%s' % (name, escaped_params[name]) for name in names
+                 if escaped_params[name]]
   if real_params:
     url = '%s?%s' % (base, '&'.join(real_params))
   else:
@@ -162,9 +395,49 @@ def ShortenParameterNames(params):
   return out
 
 
+# Python's str() of a float is accurate to 12 significant digits.
+DEFAULT_DIGITS = 12
+_INF = float('inf')
+
+
+def FormatNumber(value, digits=DEFAULT_DIGITS, resolution=None):
+  """Return the shortest string for a number which is accurate to the given
+  number of significant digits or, if resolution is given, to within half of
+  resolution (whichever is shorter).  Unlike str(), values like 1e-05 come
+  out as 0.00001: an exponent is only used for numbers so large or small that
+  writing them out would take more than digits extra characters (like 1e+300).
+
+  Values which aren't numbers (and NaN & infinity) are returned as str(value).
+  """
+  if isinstance(value, numbers.Integral) or not isinstance(value,
+                                                           numbers.Real):
+    return str(value)
+  value = float(value)
+  if value != value or abs(value) == _INF:
+    return str(value)
+  if not value:
+    return '0'
+  magnitude = int(math.floor(math.log10(abs(value))))
+  decimals = digits - 1 - magnitude
+  if resolution:
+    decimals = min(decimals, int(math.ceil(-math.log10(resolution))))
+  text = '%.*f' % (max(decimals, 0), round(value, decimals))
+  if '.' in text:
+    text = text.rstrip('0').rstrip('.')
+  if text == '-0':
+    text = '0'
+  if len(text) > 2 * digits:
+    # Mostly padding zeros (or, for huge numbers, noise digits).
+    significant = max(1, min(digits, decimals + 1 + magnitude))
+    exponent = '%.*g' % (significant, value)
+    if len(text) > len(exponent) + digits:
+      text = exponent
+  return text
+
+
 def StrJoin(delim, data):
-  """String-ize & join data."""
-  return delim.join(str(x) for x in data)
+  """String-ize & join data.  Numbers are formatted with FormatNumber."""
+  return delim.join(FormatNumber(x) for x in data)
 
 
 def JoinLists(**args):
@@ -190,33 +463,76 @@ def EncodeData(chart, series, y_min, y_max, encoder):
 
   Use the chart's encoder to determine the format. The formatted data will
   be scaled to fit within the range of values supported by the chosen
-  encoding.
+  encoding.  If numpy is available, each series is converted to an array once
+  and scaled & encoded with array operations.  All series are encoded in a
+  single pass by the encoder's EncodeMany.
 
   Args:
     chart: The chart.
     series: A list of the the data series to format; each list element is
-           a list of data points.
+           a list of data points.  May also be a 2-D numpy array with one
+           series per row, which is scaled & encoded in one go.
     y_min: Minimum data value. May be None if y_max is also None
     y_max: Maximum data value. May be None if y_min is also None
   Returns:
     A dictionary with one key, 'data', whose value is the fully encoded series.
   """
   assert (y_min is None) == (y_max is None)
-  if y_min is not None:
-    def _ScaleAndEncode(series):
+  if numpy is not None and isinstance(series, numpy.ndarray):
+    # A 2-D array with one series per row (see common.ChartData).
+    if y_min is not None:
       series = ScaleData(series, y_min, y_max, encoder.min, encoder.max)
-      return encoder.Encode(series)
-    encoded_series = [_ScaleAndEncode(s) for s in series]
-  else:
-    encoded_series = [encoder.Encode(s) for s in series]
-  result = JoinLists(**{'data': encoded_series})
-  result['data'] = encoder.prefix + result['data']
-  return result
+    return _JoinEncoded(encoder, encoder.EncodeMany(series))
+  # Chunked series (see graphy.sources) are scaled & encoded a chunk at a
+  # time.  The rest are encoded together.
+  in_memory = [s for s in series if not graphy_util.IsChunked(s)]
+  if numpy is not None:
+    in_memory = [_AsArray(s) for s in in_memory]
+  if y_min is not None:
+    in_memory = [ScaleData(s, y_min, y_max, encoder.min, encoder.max)
+                 for s in in_memory]
+  encoded = iter(encoder.EncodeMany(in_memory))
+  encoded_series = []
+  for s in series:
+    if graphy_util.IsChunked(s):
+      encoded_series.append(_EncodeChunked(s, y_min, y_max, encoder))
+    else:
+      encoded_series.append(encoded.next())
+  return _JoinEncoded(encoder, encoded_series)
+
+
+def _JoinEncoded(encoder, encoded_series):
+  """Return the 'data' param for a list of encoded series."""
+  return {'data': encoder.prefix + encoder.separator.join(encoded_series)}
+
+
+def _EncodeChunk(args):
+  """Scale & encode points[start:end].  Module-level so that process pools
+  can pickle it.
+  """
+  points, start, end, y_min, y_max, encoder = args
+  data = points[start:end]
+  if y_min is not None:
+    data = ScaleData(data, y_min, y_max, encoder.min, encoder.max)
+  return encoder.Encode(data)
+
+
+def _EncodeChunked(points, y_min, y_max, encoder):
+  """Scale & encode a chunked series one chunk at a time (in parallel, if it
+  has a pool).
+  """
+  tasks = [(points, start, min(start + points.chunk_size, len(points)),
+            y_min, y_max, encoder)
+           for start in xrange(0, len(points), points.chunk_size)]
+  return encoder.delimiter.join(points.Map(_EncodeChunk, tasks))
 
 
 def ScaleData(data, old_min, old_max, new_min, new_max):
   """Scale the input data so that the range old_min-old_max maps to
   new_min-new_max.
+
+  If data is a numpy array, the scaled data is returned as an array (with
+  NaN in place of None).  Otherwise a list is returned.
   """
   def ScalePoint(x):
     if x is None:
@@ -228,4 +544,6 @@ def ScaleData(data, old_min, old_max, new_min, new_max):
   else:
     scale = (new_max - new_min) / float(old_max - old_min)
   translate = new_min - scale * old_min
+  if numpy is not None and isinstance(data, numpy.ndarray):
+    return scale * data + translate
   return map(ScalePoint, data)
@@ -81,6 +81,50 @@ class EnhandedEncoderTest(graphy_test.GraphyTest):
   def testNoneDropped(self):
     self.assertEqual('__AJAI__AH', self.encoder.Encode([None, 9, 8, None, 7]))
 
+  def testCodeTableIsShared(self):
+    self.assertTrue(self.encoder.code is util.EnhancedDataEncoder().code)
+    self.assertEqual(4096, len(self.encoder.code))
+
+
+class TextEncoderTest(graphy_test.GraphyTest):
+
+  def testEncode(self):
+    encoder = util.TextDataEncoder(1)
+    self.assertEqual('0,12.5,100,-1,-1,0,3.3',
+                     encoder.Encode([0, 12.5, 100, None, 100.1, -0.01, 3.33]))
+    self.assertEqual('0,13,100', util.TextDataEncoder(0).Encode([0, 12.5, 100]))
+
+  def testEncodeData(self):
+    encoder = util.TextDataEncoder(0)
+    self.assertEqual({'data': 't:0,50,100|-1'},
+                     util.EncodeData(None, [[0, 1, 2], [None]], 0, 2, encoder))
+
+  def testPrecisionForPixels(self):
+    self.assertTrue(util.QuantizationError(util.SimpleDataEncoder(), 100) < 1)
+    self.assertTrue(util.QuantizationError(util.SimpleDataEncoder(), 150) > 1)
+    self.assertEqual(0, util.TextDecimalsForPixels(150))
+    self.assertEqual(1, util.TextDecimalsForPixels(250))
+    self.assertEqual(2, util.TextDecimalsForPixels(2500))
+
+
+class EncodeManyTest(graphy_test.GraphyTest):
+
+  def testSimple(self):
+    encoder = util.SimpleDataEncoder()
+    self.assertEqual(['AB', '', '_9_'],
+                     encoder.EncodeMany([[0, 1], [], [None, 61, 62]]))
+
+  def testEnhanced(self):
+    encoder = util.EnhancedDataEncoder()
+    self.assertEqual(['AAAB', '', '__..__'],
+                     encoder.EncodeMany([[0, 1], [], [None, 4095, 4096]]))
+
+  def testMatchesEncode(self):
+    series = [range(-3, 70), [1.5, None, 2.5], [0]]
+    for encoder in (util.SimpleDataEncoder(), util.EnhancedDataEncoder()):
+      self.assertEqual([encoder.Encode(s) for s in series],
+                       encoder.EncodeMany(series))
+
 
 class ScaleTest(graphy_test.GraphyTest):
 
@@ -128,6 +172,101 @@ class ScaleTest(graphy_test.GraphyTest):
     self.assertEqual(expected, actual)
 
 
+class VectorizedEncodingTest(graphy_test.NumpyTest):
+
+  """Test that the numpy code path matches the pure python one."""
+
+  def setUp(self):
+    graphy_test.NumpyTest.setUp(self)
+    self.data = [None, -1, -0.5, -0.49, 0, 0.5, 1.5, 2.5, 3.49999, 60.5,
+                 61, 61.49, 61.5, 62, 4094.5, 4095, 4095.5, 4096, None]
+
+  def testSimpleEncoderMatches(self):
+    encoder = util.SimpleDataEncoder()
+    self.assertEqual(encoder.Encode(self.data),
+                     encoder.Encode(util.numpy.array(self.data, dtype=float)))
+
+  def testEnhancedEncoderMatches(self):
+    encoder = util.EnhancedDataEncoder()
+    self.assertEqual(encoder.Encode(self.data),
+                     encoder.Encode(util.numpy.array(self.data, dtype=float)))
+
+  def testEmptyArray(self):
+    encoder = util.SimpleDataEncoder()
+    self.assertEqual('', encoder.Encode(util.numpy.array([])))
+
+  def testScaleArray(self):
+    data = [-3.14, None, 0, 2.72, 3.14]
+    expected = util.ScaleData(data, -3.14, 3.14, 0, 61)
+    actual = util.ScaleData(util.numpy.array(data, dtype=float),
+                            -3.14, 3.14, 0, 61)
+    self.assertTrue(util.numpy.isnan(actual[1]))
+    self.assertEqual(expected[:1] + expected[2:],
+                     list(actual[:1]) + list(actual[2:]))
+
+  def testEncodeDataMatchesPurePython(self):
+    series = [[x * 0.37 for x in range(-50, 300)], [1, None, 3], []]
+    for encoder in (util.SimpleDataEncoder(), util.EnhancedDataEncoder()):
+      expected = [encoder.Encode(util.ScaleData(s, -7, 90, encoder.min,
+                                                encoder.max))
+                  for s in series]
+      expected = encoder.prefix + ','.join(expected)
+      actual = util.EncodeData(None, series, -7, 90, encoder)
+      self.assertEqual(expected, actual['data'])
+
+
+class EncodeUrlTest(graphy_test.GraphyTest):
+
+  def testEscapeValues(self):
+    self.assertEqual(['s:A,B', 'a%7Cb%20c', '', '%26%3D%2B%23%25', 'x%00y'],
+                     util.EscapeValues(['s:A,B', 'a|b c', '', '&=+#%',
+                                        'x\x00y']))
+    self.assertEqual([], util.EscapeValues([]))
+
+  def testCanonicalOrder(self):
+    params = {'chs': '10x10', 'cht': 'lc', 'chd': 's:AB', 'chdl': 'a|b',
+              'chtt': ''}
+    url = util.EncodeUrl('http://x', params, True, False, canonical=True)
+    self.assertEqual('http://x?chd=s:AB&chdl=a%7Cb&chs=10x10&cht=lc', url)
+    reordered = dict(reversed(sorted(params.items())))
+    self.assertEqual(url, util.EncodeUrl('http://x', reordered, True, False,
+                                         canonical=True))
+
+
+class FormatNumberTest(graphy_test.GraphyTest):
+
+  def testFormatNumber(self):
+    self.assertEqual('-10.45', util.FormatNumber(-10.450000000000001))
+    self.assertEqual('0.3', util.FormatNumber(0.1 + 0.2))
+    self.assertEqual('12', util.FormatNumber(12.0))
+    self.assertEqual('12', util.FormatNumber(12))
+    self.assertEqual('0', util.FormatNumber(-0.0))
+    self.assertEqual('0.00001', util.FormatNumber(1e-05))
+    self.assertEqual('123457', util.FormatNumber(123456.7, digits=6))
+    self.assertEqual('1234570', util.FormatNumber(1234567.0, digits=6))
+    self.assertEqual('0.333333', util.FormatNumber(1 / 3.0, digits=6))
+    self.assertEqual('abc', util.FormatNumber('abc'))
+    self.assertEqual('nan', util.FormatNumber(float('nan')))
+
+  def testExtremes(self):
+    self.assertEqual('1e+300', util.FormatNumber(1e300))
+    self.assertEqual('-1.23457e+300', util.FormatNumber(-1.234567e300, 6))
+    self.assertEqual('4.94065645841e-324', util.FormatNumber(5e-324))
+    self.assertEqual('0.000000001', util.FormatNumber(1e-9, digits=6))
+    self.assertEqual('1.23e+30', util.FormatNumber(1.234e30, resolution=1e28))
+    self.assertEqual('0', util.FormatNumber(1e-300, resolution=0.01))
+
+  def testResolution(self):
+    self.assertEqual('-10.5', util.FormatNumber(-10.4999, resolution=0.1))
+    self.assertEqual('1230', util.FormatNumber(1234.5, resolution=10))
+    # The shorter of the two wins.
+    self.assertEqual('3.1', util.FormatNumber(3.14159, digits=2,
+                                              resolution=0.001))
+
+  def testStrJoin(self):
+    self.assertEqual('a|0.3|2', util.StrJoin('|', ['a', 0.1 + 0.2, 2]))
+
+
 class NameTest(graphy_test.GraphyTest):
 
   """Test long/short parameter names."""
@@ -0,0 +1,51 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Backend which draws charts as bitmaps, in-process.  Requires numpy.
+
+chart.display.Png(width, height) returns the contents of a PNG file, and
+chart.display.Pixels(width, height) the pixels, as a numpy array.  Text
+(axis labels, pie labels & the legend) isn't drawn.
+"""
+
+from graphy import line_chart
+from graphy import bar_chart
+from graphy import pie_chart
+from graphy.backends.raster import renderers
+
+def _GetChartFactory(chart_class, display_class):
+  """Create a factory method for instantiating charts with displays.
+
+  Returns a method which, when called, will create & return a chart with
+  chart.display already populated.
+  """
+  def Inner(*args, **kwargs):
+    chart = chart_class(*args, **kwargs)
+    chart.display = display_class(chart)
+    return chart
+  return Inner
+
+# These helper methods make it easy to get chart objects with display
+# objects already setup.  For example, this:
+#   chart = raster.LineChart()
+# is equivalent to:
+#   chart = line_chart.LineChart()
+#   chart.display = raster.renderers.LineChartRenderer(chart)
+LineChart = _GetChartFactory(line_chart.LineChart, renderers.LineChartRenderer)
+Sparkline = _GetChartFactory(line_chart.Sparkline,
+                             renderers.SparklineRenderer)
+BarChart  = _GetChartFactory(bar_chart.BarChart, renderers.BarChartRenderer)
+PieChart  = _GetChartFactory(pie_chart.PieChart, renderers.PieChartRenderer)
@@ -0,0 +1,277 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An in-memory RGB pixel buffer to draw shapes into, and a PNG writer.
+
+Each shape is rasterized into a coverage mask (how much of each pixel the
+shape covers, from 0 to 1) with numpy, all pixels at once, and then blended
+onto the buffer in its color.  Requires numpy.
+"""
+
+import math
+import struct
+import zlib
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
+def _Rgba(color):
+  """Return (array of r, g & b, alpha) for a color hex string, which may
+  include an alpha channel ('rrggbbaa').
+  """
+  if color is None:
+    color = '000000'
+  rgb = numpy.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], float)
+  alpha = 1.0
+  if len(color) == 8:
+    alpha = int(color[6:], 16) / 255.0
+  return rgb, alpha
+
+
+class Canvas(object):
+
+  """An RGB pixel buffer, with (x, y) coordinates in pixels from the top left
+  corner of the image.  Pixel (i, j) covers x from i to i + 1 and y from j to
+  j + 1.
+
+  Object attributes:
+    width, height: The size of the image, in pixels.
+    antialias: If True, pixels on the edges of shapes are blended in
+               proportion to how much of them the shape covers.  Otherwise
+               each pixel is either covered or not, which is faster.
+  """
+
+  # Samples per pixel along each axis, when antialiasing pie wedges.
+  _SUBSAMPLES = 4
+  # Samples per pixel along lines.
+  _LINE_SAMPLES = 4
+
+  def __init__(self, width, height, background='ffffff', antialias=True):
+    if numpy is None:
+      raise ImportError('Canvas requires numpy')
+    self.width = width
+    self.height = height
+    self.antialias = antialias
+    self._pixels = numpy.empty((height, width, 3))
+    self._pixels[:] = _Rgba(background or 'ffffff')[0]
+
+  def _Blend(self, top, left, coverage, color):
+    """Blend color onto the pixels from (left, top) on, in proportion to
+    coverage (a 2-D array of 0 to 1).
+    """
+    rgb, alpha = _Rgba(color)
+    height, width = coverage.shape
+    region = self._pixels[top:top + height, left:left + width]
+    region += (rgb - region) * (coverage * alpha)[:, :, numpy.newaxis]
+
+  def _Span(self, start, end, size):
+    """Return (first pixel, coverage of each pixel) of the pixels covered by
+    [start, end) along an axis with size pixels, or (0, None) if none are.
+    """
+    if not self.antialias:
+      # Snap to whole pixels, but don't let thin shapes disappear.
+      covered = end > start
+      start, end = round(start), round(end)
+      if covered and end == start:
+        end = start + 1
+    first = max(int(math.floor(start)), 0)
+    last = min(int(math.ceil(end)), size)
+    if last <= first:
+      return 0, None
+    pixels = numpy.arange(first, last)
+    coverage = (numpy.minimum(pixels + 1, end) -
+                numpy.maximum(pixels, start)).clip(0, 1)
+    return first, coverage
+
+  def FillRect(self, x, y, width, height, color):
+    """Fill a rectangle with color."""
+    left, columns = self._Span(x, x + width, self.width)
+    top, rows = self._Span(y, y + height, self.height)
+    if columns is None or rows is None:
+      return
+    self._Blend(top, left, numpy.outer(rows, columns), color)
+
+  def DrawLines(self, x0, y0, x1, y1, color, width=1):
+    """Draw line segments from (x0[i], y0[i]) to (x1[i], y1[i]).
+
+    Each segment is sampled every 1 / _LINE_SAMPLES pixels, and the pixels
+    around each sample are covered according to their distance from it, so
+    the cost is proportional to the total length of the lines.
+
+    Args:
+      x0, y0, x1, y1: Arrays with the coordinates of the ends of the segments.
+      color: The color of the lines (hex string).
+      width: The width of the lines, in pixels.
+    """
+    x0, y0, x1, y1 = [numpy.asarray(a, float) for a in (x0, y0, x1, y1)]
+    if not len(x0):
+      return
+    dx = x1 - x0
+    dy = y1 - y0
+    steps = numpy.ceil(numpy.hypot(dx, dy) * self._LINE_SAMPLES).astype(int)
+    steps = numpy.maximum(steps, 1)
+    # Sample each segment at steps + 1 evenly spaced points (including both
+    # ends).
+    counts = steps + 1
+    segment = numpy.repeat(numpy.arange(len(x0)), counts)
+    starts = numpy.cumsum(counts) - counts
+    t = (numpy.arange(counts.sum()) - starts[segment]) / steps[segment].astype(
+        float)
+    xs = x0[segment] + t * dx[segment]
+    ys = y0[segment] + t * dy[segment]
+
+    radius = width / 2.0
+    reach = int(math.ceil(radius + 0.5))
+    base_x = numpy.floor(xs).astype(int)
+    base_y = numpy.floor(ys).astype(int)
+    indices = []
+    values = []
+    for offset_y in xrange(-reach, reach + 1):
+      for offset_x in xrange(-reach, reach + 1):
+        px = base_x + offset_x
+        py = base_y + offset_y
+        distance = numpy.hypot(px + 0.5 - xs, py + 0.5 - ys)
+        if self.antialias:
+          coverage = (radius + 0.5 - distance).clip(0, 1)
+        else:
+          coverage = (distance <= max(radius, 0.5)).astype(float)
+        keep = ((coverage > 0) & (px >= 0) & (px < self.width) &
+                (py >= 0) & (py < self.height))
+        indices.append(py[keep] * self.width + px[keep])
+        values.append(coverage[keep])
+    indices = numpy.concatenate(indices)
+    values = numpy.concatenate(values)
+    if not len(indices):
+      return
+    # Several samples cover most pixels; each pixel gets the best coverage.
+    order = numpy.lexsort((values, indices))
+    indices = indices[order]
+    values = values[order]
+    last = numpy.ones(len(indices), bool)
+    last[:-1] = indices[1:] != indices[:-1]
+    # Lines cover few of the pixels in their bounding box, so only those
+    # pixels are blended.
+    rgb, alpha = _Rgba(color)
+    pixels = self._pixels.reshape(-1, 3)
+    indices = indices[last]
+    pixels[indices] += ((rgb - pixels[indices]) *
+                        (values[last] * alpha)[:, numpy.newaxis])
+
+  def FillWedges(self, cx, cy, inner, outer, wedges):
+    """Fill the wedges of a ring (or of a pie, if inner is 0) centered on
+    (cx, cy).
+
+    Args:
+      cx, cy: The center.
+      inner, outer: The radii of the ring.
+      wedges: List of (start angle, sweep, color), with angles in radians
+              clockwise from 3 o'clock.  The wedges must follow each other
+              & sweep at most a full turn in all.
+    """
+    left, columns = self._Span(cx - outer, cx + outer, self.width)
+    top, rows = self._Span(cy - outer, cy + outer, self.height)
+    wedges = [wedge for wedge in wedges if wedge[1] > 0]
+    if columns is None or rows is None or not wedges:
+      return
+    start = wedges[0][0]
+    ends = numpy.cumsum([sweep for _, sweep, _ in wedges])
+
+    def WedgeIndex(x, y):
+      """The index of the wedge (x, y) is in, or len(wedges) for none."""
+      radius = numpy.hypot(x, y)
+      angle = (numpy.arctan2(y, x) - start) % (2 * math.pi)
+      index = numpy.searchsorted(ends, angle, side='right')
+      index[(radius >= outer) | (radius < inner)] = len(wedges)
+      return index, radius
+
+    x, y = numpy.meshgrid(numpy.arange(left, left + len(columns)) + 0.5 - cx,
+                          numpy.arange(top, top + len(rows)) + 0.5 - cy)
+    index, radius = WedgeIndex(x, y)
+    coverages = [(index == i).astype(float) for i in xrange(len(wedges))]
+
+    if self.antialias:
+      # Only pixels within a pixel of an edge can be partly covered, so only
+      # those are subsampled.
+      edge = ((abs(radius - outer) < 1) | (abs(radius - inner) < 1))
+      for angle in [start] + list(start + ends[:-1]):
+        along = x * math.cos(angle) + y * math.sin(angle)
+        across = abs(y * math.cos(angle) - x * math.sin(angle))
+        edge |= (along > -1) & (across < 1)
+      edge_y, edge_x = numpy.nonzero(edge)
+      samples = self._SUBSAMPLES
+      offsets = (numpy.arange(samples) + 0.5) / samples - 0.5
+      sub_x = (x[edge_y, edge_x][:, numpy.newaxis, numpy.newaxis] +
+               offsets[numpy.newaxis, :])
+      sub_y = (y[edge_y, edge_x][:, numpy.newaxis, numpy.newaxis] +
+               offsets[:, numpy.newaxis])
+      sub_x, sub_y = numpy.broadcast_arrays(sub_x, sub_y)
+      sub_index, _ = WedgeIndex(sub_x.reshape(len(edge_y), -1),
+                                sub_y.reshape(len(edge_y), -1))
+      for i, coverage in enumerate(coverages):
+        coverage[edge_y, edge_x] = (sub_index == i).mean(axis=1)
+
+    for (_, _, color), coverage in zip(wedges, coverages):
+      if coverage.any():
+        self._Blend(top, left, coverage, color)
+
+  def Pixels(self):
+    """Return the image as a (height, width, 3) array of 8-bit RGB values."""
+    return numpy.round(self._pixels).clip(0, 255).astype(numpy.uint8)
+
+
+def _PngChunk(kind, data):
+  """Return a PNG chunk: length, type, data & CRC."""
+  return (struct.pack('>I', len(data)) + kind + data +
+          struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+
+def EncodePng(pixels, compression=6):
+  """Encode an image as a PNG file.
+
+  Args:
+    pixels: A (height, width, 3) array of 8-bit RGB values, like
+            Canvas.Pixels() returns.
+    compression: The zlib compression level, from 0 (none) to 9 (best).
+  Returns:
+    The contents of the PNG file, as a string.
+  """
+  return ''.join(PngChunks(pixels, compression))
+
+
+def PngChunks(pixels, compression=6, rows_per_chunk=64):
+  """Encode an image as a PNG file, a band of rows at a time.  Yields the
+  pieces of the file, so the whole file (or a filtered copy of the pixels) is
+  never in memory at once.  Args are as for EncodePng().
+  """
+  height, width = pixels.shape[:2]
+  yield '\x89PNG\r\n\x1a\n'
+  yield _PngChunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0,
+                                      0))
+  compressor = zlib.compressobj(compression)
+  for top in xrange(0, height, rows_per_chunk):
+    band = pixels[top:top + rows_per_chunk]
+    # Each row starts with its filter type.  Charts are mostly runs of the
+    # same color, so even no filter (0) compresses well.
+    rows = numpy.zeros((len(band), width * 3 + 1), numpy.uint8)
+    rows[:, 1:] = band.reshape(len(band), width * 3)
+    data = compressor.compress(rows.tostring())
+    if data:
+      yield _PngChunk('IDAT', data)
+  yield _PngChunk('IDAT', compressor.flush())
+  yield _PngChunk('IEND', '')
@@ -0,0 +1,137 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the raster backend's pixel buffer & PNG writer."""
+
+import math
+import struct
+import zlib
+
+from graphy import graphy_test
+from graphy import util
+from graphy.backends.raster import canvas
+
+
+def _ImageData(png):
+  """Return the decompressed contents of the IDAT chunks of a PNG file."""
+  data = []
+  position = 8
+  while position < len(png):
+    length, kind = struct.unpack('>I4s', png[position:position + 8])
+    if kind == 'IDAT':
+      data.append(png[position + 8:position + 8 + length])
+    position += length + 12
+  return zlib.decompress(''.join(data))
+
+
+class WithoutNumpyTest(graphy_test.GraphyTest):
+
+  def testRequiresNumpy(self):
+    if util.numpy is not None:
+      self.skipTest('numpy is installed')
+    self.assertRaises(ImportError, canvas.Canvas, 10, 10)
+
+
+class CanvasTest(graphy_test.NumpyTest):
+
+  def setUp(self):
+    graphy_test.NumpyTest.setUp(self)
+    self.canvas = canvas.Canvas(10, 10)
+
+  def testBackground(self):
+    pixels = canvas.Canvas(2, 3, '102030').Pixels()
+    self.assertEqual((3, 2, 3), pixels.shape)
+    self.assertEqual([16, 32, 48], list(pixels[2, 1]))
+
+  def testFillRect(self):
+    self.canvas.FillRect(1, 2, 3, 4, '000000')
+    pixels = self.canvas.Pixels()
+    self.assertEqual([0, 0, 0], list(pixels[2, 1]))
+    self.assertEqual([0, 0, 0], list(pixels[5, 3]))
+    self.assertEqual([255, 255, 255], list(pixels[6, 3]))
+    self.assertEqual([255, 255, 255], list(pixels[2, 4]))
+
+  def testFillRectAntialias(self):
+    # Half of pixel (0, 0) is covered.
+    self.canvas.FillRect(0.5, 0, 1, 1, '000000')
+    self.assertEqual([128, 128, 128], list(self.canvas.Pixels()[0, 0]))
+    self.canvas = canvas.Canvas(10, 10, antialias=False)
+    self.canvas.FillRect(0.5, 0, 1, 1, '000000')
+    self.assertEqual([255, 255, 255], list(self.canvas.Pixels()[0, 0]))
+    self.assertEqual([0, 0, 0], list(self.canvas.Pixels()[0, 1]))
+
+  def testTranslucentColors(self):
+    self.canvas.FillRect(0, 0, 10, 10, '00000080')
+    self.assertEqual([127, 127, 127], list(self.canvas.Pixels()[5, 5]))
+
+  def testShapesAreClipped(self):
+    self.canvas.FillRect(-5, -5, 100, 7, 'ff0000')
+    self.canvas.DrawLines([-5], [8.5], [50], [8.5], '00ff00')
+    self.canvas.FillWedges(15, 15, 0, 9, [(0, 2 * math.pi, '0000ff')])
+    pixels = self.canvas.Pixels()
+    self.assertEqual([255, 0, 0], list(pixels[1, 1]))
+    self.assertEqual([0, 255, 0], list(pixels[8, 1]))
+    self.assertEqual([0, 0, 255], list(pixels[9, 9]))
+
+  def testDrawLines(self):
+    self.canvas.DrawLines([0, 5.5], [2.5, 0], [10, 5.5], [2.5, 10], '000000')
+    pixels = self.canvas.Pixels()
+    self.assertEqual([0, 0, 0], list(pixels[2, 8]))
+    self.assertEqual([0, 0, 0], list(pixels[8, 5]))
+    self.assertEqual([255, 255, 255], list(pixels[8, 8]))
+    # Overlapping samples don't darken the line.
+    self.assertEqual([0, 0, 0], list(pixels[2, 5]))
+
+  def testFillWedges(self):
+    # The right half red, the left half green, with a hole in the middle.
+    self.canvas.FillWedges(5, 5, 2, 5, [(-math.pi / 2, math.pi, 'ff0000'),
+                                        (math.pi / 2, math.pi, '00ff00')])
+    pixels = self.canvas.Pixels()
+    self.assertEqual([255, 0, 0], list(pixels[5, 8]))
+    self.assertEqual([0, 255, 0], list(pixels[5, 1]))
+    self.assertEqual([255, 255, 255], list(pixels[5, 5]))
+    self.assertEqual([255, 255, 255], list(pixels[0, 0]))
+    # Pixels on the edge are partly covered.
+    red, green, blue = pixels[0, 3]
+    self.assertTrue(0 < blue < 255)
+
+  def testEncodePng(self):
+    self.canvas.FillRect(0, 0, 1, 1, '102030')
+    png = canvas.EncodePng(self.canvas.Pixels())
+    self.assertEqual('\x89PNG\r\n\x1a\n', png[:8])
+    length, kind = struct.unpack('>I4s', png[8:16])
+    self.assertEqual(('IHDR', 13), (kind, length))
+    self.assertEqual((10, 10, 8, 2), struct.unpack('>IIBB', png[16:26]))
+    self.assertTrue(png.endswith('IEND\xaeB`\x82'))
+    rows = _ImageData(png)
+    self.assertEqual(10 * (10 * 3 + 1), len(rows))
+    self.assertEqual('\x00\x10\x20\x30\xff', rows[:5])
+
+  def testPngChunks(self):
+    pixels = canvas.Canvas(50, 200).Pixels()
+    pixels[150, 3] = 7
+    png = ''.join(canvas.PngChunks(pixels, rows_per_chunk=16))
+    self.assertEqual(canvas.EncodePng(pixels), png)
+    self.assertTrue(png.count('IDAT') > 1)
+    rows = _ImageData(png)
+    self.assertEqual(200 * (50 * 3 + 1), len(rows))
+    row = rows[150 * 151:151 * 151]
+    self.assertEqual('\x00', row[0])
+    self.assertEqual('\x07\x07\x07', row[10:13])
+
+
+if __name__ == '__main__':
+  graphy_test.main()
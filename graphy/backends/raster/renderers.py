@@ -0,0 +1,196 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Display objects which draw the different kinds of charts into pixel
+buffers, and encode them as PNG.
+
+They lay the charts out like the SVG backend (so they share its attributes,
+like padding & background), but draw no text: there's no font to draw it
+with, so axis labels, pie labels & the legend are left out.
+
+Not intended for end users, use the methods in __init__ instead."""
+
+import math
+
+from graphy import common
+from graphy import util
+from graphy.backends.raster import canvas
+from graphy.backends.svg import renderers as svg_renderers
+
+
+class BaseChartRenderer(svg_renderers.BaseChartRenderer):
+
+  """Base class for renderers which draw chart objects into pixel buffers.
+  Requires numpy.
+
+  Object attributes:
+    antialias: If True, the edges of lines & shapes are smoothed.  Default is
+               True.
+    compression: The zlib compression level of the PNGs, from 0 to 9.
+  """
+
+  def __init__(self, chart=None):
+    super(BaseChartRenderer, self).__init__(chart)
+    self.antialias = True
+    self.compression = 6
+
+  def Pixels(self, width, height, chart=None):
+    """Draw our chart, and return it as a (height, width, 3) numpy array of
+    8-bit RGB values.
+
+    Like the other backends, rendering doesn't modify the renderer or the
+    chart.
+
+    Args:
+      width, height: The size of the image, in pixels.
+      chart: The chart to render.  Defaults to self.chart.
+    """
+    if chart is None:
+      chart = self.chart
+    context = common.RenderContext(width, height)
+    chart = chart._GetFormattedView(context)
+    plot, _ = self._Layout(chart, context)
+    image = canvas.Canvas(width, height, self.background, self.antialias)
+    lines = self._GridLines(chart, plot)
+    if lines:
+      x0, y0, x1, y1 = zip(*[self._GridLine(plot, fraction, vertical)
+                             for fraction, vertical in lines])
+      image.DrawLines(x0, y0, x1, y1, self.grid_color)
+    self._Draw(image, chart, plot)
+    return image.Pixels()
+
+  def Png(self, width, height, chart=None):
+    """Draw our chart, and return it as the contents of a PNG file.  Args
+    are as for Pixels().
+    """
+    return canvas.EncodePng(self.Pixels(width, height, chart),
+                            self.compression)
+
+  def WritePng(self, out, width, height, chart=None):
+    """Write our chart as a PNG file to out, a file-like object, a band of
+    rows at a time.  Args are as for Pixels().
+    """
+    for chunk in canvas.PngChunks(self.Pixels(width, height, chart),
+                                  self.compression):
+      out.write(chunk)
+
+  def _GridLine(self, plot, fraction, vertical):
+    """Return the ends of a gridline, as (x0, y0, x1, y1)."""
+    if vertical:
+      x = plot.X(fraction)
+      return x, plot.top, x, plot.top + plot.height
+    y = plot.Y(fraction)
+    return plot.left, y, plot.left + plot.width, y
+
+  def _VisibleAxes(self, chart):
+    return []
+
+  def _LegendEntries(self, chart):
+    return []
+
+  def _Draw(self, image, chart, plot):
+    """Draw the chart's data onto image (a canvas.Canvas)."""
+    raise NotImplementedError
+
+
+class LineChartRenderer(BaseChartRenderer):
+
+  """Helper class to draw LineChart objects into pixel buffers.  Dashed line
+  patterns are drawn solid.
+  """
+
+  # The shapes which the SVG backend draws; the rest (fills, lines, text...)
+  # are left out, as they are there.
+  _MARKER_SHAPES = frozenset([common.Marker.arrow, common.Marker.cross,
+                              common.Marker.diamond, common.Marker.circle,
+                              common.Marker.square, common.Marker.x])
+
+  def _Draw(self, image, chart, plot):
+    numpy = util.numpy
+    low, high = self._ValueRange(chart)
+    span = float(high - low)
+    for series in chart.data:
+      points = util.AsFloatArray(series._data)
+      if not len(points):
+        continue
+      step = plot.width / float(max(len(points) - 1, 1))
+      xs = plot.left + numpy.arange(len(points)) * step
+      ys = plot.Y((points - low) / span)
+      # Only join neighbours which are both there.
+      keep = ~(numpy.isnan(ys[:-1]) | numpy.isnan(ys[1:]))
+      image.DrawLines(xs[:-1][keep], ys[:-1][keep], xs[1:][keep],
+                      ys[1:][keep], series.style.color, series.style.width)
+      for x, marker in series.markers:
+        if marker.shape not in self._MARKER_SHAPES:
+          continue
+        index = int(round(x))
+        if 0 <= index < len(points) and not numpy.isnan(ys[index]):
+          self._DrawMarker(image, marker, plot.left + x * step, ys[index])
+
+  def _DrawMarker(self, image, marker, x, y):
+    """Draw a marker centered on (x, y).  Squares are drawn as squares, and
+    the other shapes as circles.
+    """
+    r = marker.size / 2.0
+    if marker.shape == common.Marker.square:
+      image.FillRect(x - r, y - r, 2 * r, 2 * r, marker.color)
+    else:
+      image.FillWedges(x, y, 0, r, [(0, 2 * math.pi, marker.color)])
+
+
+class SparklineRenderer(LineChartRenderer):
+
+  """Helper class to draw Sparkline objects into pixel buffers."""
+
+  def __init__(self, chart=None):
+    super(SparklineRenderer, self).__init__(chart)
+    self.padding = 0
+
+
+class BarChartRenderer(BaseChartRenderer, svg_renderers.BarChartRenderer):
+
+  """Helper class to draw BarChart objects into pixel buffers."""
+
+  def _Draw(self, image, chart, plot):
+    for series, rects in self._Bars(chart, plot):
+      for x, y, width, height in rects:
+        image.FillRect(x, y, width, height, series.style.color)
+
+
+class PieChartRenderer(BaseChartRenderer, svg_renderers.PieChartRenderer):
+
+  """Helper class to draw PieChart objects into pixel buffers.
+
+  Object attributes:
+    angle:  Angle of rotation of the pies, in radians (clockwise).
+    colors: The colors (hex strings) to cycle through for segments without
+            one.
+  """
+
+  def __init__(self, chart=None, angle=None):
+    super(PieChartRenderer, self).__init__(chart)
+    self.angle = angle
+
+  def _Radius(self, plot, outer_pie):
+    # There are no labels to leave room for.
+    return max(min(plot.width, plot.height) / 2.0, 1)
+
+  def _Draw(self, image, chart, plot):
+    cx, cy = plot.X(0.5), plot.Y(0.5)
+    for inner, outer, wedges in self._Rings(chart, plot):
+      image.FillWedges(cx, cy, inner, outer,
+                       [(start, sweep, color)
+                        for _, color, start, sweep in wedges])
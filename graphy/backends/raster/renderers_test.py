@@ -0,0 +1,184 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the raster backend."""
+
+import StringIO
+
+from graphy import common
+from graphy import formatters
+from graphy import graphy_test
+from graphy import util
+from graphy.backends import raster
+
+WHITE = [255, 255, 255]
+RED = [255, 0, 0]
+BLUE = [0, 0, 255]
+
+
+class RasterTest(graphy_test.NumpyTest):
+
+  def Pixel(self, chart, x, y, width=100, height=50):
+    """Render the chart & return the color of pixel (x, y)."""
+    return list(chart.display.Pixels(width, height)[y, x])
+
+
+class WithoutNumpyTest(graphy_test.GraphyTest):
+
+  def testRequiresNumpy(self):
+    if util.numpy is not None:
+      self.skipTest('numpy is installed')
+    chart = raster.LineChart([1, 2])
+    self.assertRaises(ImportError, chart.display.Png, 100, 50)
+
+
+class LineChartTest(RasterTest):
+
+  def setUp(self):
+    RasterTest.setUp(self)
+    self.chart = raster.LineChart()
+    self.chart.display.padding = 0
+    self.chart.auto_scale.buffer = 0
+
+  def testLine(self):
+    self.chart.AddLine([0, 0, None, 1, 1], color='ff0000', width=4)
+    pixels = self.chart.display.Pixels(100, 50)
+    self.assertEqual((50, 100, 3), pixels.shape)
+    self.assertEqual(RED, list(pixels[49, 12]))
+    self.assertEqual(RED, list(pixels[0, 87]))
+    self.assertEqual(WHITE, list(pixels[25, 12]))
+    # Missing points leave a gap in the line.
+    self.assertEqual(WHITE, list(pixels[49, 37]))
+    self.assertEqual(WHITE, list(pixels[0, 62]))
+
+  def testMarkers(self):
+    self.chart.AddLine([0, 1, 2], color='ffffff', markers=[
+        (1, common.Marker(common.Marker.circle, 'ff0000', 10)),
+        (2, common.Marker(common.Marker.square, '0000ff', 10))])
+    self.assertEqual(RED, self.Pixel(self.chart, 50, 27))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 97, 3))
+
+  def testSkipsMarkersWhichAreNotShapes(self):
+    self.chart.AddLine([0, 1, 2], color='ffffff', markers=[
+        (1, common.Marker('r', 'ff0000', 10)),
+        (1, common.Marker('tlabel', 'ff0000', 10)),
+        (1, common.Marker('V', 'ff0000', 10))])
+    self.assertEqual(WHITE, self.Pixel(self.chart, 50, 25))
+
+  def testGridlines(self):
+    self.chart.AddLine([1, 2], color='ffffff')
+    self.chart.bottom.min = 0
+    self.chart.bottom.max = 4
+    self.chart.bottom.grid_spacing = 2
+    self.chart.display.grid_color = '0000ff'
+    self.chart.display.antialias = False
+    self.assertEqual(BLUE, self.Pixel(self.chart, 50, 10))
+    self.assertEqual(WHITE, self.Pixel(self.chart, 60, 10))
+
+  def testRenderingDoesNotModifyChart(self):
+    self.chart.AddLine([1, 2], label='a')
+    self.chart.AddFormatter(formatters.InlineLegend)
+    before = self.chart.version
+    self.chart.display.Png(100, 50)
+    self.assertEqual(before, self.chart.version)
+    self.assertEqual(None, self.chart.data[0].style.color)
+
+  def testPng(self):
+    self.chart.AddLine([1, 2])
+    png = self.chart.display.Png(100, 50)
+    self.assertEqual('\x89PNG\r\n\x1a\n', png[:8])
+    self.assertEqual('\x00\x00\x00\x64\x00\x00\x00\x32', png[16:24])
+
+  def testWritePng(self):
+    self.chart.AddLine([1, 2])
+    out = StringIO.StringIO()
+    self.chart.display.WritePng(out, 100, 150)
+    self.assertEqual(self.chart.display.Png(100, 150), out.getvalue())
+
+  def testSparkline(self):
+    chart = raster.Sparkline([0, 1])
+    chart.data[0].style.color = 'ff0000'
+    chart.data[0].style.width = 4
+    chart.auto_scale.buffer = 0
+    self.assertEqual(RED, self.Pixel(chart, 0, 9, 20, 10))
+
+
+class BarChartTest(RasterTest):
+
+  def setUp(self):
+    RasterTest.setUp(self)
+    self.chart = raster.BarChart([1, -1])
+    self.chart.AddBars([2, 1], color='0000ff')
+    self.chart.data[0].style.color = 'ff0000'
+    self.chart.display.padding = 0
+    self.chart.auto_scale.buffer = 0
+    self.chart.style.bar_thickness = 10
+    self.chart.style.bar_gap = 2
+    self.chart.style.group_gap = 4
+
+  def testGrouped(self):
+    # The values go from -1 to 2, so 0 is a third of the way up.
+    self.assertEqual(RED, self.Pixel(self.chart, 5, 25))
+    self.assertEqual(WHITE, self.Pixel(self.chart, 5, 10))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 17, 10))
+    self.assertEqual(RED, self.Pixel(self.chart, 31, 40))
+    self.assertEqual(WHITE, self.Pixel(self.chart, 90, 25))
+
+  def testHorizontal(self):
+    self.chart.vertical = False
+    self.assertEqual(RED, self.Pixel(self.chart, 50, 5))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 90, 17))
+    self.assertEqual(RED, self.Pixel(self.chart, 10, 31))
+
+  def testEmptyChart(self):
+    chart = raster.BarChart([])
+    self.assertEqual(WHITE, self.Pixel(chart, 50, 25))
+    self.assertTrue(chart.display.Png(100, 50).startswith('\x89PNG'))
+
+  def testAntialias(self):
+    self.chart.style.bar_thickness = 10.5
+    self.assertNotEqual(RED, self.Pixel(self.chart, 10, 25))
+    self.assertNotEqual(WHITE, self.Pixel(self.chart, 10, 25))
+    self.chart.display.antialias = False
+    self.assertTrue(self.Pixel(self.chart, 10, 25) in (RED, WHITE))
+
+
+class PieChartTest(RasterTest):
+
+  def setUp(self):
+    RasterTest.setUp(self)
+    self.chart = raster.PieChart([1, 1], colors=['ff0000', '0000ff'])
+    self.chart.display.padding = 0
+
+  def testSegments(self):
+    # The first segment starts at 3 o'clock & runs clockwise.
+    self.assertEqual(RED, self.Pixel(self.chart, 50, 45))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 50, 5))
+    self.assertEqual(WHITE, self.Pixel(self.chart, 5, 25))
+
+  def testAngle(self):
+    self.chart.display.angle = -3.14159265 / 2
+    self.assertEqual(RED, self.Pixel(self.chart, 70, 25))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 30, 25))
+
+  def testRings(self):
+    self.chart.AddPie([1], colors=['00ff00'])
+    self.assertEqual([0, 255, 0], self.Pixel(self.chart, 50, 2))
+    self.assertEqual(BLUE, self.Pixel(self.chart, 50, 20))
+
+
+if __name__ == '__main__':
+  graphy_test.main()
@@ -0,0 +1,712 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Display objects which draw the different kinds of charts as SVG.
+
+Not intended for end users, use the methods in __init__ instead."""
+
+import codecs
+import math
+from xml.sax import saxutils
+
+from graphy import bar_chart
+from graphy import common
+
+
+def _Num(value):
+  """Format a coordinate or length for the SVG, with at most 2 decimals."""
+  text = ('%.2f' % value).rstrip('0').rstrip('.')
+  if text == '-0':
+    return '0'
+  return text
+
+
+def _Paint(attribute, color):
+  """Return the attribute (like 'fill') for a color hex string, which may
+  include an alpha channel ('rrggbbaa').
+  """
+  if color is None:
+    color = '000000'
+  out = ' %s="#%s"' % (attribute, color[:6])
+  if len(color) == 8:
+    out += ' %s-opacity="%s"' % (attribute, _Num(int(color[6:], 16) / 255.0))
+  return out
+
+
+def _Missing(point):
+  """Return True if point marks missing data (None or NaN)."""
+  return point is None or point != point
+
+
+def _Chunks(pieces, size, encoding):
+  """Join pieces of a document into chunks of at least size characters (but
+  the last), encoded with encoding.
+  """
+  # One encoder for the whole document, so encodings with a byte-order mark
+  # (like utf-16) only write it once.
+  encoder = codecs.getincrementalencoder(encoding)()
+  buffered = []
+  length = 0
+  for piece in pieces:
+    buffered.append(piece)
+    length += len(piece)
+    if length >= size:
+      yield encoder.encode(''.join(buffered))
+      buffered = []
+      length = 0
+  last = encoder.encode(''.join(buffered), True)
+  if last:
+    yield last
+
+
+class _PlotArea(object):
+
+  """The rectangle the data is drawn in, in pixels from the top left."""
+
+  __slots__ = ('left', 'top', 'width', 'height')
+
+  def __init__(self, left, top, width, height):
+    self.left = left
+    self.top = top
+    self.width = max(width, 1)
+    self.height = max(height, 1)
+
+  def X(self, fraction):
+    """Return the x-coordinate of a fraction of the width, from the left."""
+    return self.left + fraction * self.width
+
+  def Y(self, fraction):
+    """Return the y-coordinate of a fraction of the height, from the bottom."""
+    return self.top + (1 - fraction) * self.height
+
+
+class BaseChartRenderer(object):
+
+  """Base class for renderers which draw chart objects as SVG documents.
+
+  The chart is formatted by its formatters first, just like for the Google
+  Chart API backend, so AutoColor, AutoScale, AutoLegend & the other
+  formatters work the same.  Only axes with labels are drawn.
+
+  Object attributes:
+    font_size:   Size of the text, in pixels.
+    font_family: CSS font family of the text.
+    background:  Color of the background (hex string), or None for a
+                 transparent one.
+    text_color:  Color of the axes & their labels.
+    grid_color:  Color of the gridlines.
+    padding:     Space around the chart, in pixels.
+  """
+
+  # Characters per chunk, when streaming documents.
+  _CHUNK_SIZE = 16384
+
+  def __init__(self, chart=None):
+    self.chart = chart
+    self.font_size = 11
+    self.font_family = 'sans-serif'
+    self.background = 'ffffff'
+    self.text_color = '666666'
+    self.grid_color = 'cccccc'
+    self.padding = 4
+
+  def Svg(self, width, height, chart=None):
+    """Get the SVG document for our chart.
+
+    Like the Google Chart API encoders, rendering doesn't modify the renderer
+    or the chart, so it is safe to render from several threads at once, and
+    one renderer can be shared by many charts (of the type it is for), by
+    passing them in as chart.
+
+    Args:
+      width, height: The size of the image, in pixels.
+      chart: The chart to render.  Defaults to self.chart.
+    """
+    return ''.join(self._Pieces(width, height, chart))
+
+  def SvgChunks(self, width, height, chart=None, encoding='utf-8'):
+    """Get the SVG document for our chart as an iterator of encoded strings
+    (like a WSGI application returns), which are made as they are asked for.
+    The whole document is never in memory at once, however many points the
+    chart has.
+
+    Args:
+      width, height: The size of the image, in pixels.
+      chart: The chart to render.  Defaults to self.chart.
+      encoding: The encoding of the strings.
+    """
+    return _Chunks(self._Pieces(width, height, chart), self._CHUNK_SIZE,
+                   encoding)
+
+  def WriteSvg(self, out, width, height, chart=None, encoding='utf-8'):
+    """Write the SVG document for our chart to out, a file-like object, a
+    chunk at a time.  Args are as for SvgChunks().
+    """
+    for chunk in self.SvgChunks(width, height, chart, encoding):
+      out.write(chunk)
+
+  def _Pieces(self, width, height, chart):
+    """Yield the pieces of the SVG document for chart (or self.chart)."""
+    if chart is None:
+      chart = self.chart
+    context = common.RenderContext(width, height)
+    return self._Elements(chart._GetFormattedView(context), context)
+
+  def _Elements(self, chart, context):
+    """Yield the pieces of the SVG document for the formatted chart."""
+    plot, axes = self._Layout(chart, context)
+    yield ('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" '
+           'viewBox="0 0 %d %d" font-family=%s font-size="%s">' %
+           (context.width, context.height, context.width, context.height,
+            saxutils.quoteattr(self.font_family), _Num(self.font_size)))
+    if self.background:
+      yield ('<rect width="100%%" height="100%%"%s/>' %
+             _Paint('fill', self.background))
+    for part in (self._Grid(chart, plot), self._Data(chart, plot),
+                 self._Axes(chart, plot, axes), self._Legend(chart, plot)):
+      for piece in part:
+        yield piece
+    yield '</svg>'
+
+  def _TextWidth(self, text):
+    """Estimate the width of text, in pixels."""
+    return len(unicode(text)) * self.font_size * 0.6
+
+  def _VisibleAxes(self, chart):
+    """Return the (position code, Axis) pairs of the axes to draw."""
+    return [(code, axis) for code, axis in chart._GetAxes() if axis.labels]
+
+  def _LegendEntries(self, chart):
+    """Return (label, color) pairs for the legend."""
+    if not chart._show_legend:
+      return []
+    colors = [series.style.color for series in chart.data]
+    return zip(chart._legend_labels, colors)
+
+  def _Layout(self, chart, context):
+    """Make room around the plot area for the axes & legend.
+
+    Returns:
+      (_PlotArea, list of (position code, Axis, distance from the plot area))
+    """
+    margins = dict((code, self.padding)
+                   for code in common.BaseChart._POSITION_CODES)
+    line_height = self.font_size + 4
+    axes = []
+    for code, axis in self._VisibleAxes(chart):
+      axes.append((code, axis, margins[code] - self.padding))
+      if code in 'xt':
+        margins[code] += line_height
+      else:
+        margins[code] += max(self._TextWidth(label)
+                             for label in axis.labels) + 6
+    entries = self._LegendEntries(chart)
+    if entries:
+      margins['r'] += 20 + max(self._TextWidth(label) for label, _ in entries)
+    plot = _PlotArea(margins['y'], margins['t'],
+                     context.width - margins['y'] - margins['r'],
+                     context.height - margins['t'] - margins['x'])
+    return plot, axes
+
+  def _ValueRange(self, chart):
+    """Return the (min, max) values shown by the dependent axis."""
+    axis = chart.GetDependentAxis()
+    low, high = axis.min, axis.max
+    if low is None or high is None:
+      data_low, data_high = chart.GetMinMaxValues()
+      if low is None:
+        low = data_low
+      if high is None:
+        high = data_high
+    if low is None or high is None:
+      return 0, 1
+    if low == high:
+      return low - 1, high + 1
+    return low, high
+
+  def _LabelFractions(self, chart, plot, code, axis):
+    """Return (fraction of the axis' length, label) pairs for an axis."""
+    labels = axis.labels
+    if axis.label_positions:
+      low, high = axis.min, axis.max
+      if low is None or high is None:
+        low, high = 0, 100  # The scale used when the axis has no range.
+      span = float(high - low) or 1
+      return [((position - low) / span, label)
+              for position, label in zip(axis.label_positions, labels)]
+    if len(labels) == 1:
+      return [(0.5, labels[0])]
+    return [(i / float(len(labels) - 1), label)
+            for i, label in enumerate(labels)]
+
+  def _Axes(self, chart, plot, axes):
+    """Yield the axis lines & labels."""
+    if not axes:
+      return
+    yield '<g%s%s>' % (_Paint('fill', self.text_color),
+                       _Paint('stroke', self.text_color))
+    size = self.font_size
+    for code, axis, offset in axes:
+      fractions = self._LabelFractions(chart, plot, code, axis)
+      if code in 'xt':
+        if code == 'x':
+          y = plot.top + plot.height + offset
+          text_y = y + size + 1
+        else:
+          y = plot.top - offset
+          text_y = y - 4
+        yield '<path fill="none" d="M%s %sH%s"/>' % (
+            _Num(plot.left), _Num(y), _Num(plot.left + plot.width))
+        for fraction, label in fractions:
+          yield ('<text x="%s" y="%s" stroke="none" text-anchor="middle">%s'
+                 '</text>' % (_Num(plot.X(fraction)), _Num(text_y),
+                              saxutils.escape(unicode(label))))
+      else:
+        if code == 'y':
+          x = plot.left - offset
+          text_x, anchor = x - 4, 'end'
+        else:
+          x = plot.left + plot.width + offset
+          text_x, anchor = x + 4, 'start'
+        yield '<path fill="none" d="M%s %sV%s"/>' % (
+            _Num(x), _Num(plot.top), _Num(plot.top + plot.height))
+        for fraction, label in fractions:
+          text_y = plot.Y(fraction) + size * 0.35
+          yield ('<text x="%s" y="%s" stroke="none" text-anchor="%s">%s'
+                 '</text>' % (_Num(text_x), _Num(text_y), anchor,
+                              saxutils.escape(unicode(label))))
+    yield '</g>'
+
+  def _GridLines(self, chart, plot):
+    """Return the gridlines, as (fraction, vertical) pairs: the ones set by
+    grid_spacing on the bottom & left axes, and the ones for labels with
+    label_gridlines set.  Vertical lines are a fraction of the width from the
+    left, horizontal ones a fraction of the height from the bottom.
+    """
+    lines = []
+    for axis, vertical in ((chart.bottom, True), (chart.left, False)):
+      if axis.grid_spacing and axis.min is not None and axis.max is not None:
+        span = float(axis.max - axis.min)
+        if span:
+          count = int(abs(span) / axis.grid_spacing)
+          fractions = [i * axis.grid_spacing / abs(span)
+                       for i in xrange(1, count + 1)]
+          lines.extend((fraction, vertical) for fraction in fractions
+                       if fraction < 1)
+    for code, axis in self._VisibleAxes(chart):
+      if axis.label_gridlines:
+        lines.extend((fraction, code in 'xt') for fraction, _ in
+                     self._LabelFractions(chart, plot, code, axis))
+    return lines
+
+  def _Grid(self, chart, plot):
+    """Yield the gridlines."""
+    lines = self._GridLines(chart, plot)
+    if not lines:
+      return
+    path = []
+    for fraction, vertical in lines:
+      if vertical:
+        path.append('M%s %sV%s' % (_Num(plot.X(fraction)), _Num(plot.top),
+                                   _Num(plot.top + plot.height)))
+      else:
+        path.append('M%s %sH%s' % (_Num(plot.left), _Num(plot.Y(fraction)),
+                                   _Num(plot.left + plot.width)))
+    yield ('<path fill="none"%s stroke-dasharray="4,4" d="%s"/>' %
+           (_Paint('stroke', self.grid_color), ''.join(path)))
+
+  def _Legend(self, chart, plot):
+    """Yield the legend, to the right of the chart."""
+    entries = self._LegendEntries(chart)
+    if not entries:
+      return
+    # The legend goes outside of the axes on the right.
+    x = plot.left + plot.width
+    for code, axis in self._VisibleAxes(chart):
+      if code == 'r':
+        x += max(self._TextWidth(label) for label in axis.labels) + 6
+    x += 8
+    y = plot.top
+    line_height = self.font_size + 4
+    yield '<g>'
+    for label, color in entries:
+      yield '<rect x="%s" y="%s" width="8" height="8"%s/>' % (
+          _Num(x), _Num(y + 1), _Paint('fill', color))
+      yield '<text x="%s" y="%s"%s>%s</text>' % (
+          _Num(x + 12), _Num(y + 9), _Paint('fill', self.text_color),
+          saxutils.escape(unicode(label)))
+      y += line_height
+    yield '</g>'
+
+  def _Data(self, chart, plot):
+    """Yield the elements which show the chart's data."""
+    raise NotImplementedError
+
+
+class LineChartRenderer(BaseChartRenderer):
+
+  """Helper class to draw LineChart objects as SVG."""
+
+  # Points per chunk of path data.
+  _PATH_CHUNK = 1024
+
+  def _Data(self, chart, plot):
+    low, high = self._ValueRange(chart)
+    span = float(high - low)
+    for series in chart.data:
+      points = series._data
+      if not len(points):
+        continue
+      style = series.style
+      attributes = _Paint('stroke', style.color)
+      attributes += ' stroke-width="%s"' % _Num(style.width)
+      if style.off:
+        attributes += ' stroke-dasharray="%s,%s"' % (_Num(style.on),
+                                                     _Num(style.off))
+      # The path data comes in chunks, so long series aren't held in memory
+      # as one string.
+      started = False
+      for commands in self._PathData(points, plot, low, span):
+        if not started:
+          yield '<path fill="none"%s d="' % attributes
+          started = True
+        yield commands
+      if started:
+        yield '"/>'
+      for piece in self._Markers(series, plot, low, span):
+        yield piece
+
+  def _PathData(self, points, plot, low, span):
+    """Yield the path commands for a line through the points, joined into a
+    string per _PATH_CHUNK points.  Missing points leave a gap in the line.
+    """
+    step = plot.width / float(max(len(points) - 1, 1))
+    command = 'M'
+    for start in xrange(0, len(points), self._PATH_CHUNK):
+      commands = []
+      for i, point in enumerate(points[start:start + self._PATH_CHUNK],
+                                start):
+        if _Missing(point):
+          command = 'M'
+          continue
+        commands.append('%s%s %s' % (command, _Num(plot.left + i * step),
+                                     _Num(plot.Y((point - low) / span))))
+        command = 'L'
+      if commands:
+        yield ''.join(commands)
+
+  def _Markers(self, series, plot, low, span):
+    """Yield the shapes of the series' markers."""
+    points = series._data
+    step = plot.width / float(max(len(points) - 1, 1))
+    for x, marker in series.markers:
+      index = int(round(x))
+      if not 0 <= index < len(points) or _Missing(points[index]):
+        continue
+      shape = self._MarkerShape(marker, plot.left + x * step,
+                                plot.Y((points[index] - low) / span))
+      if shape is not None:
+        yield shape
+
+  def _MarkerShape(self, marker, x, y):
+    """Return the element for a marker centered on (x, y), or None for
+    shapes which can't be drawn.
+    """
+    r = marker.size / 2.0
+    fill = _Paint('fill', marker.color)
+    if marker.shape == common.Marker.circle:
+      return '<circle cx="%s" cy="%s" r="%s"%s/>' % (_Num(x), _Num(y), _Num(r),
+                                                      fill)
+    if marker.shape == common.Marker.square:
+      return '<rect x="%s" y="%s" width="%s" height="%s"%s/>' % (
+          _Num(x - r), _Num(y - r), _Num(2 * r), _Num(2 * r), fill)
+    if marker.shape == common.Marker.diamond:
+      corners = [(x, y - r), (x + r, y), (x, y + r), (x - r, y)]
+    elif marker.shape == common.Marker.arrow:
+      corners = [(x, y), (x - r, y - 2 * r), (x + r, y - 2 * r)]
+    elif marker.shape == common.Marker.x:
+      return ('<path fill="none"%s stroke-width="%s" d="M%s %sL%s %sM%s %sL%s '
+              '%s"/>' % (_Paint('stroke', marker.color), _Num(max(r / 2, 1)),
+                         _Num(x - r), _Num(y - r), _Num(x + r), _Num(y + r),
+                         _Num(x - r), _Num(y + r), _Num(x + r), _Num(y - r)))
+    elif marker.shape == common.Marker.cross:
+      return ('<path fill="none"%s stroke-width="%s" d="M%s %sH%sM%s %sV%s"/>' %
+              (_Paint('stroke', marker.color), _Num(max(r / 2, 1)),
+               _Num(x - r), _Num(y), _Num(x + r), _Num(x), _Num(y - r),
+               _Num(y + r)))
+    else:
+      return None
+    return '<polygon points="%s"%s/>' % (
+        ' '.join('%s,%s' % (_Num(cx), _Num(cy)) for cx, cy in corners), fill)
+
+
+class SparklineRenderer(LineChartRenderer):
+
+  """Helper class to draw Sparkline objects as SVG.  Sparklines have no axes
+  and no padding.
+  """
+
+  def __init__(self, chart=None):
+    super(SparklineRenderer, self).__init__(chart)
+    self.padding = 0
+
+  def _VisibleAxes(self, chart):
+    return []
+
+
+class BarChartRenderer(BaseChartRenderer):
+
+  """Helper class to draw BarChart objects as SVG.
+
+  The bars are laid out like the Google Chart API does: by default they are
+  as thick as fits, with chart.style's gaps between them.  The first bars are
+  on the left of vertical charts & at the top of horizontal ones, and labels
+  without positions on the independent axis are centered on the groups of
+  bars.
+  """
+
+  def _BarLayout(self, chart, length):
+    """Return (bar thickness, gap between bars, distance between groups,
+    number of bars per group), in pixels, for bars spread over length pixels.
+    """
+    num_groups = max([len(series._data) for series in chart.data] or [0])
+    per_group = len(chart.data)
+    if chart.stacked:
+      per_group = 1
+    if not num_groups:
+      return 0, 0, 0, per_group  # No bars to lay out.
+    style = chart.style
+    if style is None:
+      style = bar_chart.BarChartStyle(None, None, None)
+    thickness, bar_gap, group_gap = (style.bar_thickness, style.bar_gap,
+                                     style.group_gap)
+    # Auto-size the gaps like BarChartEncoder._ApplyBarChartStyle.
+    if bar_gap is None and group_gap is not None:
+      bar_gap = max(0, group_gap / 2.0)
+    if group_gap is None and bar_gap is not None:
+      group_gap = max(0, bar_gap * 2)
+    if bar_gap is None:
+      bar_gap = bar_chart.BarChartStyle._DEFAULT_BAR_GAP
+      group_gap = bar_chart.BarChartStyle._DEFAULT_GROUP_GAP
+    if chart.stacked:
+      bar_gap = 0
+    if thickness is None:
+      if style.use_fractional_gap_spacing:
+        # The gaps are fractions of the thickness.
+        units = (num_groups * (per_group + (per_group - 1) * bar_gap) +
+                 (num_groups - 1) * group_gap)
+        thickness = length / float(units)
+      else:
+        thickness = ((length - num_groups * (per_group - 1) * bar_gap -
+                      (num_groups - 1) * group_gap) /
+                     float(num_groups * per_group))
+      thickness = max(thickness, 1)
+    if style.use_fractional_gap_spacing:
+      bar_gap *= thickness
+      group_gap *= thickness
+    group_length = per_group * thickness + (per_group - 1) * bar_gap
+    return thickness, bar_gap, group_length + group_gap, per_group
+
+  def _LabelFractions(self, chart, plot, code, axis):
+    if axis.label_positions or axis not in chart.GetIndependentAxes():
+      return super(BarChartRenderer, self)._LabelFractions(chart, plot, code,
+                                                           axis)
+    if chart.vertical:
+      length = plot.width
+    else:
+      length = plot.height
+    thickness, bar_gap, group_step, per_group = self._BarLayout(chart, length)
+    center = (per_group * thickness + (per_group - 1) * bar_gap) / 2.0
+    out = []
+    for i, label in enumerate(axis.labels):
+      fraction = (i * group_step + center) / length
+      if not chart.vertical:
+        fraction = 1 - fraction  # The first bars are at the top.
+      out.append((fraction, label))
+    return out
+
+  def _Bars(self, chart, plot):
+    """Yield (series, list of (x, y, width, height) of its bars) for each
+    series, in pixels.
+    """
+    if not chart.data:
+      return
+    if chart.vertical:
+      length, value_length = plot.width, plot.height
+    else:
+      length, value_length = plot.height, plot.width
+    thickness, bar_gap, group_step, _ = self._BarLayout(chart, length)
+    low, high = self._ValueRange(chart)
+    span = float(high - low)
+    def Pixels(value):
+      """Return the distance of value from the low end of the value axis."""
+      return min(max((value - low) / span, 0), 1) * value_length
+    base = Pixels(0)
+    positives = {}
+    negatives = {}
+    for i, series in enumerate(chart.data):
+      rects = []
+      for j, point in enumerate(series._data):
+        if _Missing(point):
+          continue
+        offset = j * group_step
+        if chart.stacked:
+          if point >= 0:
+            totals = positives
+          else:
+            totals = negatives
+          start = totals.get(j, 0)
+          end = totals[j] = start + point
+          start, end = Pixels(start), Pixels(end)
+        else:
+          offset += i * (thickness + bar_gap)
+          start, end = base, Pixels(point)
+        start, end = min(start, end), max(start, end)
+        if chart.vertical:
+          rects.append((plot.left + offset, plot.top + value_length - end,
+                        thickness, end - start))
+        else:
+          rects.append((plot.left + start, plot.top + offset, end - start,
+                        thickness))
+      yield series, rects
+
+  def _Data(self, chart, plot):
+    for series, rects in self._Bars(chart, plot):
+      yield '<g%s>' % _Paint('fill', series.style.color)
+      for rect in rects:
+        yield '<rect x="%s" y="%s" width="%s" height="%s"/>' % tuple(
+            _Num(x) for x in rect)
+      yield '</g>'
+
+
+class PieChartRenderer(BaseChartRenderer):
+
+  """Helper class to draw PieChart objects as SVG.
+
+  Like the Google Chart API, additional pies are drawn as rings around the
+  first one.  The segments start at 3 o'clock & go clockwise, and the labels
+  of the outermost pie are drawn next to its segments.
+
+  Object attributes:
+    angle:  Angle of rotation of the pies, in radians (clockwise).
+    colors: The colors (hex strings) to cycle through for segments without
+            one.
+  """
+
+  def __init__(self, chart=None, angle=None):
+    super(PieChartRenderer, self).__init__(chart)
+    self.angle = angle
+    self.colors = ['0000ff', 'ff0000', '00dd00', '000000']
+
+  def _VisibleAxes(self, chart):
+    return []
+
+  def _Pies(self, chart):
+    """Return the pies with some segments, as lists of segments."""
+    pies = [[segment for segment in pie if segment] for pie in chart.data]
+    return [pie for pie in pies if pie]
+
+  def _Colors(self, chart):
+    """Return a function which gives the color of each segment, given its
+    index among the segments of all pies.
+    """
+    if chart._colors:
+      colors = chart._colors
+      return lambda segment, i: colors[i % len(colors)]
+    colors = self.colors
+    return lambda segment, i: segment.color or colors[i % len(colors)]
+
+  def _Radius(self, plot, outer_pie):
+    """Return the radius of the pies, leaving room for the labels of the
+    outermost one.
+    """
+    labels = [segment.label for segment in outer_pie if segment.label]
+    label_width = max([self._TextWidth(label) for label in labels] or [0])
+    radius = min(plot.width / 2.0 - label_width - 6 * bool(labels),
+                 plot.height / 2.0 - (self.font_size + 4) * bool(labels))
+    return max(radius, 1)
+
+  def _Rings(self, chart, plot):
+    """Return the pies, from the inside out, as (inner radius, outer radius,
+    list of (segment, color, start angle, sweep)) tuples.  The angles are in
+    radians, clockwise from 3 o'clock.
+    """
+    pies = self._Pies(chart)
+    if not pies:
+      return []
+    radius = self._Radius(plot, pies[-1])
+    color = self._Colors(chart)
+    index = 0
+    rings = []
+    for i, pie in enumerate(pies):
+      total = float(sum(segment.size for segment in pie))
+      angle = self.angle or 0
+      wedges = []
+      for segment in pie:
+        sweep = total and 2 * math.pi * segment.size / total
+        wedges.append((segment, color(segment, index), angle, sweep))
+        angle += sweep
+        index += 1
+      rings.append((radius * i / len(pies), radius * (i + 1) / len(pies),
+                    wedges))
+    return rings
+
+  def _Data(self, chart, plot):
+    rings = self._Rings(chart, plot)
+    cx, cy = plot.X(0.5), plot.Y(0.5)
+    for i, (inner, outer, wedges) in enumerate(rings):
+      for segment, color, angle, sweep in wedges:
+        if sweep:
+          yield '<path%s d="%s"/>' % (_Paint('fill', color),
+                                      self._SegmentPath(cx, cy, inner, outer,
+                                                        angle, sweep))
+        if segment.label and i == len(rings) - 1:
+          middle = angle + sweep / 2.0
+          x = cx + (outer + 6) * math.cos(middle)
+          y = cy + (outer + 6) * math.sin(middle) + self.font_size * 0.35
+          anchor = math.cos(middle) < 0 and 'end' or 'start'
+          yield '<text x="%s" y="%s" text-anchor="%s"%s>%s</text>' % (
+              _Num(x), _Num(y), anchor, _Paint('fill', self.text_color),
+              saxutils.escape(unicode(segment.label)))
+
+  def _SegmentPath(self, cx, cy, inner, outer, start, sweep):
+    """Return the path data for a segment of a pie (or of a ring, if inner
+    is more than 0), sweep radians long.
+    """
+    def Point(r, angle):
+      return '%s %s' % (_Num(cx + r * math.cos(angle)),
+                        _Num(cy + r * math.sin(angle)))
+    if sweep >= 2 * math.pi - 1e-9:
+      # Arcs can't be full circles, so draw two halves.
+      path = 'M%s A%s %s 0 1 1 %s A%s %s 0 1 1 %sZ' % (
+          Point(outer, 0), _Num(outer), _Num(outer), Point(outer, math.pi),
+          _Num(outer), _Num(outer), Point(outer, 0))
+      if inner:
+        path += 'M%s A%s %s 0 1 0 %s A%s %s 0 1 0 %sZ' % (
+            Point(inner, 0), _Num(inner), _Num(inner), Point(inner, math.pi),
+            _Num(inner), _Num(inner), Point(inner, 0))
+      return path
+    end = start + sweep
+    large = int(sweep > math.pi)
+    path = 'M%s A%s %s 0 %d 1 %s' % (Point(outer, start), _Num(outer),
+                                     _Num(outer), large, Point(outer, end))
+    if inner:
+      path += 'L%s A%s %s 0 %d 0 %sZ' % (Point(inner, end), _Num(inner),
+                                         _Num(inner), large,
+                                         Point(inner, start))
+    else:
+      path += 'L%s %sZ' % (_Num(cx), _Num(cy))
+    return path
@@ -0,0 +1,293 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the SVG backend."""
+
+import StringIO
+from xml.dom import minidom
+
+from graphy import common
+from graphy import formatters
+from graphy import graphy_test
+from graphy.backends import svg
+
+
+class SvgTest(graphy_test.GraphyTest):
+
+  def Parse(self, chart, width=200, height=100):
+    """Render the chart & return the parsed document."""
+    return minidom.parseString(chart.display.Svg(width, height).encode('utf-8'))
+
+  def Elements(self, chart, name, width=200, height=100):
+    return self.Parse(chart, width, height).getElementsByTagName(name)
+
+  def Texts(self, chart):
+    return [node.firstChild and node.firstChild.data
+            for node in self.Elements(chart, 'text')]
+
+
+class LineChartTest(SvgTest):
+
+  def setUp(self):
+    self.chart = svg.LineChart()
+    self.chart.display.padding = 0
+    self.chart.display.background = None
+    self.chart.auto_scale.buffer = 0
+
+  def testLine(self):
+    self.chart.AddLine([0, 2, None, 1, 2])
+    svg_element = self.Parse(self.chart, 100, 50).documentElement
+    self.assertEqual('100', svg_element.getAttribute('width'))
+    path, = self.Elements(self.chart, 'path', 100, 50)
+    # Missing points leave a gap in the line.
+    self.assertEqual('M0 50L25 0M75 25L100 0', path.getAttribute('d'))
+    self.assertEqual('#0000ff', path.getAttribute('stroke'))
+
+  def testLineStyle(self):
+    self.chart.AddLine([1, 2], color='ff000080', width=2,
+                       pattern=(4, 2))
+    path, = self.Elements(self.chart, 'path')
+    self.assertEqual('#ff0000', path.getAttribute('stroke'))
+    self.assertEqual('0.5', path.getAttribute('stroke-opacity'))
+    self.assertEqual('2', path.getAttribute('stroke-width'))
+    self.assertEqual('4,2', path.getAttribute('stroke-dasharray'))
+
+  def testMarkers(self):
+    self.chart.AddLine([0, 1, 2], markers=[
+        (1, common.Marker(common.Marker.circle, '00ff00', 4)),
+        (2, common.Marker(common.Marker.diamond, '00ff00', 4)),
+        (5, common.Marker(common.Marker.circle, '00ff00', 4))])
+    circle, = self.Elements(self.chart, 'circle', 100, 50)
+    self.assertEqual(('50', '25', '2'), (circle.getAttribute('cx'),
+                                         circle.getAttribute('cy'),
+                                         circle.getAttribute('r')))
+    self.assertEqual(1, len(self.Elements(self.chart, 'polygon')))
+
+  def testAxesAndLegend(self):
+    self.chart.AddLine([1, 2], label='<one>')
+    self.chart.AddLine([2, 1])
+    self.chart.bottom.labels = ['a', 'b', 'c']
+    self.chart.left.labels = ['low', 'high']
+    self.assertEqual(['low', 'high', 'a', 'b', 'c', '<one>', None],
+                     self.Texts(self.chart))
+    self.assertTrue('&lt;one&gt;' in self.chart.display.Svg(200, 100))
+    self.chart.bottom.labels = []
+    self.chart.formatters.remove(self.chart.auto_legend)
+    self.assertEqual(['low', 'high'], self.Texts(self.chart))
+
+  def testLabelPositions(self):
+    self.chart.AddLine([1, 2])
+    self.chart.bottom.labels = ['x']
+    self.chart.bottom.label_positions = [25]
+    text, = self.Elements(self.chart, 'text', 100, 50)
+    self.assertEqual('25', text.getAttribute('x'))
+
+  def testGridlines(self):
+    self.chart.AddLine([1, 2])
+    self.chart.bottom.min = 0
+    self.chart.bottom.max = 4
+    self.chart.bottom.grid_spacing = 2
+    paths = self.Elements(self.chart, 'path', 100, 50)
+    self.assertEqual('M50 0V50', paths[0].getAttribute('d'))
+
+  def testRenderingDoesNotModifyChart(self):
+    self.chart.AddLine([1, 2], label='a')
+    self.chart.AddFormatter(formatters.InlineLegend)
+    before = self.chart.version
+    self.chart.display.Svg(100, 50)
+    self.assertEqual(before, self.chart.version)
+    self.assertEqual(None, self.chart.data[0].style.color)
+
+  def testSharedRenderer(self):
+    chart = svg.LineChart([1, 2])
+    other = svg.LineChart([5, 6])
+    self.assertEqual(other.display.Svg(100, 50),
+                     chart.display.Svg(100, 50, chart=other))
+
+  def testWriteSvg(self):
+    self.chart.AddLine([1, 2], label=u'caf\xe9')
+    out = StringIO.StringIO()
+    self.chart.display.WriteSvg(out, 100, 50)
+    self.assertEqual(self.chart.display.Svg(100, 50).encode('utf-8'),
+                     out.getvalue())
+
+  def testSvgChunks(self):
+    self.chart.AddLine(range(5000))
+    self.chart.display._CHUNK_SIZE = 1000
+    chunks = list(self.chart.display.SvgChunks(100, 50))
+    self.assertEqual(self.chart.display.Svg(100, 50), ''.join(chunks))
+    # Long paths are split across chunks, rather than made in one go.
+    self.assertTrue(len(chunks) > 3)
+    self.assertTrue(max(len(chunk) for chunk in chunks) < 20000)
+
+  def testSvgChunksWithByteOrderMark(self):
+    self.chart.AddLine(range(5000))
+    self.chart.display._CHUNK_SIZE = 1000
+    chunks = list(self.chart.display.SvgChunks(100, 50, encoding='utf-16'))
+    self.assertTrue(len(chunks) > 3)
+    self.assertEqual(self.chart.display.Svg(100, 50).encode('utf-16'),
+                     ''.join(chunks))
+
+  def testPathDataChunks(self):
+    self.chart.AddLine([0, None] + [1] * 2000 + [None, 2])
+    path, = self.Elements(self.chart, 'path', 100, 50)
+    commands = path.getAttribute('d')
+    self.assertEqual(3, commands.count('M'))
+    self.assertEqual(1999, commands.count('L'))
+
+  def testFormattersSeeSize(self):
+    self.chart.AddLine([1, 2])
+    self.chart.bottom.labels = ['label%d' % i for i in range(100)]
+    self.chart.AddFormatter(formatters.LabelThinner())
+    self.assertEqual(['label0', 'label23', 'label46', 'label69', 'label92'],
+                     self.Texts(self.chart))
+
+  def testSparkline(self):
+    chart = svg.Sparkline([1, 2, 3])
+    chart.bottom.labels = ['a', 'b']
+    chart.auto_scale.buffer = 0
+    self.assertEqual([], self.Texts(chart))
+    path, = self.Elements(chart, 'path', 20, 10)
+    self.assertEqual('M0 10L10 5L20 0', path.getAttribute('d'))
+
+
+class BarChartTest(SvgTest):
+
+  def setUp(self):
+    self.chart = svg.BarChart([1, -1])
+    self.chart.AddBars([2, 1])
+    self.chart.display.padding = 0
+    self.chart.display.background = None
+    self.chart.auto_scale.buffer = 0
+    self.chart.style.bar_thickness = 10
+    self.chart.style.bar_gap = 2
+    self.chart.style.group_gap = 4
+
+  def Rects(self, width=100, height=50):
+    """Return the (x, y, width, height) of the bars."""
+    return [tuple(round(float(rect.getAttribute(name)), 2)
+                  for name in ('x', 'y', 'width', 'height'))
+            for rect in self.Elements(self.chart, 'rect', width, height)]
+
+  def testGrouped(self):
+    # The values go from -1 to 2, so 0 is a third of the way up.
+    self.assertEqual([(0, 16.67, 10, 16.67), (26, 33.33, 10, 16.67),
+                      (12, 0, 10, 33.33), (38, 16.67, 10, 16.67)],
+                     self.Rects())
+
+  def testStacked(self):
+    self.chart.stacked = True
+    # The stacks go from -1 to 3.
+    self.assertEqual([(0, 25, 10, 12.5), (14, 37.5, 10, 12.5),
+                      (0, 0, 10, 25), (14, 25, 10, 12.5)],
+                     self.Rects())
+
+  def testHorizontal(self):
+    self.chart.vertical = False
+    self.assertEqual([(33.33, 0, 33.33, 10), (0, 26, 33.33, 10),
+                      (33.33, 12, 66.67, 10), (33.33, 38, 33.33, 10)],
+                     self.Rects())
+
+  def testAutoThickness(self):
+    self.chart.style.bar_thickness = None
+    # 2 groups of 2 bars: 4 bars + 2 bar gaps + 1 group gap = 100 pixels.
+    self.assertEqual([23] * 4, [rect[2] for rect in self.Rects()])
+
+  def testThinnedLabelsStayOnTheirBars(self):
+    # 10 characters need 64 pixels, and each group of bars gets 50.
+    self.chart.bottom.labels = ['a' * 10, 'b' * 10]
+    self.chart.AddFormatter(formatters.LabelThinner())
+    self.assertEqual(['11'], [text.getAttribute('x') for text in
+                              self.Elements(self.chart, 'text', 100, 50)
+                              if text.firstChild])
+
+  def testThinnedUnicodeLabels(self):
+    self.chart.bottom.labels = [u'caf\xe9' * 3, u'na\xefve' * 3]
+    self.chart.AddFormatter(formatters.LabelThinner())
+    self.assertEqual([u'caf\xe9' * 3], [text.firstChild.data for text in
+                                         self.Elements(self.chart, 'text',
+                                                       100, 50)
+                                         if text.firstChild])
+
+  def testEmptyChart(self):
+    self.chart = svg.BarChart([])
+    self.chart.display.background = None
+    self.chart.bottom.labels = ['a']
+    self.assertEqual([], self.Rects())
+    self.assertEqual(['a'], self.Texts(self.chart))
+    self.chart.vertical = False
+    self.assertEqual([], self.Rects())
+
+  def testLabelsAreCenteredOnGroups(self):
+    self.chart.bottom.labels = ['a', 'b']
+    self.assertEqual(['11', '37'], [text.getAttribute('x') for text in
+                                    self.Elements(self.chart, 'text')])
+    self.chart.bottom.labels = []
+    self.chart.vertical = False
+    self.chart.left.labels = ['a', 'b']
+    self.assertEqual(['14.85', '40.85'], [text.getAttribute('y') for text in
+                                          self.Elements(self.chart, 'text',
+                                                        100, 50)])
+
+
+class PieChartTest(SvgTest):
+
+  def setUp(self):
+    self.chart = svg.PieChart([1, 1, 2])
+    self.chart.display.padding = 0
+    self.chart.display.background = None
+
+  def Paths(self):
+    return [path.getAttribute('d')
+            for path in self.Elements(self.chart, 'path', 100, 50)]
+
+  def testSegments(self):
+    self.assertEqual(['M75 25 A25 25 0 0 1 50 50L50 25Z',
+                      'M50 50 A25 25 0 0 1 25 25L50 25Z',
+                      'M25 25 A25 25 0 0 1 75 25L50 25Z'], self.Paths())
+
+  def testColors(self):
+    self.chart.data[0][0].color = '123456'
+    fills = [path.getAttribute('fill')
+             for path in self.Elements(self.chart, 'path')]
+    self.assertEqual(['#123456', '#ff0000', '#00dd00'], fills)
+    self.chart.SetColors('aaaaaa', 'bbbbbb')
+    fills = [path.getAttribute('fill')
+             for path in self.Elements(self.chart, 'path')]
+    self.assertEqual(['#aaaaaa', '#bbbbbb', '#aaaaaa'], fills)
+
+  def testRings(self):
+    self.chart.AddPie([1])
+    paths = self.Paths()
+    self.assertEqual(4, len(paths))
+    self.assertTrue(paths[0].startswith('M62.5 25 A12.5 12.5'))
+    # A whole ring, with a hole for the first pie.
+    self.assertEqual('M75 25 A25 25 0 1 1 25 25 A25 25 0 1 1 75 25Z'
+                     'M62.5 25 A12.5 12.5 0 1 0 37.5 25 A12.5 12.5 0 1 0 '
+                     '62.5 25Z', paths[3])
+
+  def testLabelsAndAngle(self):
+    self.chart = svg.PieChart([1, 1], ['right', 'left'])
+    self.chart.display.angle = -3.14159265 / 2
+    texts = self.Elements(self.chart, 'text', 200, 100)
+    self.assertEqual(['right', 'left'],
+                     [text.firstChild.data for text in texts])
+    self.assertEqual(['start', 'end'],
+                     [text.getAttribute('text-anchor') for text in texts])
+
+
+if __name__ == '__main__':
+  graphy_test.main()
@@ -23,17 +23,20 @@ from graphy import common
 from graphy import util
 
 
-class BarsStyle(object):
+class BarsStyle(util.Versioned):
   """Style of a series of bars in a BarChart
 
   Object Attributes:
     color:  Hex string, like '00ff00' for green
   """
+
+  __slots__ = ('_version', 'color')
+
   def __init__(self, color):
     self.color = color
 
 
-class BarChartStyle(object):
+class BarChartStyle(util.Versioned):
   """Represents the style for bars on a BarChart.
 
   Any of the object attributes may be set to None, in which case the
@@ -115,7 +118,25 @@ class BarChart(common.BaseChart):
     style = BarsStyle(color)
     series = common.DataSeries(points, label=label, style=style)
     self.data.append(series)
-    return series
+    return self.data[-1]
+
+  def AddBarSeries(self, values, labels=None, colors=None):
+    """Add many series of bars with the same number of bars at once.
+
+    The bars of all series are stored in a single 2-D array (the chart's data
+    becomes a common.ChartData), so charts with many series are stacked,
+    scaled & encoded much faster.  Requires numpy.  Returns the chart's data.
+
+      values: 2-D array (or list of lists) with the y-values of one series in
+              each row
+      labels: List with the name of each series (used in the legend)
+      colors: List with the color of each series, as hex strings
+    """
+    if colors is None:
+      colors = [None] * len(values)
+    styles = [BarsStyle(color) for color in colors]
+    return self._AddChartData(common.ChartData(values, labels=labels,
+                                               styles=styles))
 
   def GetDependentAxes(self):
     """Get the dependendant axes, which depend on orientation."""
@@ -156,12 +177,21 @@ class BarChart(common.BaseChart):
 
     if not self.data:
       return None, None  # No data, nothing to do.
-    num_bars = max(len(series.data) for series in self.data)
+    if isinstance(self.data, common.ChartData):
+      if not self.data.num_points:
+        return None, None
+      return _StackedMinMaxValues(self.data._values.copy())
+    num_bars = max(len(series._data) for series in self.data)
+    if not num_bars:
+      return None, None
+    if util.numpy is not None and [s for s in self.data
+                                   if util.IsArray(s._data)]:
+      return self._GetStackedMinMaxValues(num_bars)
     positives = [0 for i in xrange(0, num_bars)]
     negatives = list(positives)
     for series in self.data:
-      for i, point in enumerate(series.data):
-        if point:
+      for i, point in enumerate(series._data):
+        if point and point == point:  # Skip None & NaN.
           if point > 0:
             positives[i] += point
           else:
@@ -169,3 +199,26 @@ class BarChart(common.BaseChart):
     min_value = min(min(positives), min(negatives))
     max_value = max(max(positives), max(negatives))
     return min_value, max_value
+
+  def _GetStackedMinMaxValues(self, num_bars):
+    """Vectorized version of GetMinMaxValues for stacked bars."""
+    numpy = util.numpy
+    bars = numpy.zeros((len(self.data), num_bars))
+    for i, series in enumerate(self.data):
+      points = util.AsFloatArray(series._data)
+      bars[i, :len(points)] = points
+    return _StackedMinMaxValues(bars)
+
+
+def _StackedMinMaxValues(bars):
+  """Return (min, max) of the stacks of bars, given a 2-D array with one
+  series of bars per row.  Modifies bars.
+  """
+  numpy = util.numpy
+  bars[numpy.isnan(bars)] = 0
+  # Sum the positive & negative parts of each stack separately.
+  positives = numpy.where(bars > 0, bars, 0).sum(axis=0)
+  negatives = numpy.where(bars < 0, bars, 0).sum(axis=0)
+  min_value = min(positives.min(), negatives.min())
+  max_value = max(positives.max(), negatives.max())
+  return float(min_value), float(max_value)
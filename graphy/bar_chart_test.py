@@ -16,6 +16,7 @@
 
 """Tests for bar_chart.py."""
 
+import array
 import warnings
 
 from graphy import common
@@ -78,6 +79,23 @@ class BarChartTest(graphy_test.GraphyTest):
     self.assertTrue(self.chart.bottom, self.chart.GetDependentAxis())
     self.assertTrue(self.chart.left, self.chart.GetIndependentAxis())
 
+  def testStackedMinMaxValues(self):
+    self.chart.stacked = True
+    self.chart.AddBars([1, -2, None, 4])
+    self.chart.AddBars([3, -1, 5])
+    self.assertEqual((-3, 5), self.chart.GetMinMaxValues())
+    # Array-backed data takes the vectorized path, with the same result.
+    self.chart.AddBars(array.array('d', [float('nan'), -4]))
+    self.assertEqual((-7, 5), self.chart.GetMinMaxValues())
+
+  def testStackedMinMaxValuesChartData(self):
+    self.RequireNumpy()
+    self.chart.stacked = True
+    self.chart.AddBarSeries([[1, -2, None, 4], [3, -1, 5, None]],
+                            colors=['ff0000', '00ff00'])
+    self.assertEqual((-3, 5), self.chart.GetMinMaxValues())
+    self.assertEqual('00ff00', self.chart.data[1].style.color)
+
 
 if __name__ == '__main__':
   graphy_test.main()
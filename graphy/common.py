@@ -17,13 +17,14 @@
 """Code common to all chart types."""
 
 import copy
+import hashlib
 import warnings
 
 from graphy import formatters
 from graphy import util
 
 
-class Marker(object):
+class Marker(util.Versioned):
 
   """Represents an abstract marker, without position.  You can attach these to
   a DataSeries.
@@ -43,6 +44,13 @@ class Marker(object):
   square = 's'
   x = 'x'
 
+  # First letters of the shapes whose x is the index of a data point: the
+  # shapes above, lines ('v' & 'V'), text ('t'), flags ('f') & annotations
+  # ('A').  The x of the fill markers ('b' & 'r') means something else.
+  _POINT_SHAPES = frozenset('acdosxvVtfA')
+
+  __slots__ = ('_version', 'shape', 'color', 'size')
+
   # Note: The Google Chart API also knows some other markers ('v', 'V', 'r',
   # 'b') that I think would fit better into a grid API.
   # TODO: Make such a grid API
@@ -55,15 +63,23 @@ class Marker(object):
     self.color = color
     self.size = size
 
+  def IsAtPoint(self):
+    """Return True if the marker is placed at a data point, i.e. its x is
+    the index of a point.
+    """
+    return self.shape[:1] in self._POINT_SHAPES
+
 
-class _BasicStyle(object):
+class _BasicStyle(util.Versioned):
   """Basic style object.  Used internally."""
 
+  __slots__ = ('_version', 'color')
+
   def __init__(self, color):
     self.color = color
 
 
-class DataSeries(object):
+class DataSeries(util.Versioned):
 
   """Represents one data series for a chart (both data & presentation
   information).
@@ -71,6 +87,11 @@ class DataSeries(object):
   Object attributes:
     points:  List of numbers representing y-values (x-values are not specified
              because the Google Chart API expects even x-value spacing).
+             None marks a missing point.  The points may also be an
+             array.array('d') or a numpy float64 array, with NaN marking
+             missing points; see Compact().  Read-only: assign the data
+             attribute to change the points.  (Unlike data, points never
+             takes a copy; see graphy.formatters.)
     label:   String with the series' label in the legend.  The chart will only
              have a legend if at least one series has a label.  If some series
              do not have a label then they will have an empty description in
@@ -92,8 +113,14 @@ class DataSeries(object):
                y-value for x and the ending y-value for size.  Y, in this case,
                is becase 0.0 (bottom) and 1.0 (top).
     color:   DEPRECATED
+    version: Read-only.  Increases whenever the series (including its style
+             and markers) changes.  Changing the points in place is not
+             noticed; assign the data attribute again, or call Invalidate().
   """
 
+  __slots__ = ('_version', '_data', '_copy_on_access', '_min_max', '_origin',
+               '_style', '_markers', 'label')
+
   # TODO: Should we require the points list to be non-empty ?
   # TODO: Do markers belong here?  They are really only used for LineCharts
   def __init__(self, points, label=None, style=None, markers=None, color=None):
@@ -116,11 +143,124 @@ class DataSeries(object):
                     DeprecationWarning, stacklevel=2)
     if style is None:
       style = _BasicStyle(None)
+    # The series this one is a view of (see _View), if any.
+    self._origin = None
     self.data = points
     self.style = style
     self.markers = markers or []
     self.label = label
 
+  def _GetData(self):
+    if self._copy_on_access:
+      # This is a view (see _View); take a private copy before anybody gets a
+      # chance to modify the points.
+      self._data = copy.copy(self._data)
+      self._copy_on_access = False
+    return self._data
+
+  def _SetData(self, points):
+    self._data = points
+    self._copy_on_access = False
+    self._InvalidateMinMax()
+
+  data = property(_GetData, _SetData)
+  points = property(lambda self: self._data)
+
+  def Compact(self):
+    """Store the points in an array of doubles (8 bytes per point), with NaN
+    for missing points.  Returns self.
+
+    Compact series work everywhere lists do, and are much faster to scale,
+    encode & hash when numpy is available.
+    """
+    self.data = util.CompactPoints(self._data)
+    return self
+
+  def _GetMarkers(self):
+    return self._markers
+
+  def _SetMarkers(self, markers):
+    if isinstance(markers, list) and not isinstance(markers,
+                                                    util.VersionedList):
+      markers = util.VersionedList(markers)
+    self._markers = markers
+
+  markers = property(_GetMarkers, _SetMarkers)
+
+  def _GetVersion(self):
+    return max(self._version, util.GetVersion(self._style),
+               _MarkersVersion(self._markers))
+
+  def _Touch(self):
+    self._InvalidateMinMax()
+    super(DataSeries, self)._Touch()
+
+  def _InvalidateMinMax(self):
+    # Not an attribute assignment, so the version doesn't change.
+    object.__setattr__(self, '_min_max', None)
+
+  def GetMinMaxValues(self):
+    """Return (min_value, max_value) of the points, ignoring missing points,
+    or (None, None) if there are no points.
+
+    The result is cached.  If points are appended to the data in place, only
+    the new points are scanned next time.  If you change existing points in
+    place, call Invalidate() (or assign the data again) to reset the cache.
+    """
+    if self._origin is not None and self._origin._data is self._data:
+      # Use (and fill) the cache of the series we are a view of, so it
+      # survives from one render to the next.
+      return self._origin.GetMinMaxValues()
+    data = self._data
+    cached = self._min_max
+    if cached is not None and cached[0] <= len(data):
+      num_scanned, low, high = cached
+      if num_scanned == len(data):
+        return low, high
+      new_low, new_high = util.MinMax(data[num_scanned:])
+      if low is None:
+        low, high = new_low, new_high
+      elif new_low is not None:
+        low, high = min(low, new_low), max(high, new_high)
+    else:
+      low, high = util.MinMax(data)
+    object.__setattr__(self, '_min_max', (len(data), low, high))
+    return low, high
+
+  def _UpdateDigest(self, digest):
+    """Hash the points in bulk, instead of one by one (see BaseChart)."""
+    digest.update('%s(' % self.__class__.__name__)
+    points = self._data
+    if points is None:
+      points = []
+    digest.update('<%d:' % len(points))
+    util.UpdatePointsDigest(digest, points)
+    state = util.GetState(self)
+    del state['_data']
+    util.UpdateDigest(digest, state)
+    digest.update(')')
+
+  def _View(self, deep=True):
+    """Return a copy of this series which shares its points with the original.
+
+    The points are copied the first time they are accessed through the view's
+    data attribute, so changes to the view never leak back into this series.
+    Code which only reads the points (like BaseChart.GetMinMaxValues) can use
+    view._data to avoid the copy.
+
+    If deep is False, the style is only copied shallowly and the markers are
+    shared, which is enough for the default formatters.
+    """
+    view = copy.copy(self)
+    if deep:
+      view._style = copy.deepcopy(self._style)
+      view.markers = copy.deepcopy(self.markers)
+    else:
+      view._style = copy.copy(self._style)
+    view._copy_on_access = True
+    view._origin = self
+    return view
+
   def _GetColor(self):
     warnings.warn('DataSeries.color is deprecated, use '
                   'DataSeries.style.color instead.', DeprecationWarning,
@@ -152,6 +292,359 @@ class DataSeries(object):
   style = property(_GetStyle, _SetStyle)    
 
 
+class _FrameSeries(DataSeries):
+
+  """One row of a ChartData, which looks & acts like a DataSeries.
+
+  The points, label, style & markers all live in the ChartData; assigning
+  them changes the ChartData.
+  """
+
+  __slots__ = ('_frame', '_row')
+
+  def __init__(self, frame, row):
+    object.__setattr__(self, '_frame', frame)
+    object.__setattr__(self, '_row', row)
+
+  def _GetData(self):
+    return self._frame.values[self._row]
+
+  def _SetData(self, points):
+    self._frame._SetRow(self._row, points)
+
+  data = property(_GetData, _SetData)
+  # The points, without taking a private copy (see DataSeries._View).
+  _data = property(lambda self: self._frame._values[self._row])
+
+  _style = property(lambda self: self._frame.styles[self._row],
+                    lambda self, style: self._frame.styles.__setitem__(
+                        self._row, style))
+  label = property(lambda self: self._frame.labels[self._row],
+                   lambda self, label: self._frame.labels.__setitem__(
+                       self._row, label))
+  markers = property(lambda self: self._frame.markers[self._row],
+                     lambda self, markers: self._frame.markers.__setitem__(
+                         self._row, util.VersionedList(markers)))
+
+  def _GetVersion(self):
+    return self._frame.version
+
+  def _Touch(self):
+    self._frame._Touch()
+
+  def GetMinMaxValues(self):
+    return self._frame._GetRowMinMaxValues(self._row)
+
+  def _UpdateDigest(self, digest):
+    digest.update('%s(' % self.__class__.__name__)
+    digest.update(util.PointsBuffer(self._data))
+    util.UpdateDigest(digest, {'_style': self.style, 'label': self.label,
+                               'markers': self.markers})
+    digest.update(')')
+
+
+class ChartData(util.Versioned):
+
+  """Columnar storage for many data series with the same number of points.
+
+  A chart's data can be a ChartData instead of a list of DataSeries (see
+  LineChart.AddLines & BarChart.AddBarSeries).  The points of all the series
+  are kept in one 2-D array, so the min & max, stacking, scaling & encoding
+  are done for all series at once.  It otherwise acts like a list of series:
+  chart.data[i] returns a DataSeries-like view of series i, and series can be
+  added with append or removed with del.  Requires numpy.
+
+  Object attributes:
+    values:  2-D numpy float64 array with one row of points per series.  NaN
+             marks a missing point.  Changing points in place isn't noticed;
+             call Invalidate() afterwards, or assign values again.
+    labels:  List with the label of each series (or None).
+    styles:  List with the style object of each series.
+    markers: List with the list of (x, Marker) tuples of each series.
+    num_points: Read-only.  The number of points in each series.
+    version: Read-only.  Increases whenever the data (including the styles
+             and markers) changes.
+  """
+
+  def __init__(self, values=None, labels=None, styles=None, markers=None):
+    """Construct a ChartData.  See class docstring for details on args.  By
+    default the series have no labels, markers or colors.
+    """
+    if util.numpy is None:
+      raise ImportError('ChartData requires numpy')
+    self._origin = None
+    self.values = values
+    num_series = len(self)
+    if labels is None:
+      labels = [None] * num_series
+    if styles is None:
+      styles = [_BasicStyle(None) for _ in xrange(num_series)]
+    if markers is None:
+      markers = [[] for _ in xrange(num_series)]
+    if not len(labels) == len(styles) == len(markers) == num_series:
+      raise ValueError('Need one label, style & list of markers per series.')
+    self.labels = util.VersionedList(labels)
+    self.styles = util.VersionedList(styles)
+    self.markers = util.VersionedList(util.VersionedList(row_markers)
+                                      for row_markers in markers)
+
+  def _GetValues(self):
+    if self._copy_on_access:
+      # This is a view (see _View); take a private copy.
+      object.__setattr__(self, '_buffer', self._values.copy())
+      object.__setattr__(self, '_copy_on_access', False)
+    return self._values
+
+  def _SetValues(self, values):
+    numpy = util.numpy
+    if values is None or not len(values):
+      values = numpy.zeros((0, 0))
+    values = numpy.array(values, dtype=numpy.float64, ndmin=2)
+    if values.ndim != 2:
+      raise ValueError('ChartData values must be 2-D.')
+    self._buffer = values
+    self._num_rows = len(values)
+    self._copy_on_access = False
+    self._Touch()
+
+  values = property(_GetValues, _SetValues)
+  # The values, without taking a private copy (see _View).
+  _values = property(lambda self: self._buffer[:self._num_rows])
+  num_points = property(lambda self: self._buffer.shape[1])
+
+  def _GetVersion(self):
+    version = max(self._version, self.labels.version, self.styles.version,
+                  self.markers.version)
+    for style in self.styles:
+      version = max(version, util.GetVersion(style))
+    for markers in self.markers:
+      version = max(version, _MarkersVersion(markers))
+    return version
+
+  def _Touch(self):
+    object.__setattr__(self, '_min_max', None)
+    super(ChartData, self)._Touch()
+
+  def __len__(self):
+    return self._num_rows
+
+  def __iter__(self):
+    for row in xrange(self._num_rows):
+      yield _FrameSeries(self, row)
+
+  def _Row(self, index):
+    if index < 0:
+      index += self._num_rows
+    if index < 0 or index >= self._num_rows:
+      raise IndexError('ChartData index out of range')
+    return index
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [_FrameSeries(self, row)
+              for row in xrange(*index.indices(self._num_rows))]
+    return _FrameSeries(self, self._Row(index))
+
+  def __setitem__(self, index, series):
+    row = self._Row(index)
+    self._SetRow(row, series._data)
+    self.labels[row] = series.label
+    self.styles[row] = series.style
+    self.markers[row] = util.VersionedList(series.markers)
+
+  def __delitem__(self, index):
+    row = self._Row(index)
+    self.values = util.numpy.delete(self._values, row, axis=0)
+    del self.labels[row]
+    del self.styles[row]
+    del self.markers[row]
+
+  def _RowPoints(self, points):
+    """Convert points to a row of values."""
+    points = util.AsFloatArray(points)
+    if self._num_rows and len(points) != self.num_points:
+      raise ValueError('All series in a ChartData must have the same number '
+                       'of points.')
+    return points
+
+  def _SetRow(self, row, points):
+    points = self._RowPoints(points)
+    self.values[row] = points
+    self._Touch()
+
+  def append(self, series):
+    """Add a copy of a DataSeries to the end."""
+    points = self._RowPoints(series._data)
+    self.values  # Make sure we have our own copy.
+    num_rows = self._num_rows
+    if num_rows == len(self._buffer) or not num_rows:
+      # Grow by doubling, so appending many series takes linear time.
+      buf = util.numpy.empty((max(4, 2 * num_rows), len(points)))
+      if num_rows:
+        buf[:num_rows] = self._values
+      object.__setattr__(self, '_buffer', buf)
+    self._buffer[num_rows] = points
+    object.__setattr__(self, '_num_rows', num_rows + 1)
+    self._Touch()
+    self.labels.append(series.label)
+    self.styles.append(series.style)
+    self.markers.append(util.VersionedList(series.markers))
+
+  def extend(self, series_list):
+    """Add copies of several DataSeries to the end."""
+    for series in series_list:
+      self.append(series)
+
+  def pop(self, index=-1):
+    """Remove a series and return it (as a DataSeries)."""
+    view = self[index]
+    series = DataSeries(view._data.copy(), label=view.label,
+                        style=view.style, markers=view.markers)
+    del self[index]
+    return series
+
+  def _GetRowMinMaxValues(self, row):
+    low, high = self._GetMinMaxArrays()
+    low, high = low[row], high[row]
+    if low != low:
+      return None, None  # No data.
+    return low.item(), high.item()
+
+  def _GetMinMaxArrays(self):
+    """Return arrays with the min & max of each series (NaN if it has no
+    data).  Cached until the data changes.
+    """
+    if self._origin is not None and self._origin._buffer is self._buffer:
+      # Share the cache of the ChartData we are a view of (see _View).
+      return self._origin._GetMinMaxArrays()
+    if self._min_max is None:
+      numpy = util.numpy
+      values = self._values
+      if self.num_points:
+        min_max = (numpy.fmin.reduce(values, axis=1),
+                   numpy.fmax.reduce(values, axis=1))
+      else:
+        min_max = (numpy.repeat(numpy.nan, len(values)),) * 2
+      object.__setattr__(self, '_min_max', min_max)
+    return self._min_max
+
+  def GetMinMaxValues(self):
+    """Return (min_value, max_value) of all series, ignoring missing points,
+    or (None, None) if there are no points.
+    """
+    lows, highs = self._GetMinMaxArrays()
+    if not len(lows):
+      return None, None
+    low = util.numpy.fmin.reduce(lows)
+    if low != low:
+      return None, None
+    return low.item(), util.numpy.fmax.reduce(highs).item()
+
+  def _UpdateDigest(self, digest):
+    digest.update('%s(<%dx%d:' % ((self.__class__.__name__,) +
+                                  self._values.shape))
+    digest.update(util.PointsBuffer(self._values))
+    util.UpdateDigest(digest, (list(self.labels), list(self.styles),
+                               list(self.markers)))
+    digest.update(')')
+
+  def _View(self, deep=True):
+    """Return a copy which shares its values with this ChartData until they
+    are accessed (see DataSeries._View).
+    """
+    view = copy.copy(self)
+    object.__setattr__(view, 'labels', util.VersionedList(self.labels))
+    if deep:
+      styles = copy.deepcopy(self.styles)
+      markers = copy.deepcopy(self.markers)
+    else:
+      styles = util.VersionedList(copy.copy(style) for style in self.styles)
+      markers = self.markers
+    object.__setattr__(view, 'styles', styles)
+    object.__setattr__(view, 'markers', markers)
+    object.__setattr__(view, '_copy_on_access', True)
+    object.__setattr__(view, '_origin', self)
+    return view
+
+
+def _View(item, deep=True):
+  """Make a copy of item (a DataSeries, a ChartData or a possibly nested list
+  of DataSeries) for a formatted chart, sharing the points of each series
+  with the original.  See DataSeries._View for deep.
+  """
+  if isinstance(item, (DataSeries, ChartData)):
+    return item._View(deep)
+  if isinstance(item, list):
+    return [_View(x, deep) for x in item]
+  return copy.deepcopy(item)
+
+
+def _MarkersVersion(markers):
+  """Return the newest version of a list of (x, Marker) tuples and the
+  markers in it.
+  """
+  version = util.GetVersion(markers)
+  if isinstance(markers, list):
+    for _, marker in markers:
+      version = max(version, util.GetVersion(marker))
+  return version
+
+
+def _DataVersion(item):
+  """Return the newest version of item (a DataSeries or a possibly nested
+  list of them) and anything in it.
+  """
+  if isinstance(item, DataSeries):
+    return item.version
+  version = util.GetVersion(item)
+  if isinstance(item, list):
+    for x in item:
+      version = max(version, _DataVersion(x))
+  return version
+
+
+def _IterSeries(item):
+  """Yield every DataSeries in item (a possibly nested list of them, or a
+  ChartData).
+  """
+  if isinstance(item, DataSeries):
+    yield item
+  elif isinstance(item, (list, ChartData)):
+    for x in item:
+      for series in _IterSeries(x):
+        yield series
+
+
+def _HasDefaultFormatters(chart_formatters):
+  """Return True if chart_formatters are all default ones (AutoColor,
+  AutoScale and AutoLegend), whose effects on the chart are known.
+  """
+  return all(formatter is formatters.AutoLegend or
+             isinstance(formatter, (formatters.AutoColor, formatters.AutoScale))
+             for formatter in chart_formatters)
+
+
+class RenderContext(object):
+
+  """The per-call state of a render: what formatters need to know besides
+  the chart & the display settings.
+
+  The backends attach it to the formatted copy of the chart, as
+  chart.render_context, so rendering never modifies the display object and
+  one display object can render for several threads at once.
+
+  Object attributes:
+    width:  Width of the image, in pixels.
+    height: Height of the image, in pixels.
+  """
+
+  __slots__ = ('width', 'height')
+
+  def __init__(self, width, height):
+    self.width = width
+    self.height = height
+
+
 class AxisPosition(object):
   """Represents all the available axis positions.
 
@@ -167,7 +660,7 @@ class AxisPosition(object):
   TOP = 't'
 
 
-class Axis(object):
+class Axis(util.Versioned):
 
   """Represents one axis.
 
@@ -185,6 +678,9 @@ class Axis(object):
                    on the axis all the way across the chart.
   """
 
+  __slots__ = ('_version', 'min', 'max', 'labels', 'label_positions',
+               'grid_spacing', 'label_gridlines')
+
   def __init__(self, axis_min=None, axis_max=None):
     """Construct a new Axis.
 
@@ -203,7 +699,7 @@ class Axis(object):
 # - scatter plots
 # - us/world maps
 
-class BaseChart(object):
+class BaseChart(util.Versioned):
   """Base chart object with standard behavior for all other charts.
 
   Object attributes:
@@ -224,6 +720,11 @@ class BaseChart(object):
              object.  The intention is that the display object would be used to
              render this chart.  The details of what gets put here depends on
              the specific backend you are using.
+    version: Read-only.  A number which increases whenever the chart changes:
+             assigning its attributes, adding, removing or replacing series,
+             axes or formatters, or changing the attributes of a series, style,
+             axis or (built-in) formatter.  Lists assigned to data or
+             formatters are copied into lists which track their changes.
   """
 
   # Canonical ordering of position keys
@@ -250,6 +751,24 @@ class BaseChart(object):
     # url or img tag).
     self.display = None
 
+  def __setattr__(self, name, value):
+    if name in ('data', 'formatters') and type(value) is list:
+      value = util.VersionedList(value)
+    super(BaseChart, self).__setattr__(name, value)
+
+  def _GetVersion(self):
+    version = self._version
+    for name, value in self.__dict__.iteritems():
+      if name != 'display':
+        version = max(version, util.GetVersion(value))
+    version = max(version, _DataVersion(self.data))
+    for formatter in self.formatters:
+      version = max(version, util.GetVersion(formatter))
+    for axes in self._axes.itervalues():
+      for axis in axes:
+        version = max(version, util.GetVersion(axis))
+    return version
+
   def AddFormatter(self, formatter):
     """Add a new formatter to the chart (convenience method)."""
     self.formatters.append(formatter)
@@ -265,7 +784,46 @@ class BaseChart(object):
     series = DataSeries(points, color=color, style=style, markers=markers,
                         label=label)
     self.data.append(series)
-    return series
+    return self.data[-1]
+
+  def _AddChartData(self, frame):
+    """Add the series of a ChartData, switching this chart's data to a
+    ChartData if it isn't one already.  Returns the chart's data.
+    """
+    if not self.data and not isinstance(self.data, ChartData):
+      self.data = frame
+    else:
+      if not isinstance(self.data, ChartData):
+        data = ChartData()
+        data.extend(self.data)
+        self.data = data
+      self.data.extend(frame)
+    return self.data
+
+  def Fingerprint(self):
+    """Return a digest (as a hex string) of everything which affects how this
+    chart is rendered: the data, styles, markers, labels, axes and formatters.
+
+    Charts which render the same have the same fingerprint, even across
+    processes, so the fingerprint can be used as a cache key or ETag.  (The
+    display object is not included; see the backends for fingerprints which
+    include their settings.)  Formatters are identified by their name and
+    attributes (or, for closures, the values they captured), so a formatter
+    with hidden state may not be fully captured.  Lambdas are identified by
+    object, so charts with lambda formatters only share a fingerprint within
+    a process, and only if they share the lambda.
+    """
+    digest = hashlib.md5()
+    util.UpdateDigest(digest, self)
+    return digest.hexdigest()
+
+  def _UpdateDigest(self, digest):
+    state = util.GetState(self)
+    # The display isn't part of the chart's content, and the aliases for the
+    # default formatters are already covered by formatters.
+    for name in ('display', 'auto_color', 'auto_scale', 'auto_legend'):
+      state.pop(name, None)
+    util.UpdateDigest(digest, (self.__class__, state))
 
   def GetDependentAxes(self):
     """Return any dependent axes ('left' and 'right' by default for LineCharts,
@@ -292,32 +850,72 @@ class BaseChart(object):
     return self.bottom
 
   def _Clone(self):
-    """Make a deep copy this chart.
+    """Make a copy of this chart which can be modified without affecting the
+    original.
+
+    Everything except the data series is deep-copied.  The series are views
+    (see DataSeries._View) which share their points with the original chart
+    until somebody accesses them, so large series are not copied needlessly.
 
     Formatters & display will be missing from the copy, due to limitations in
     deepcopy.
     """
-    orig_values = {}
-    # Things which deepcopy will likely choke on if it tries to copy.
+    # Things which deepcopy will likely choke on if it tries to copy, and the
+    # data, which we copy lazily.  Pre-filling the memo makes deepcopy replace
+    # them with None, without touching (and changing the version of) the
+    # original chart.
     uncopyables = ['formatters', 'display', 'auto_color', 'auto_scale',
-                   'auto_legend']
+                   'auto_legend', 'data']
+    memo = {}
     for name in uncopyables:
-      orig_values[name] = getattr(self, name)
-      setattr(self, name, None)
-    clone = copy.deepcopy(self)
-    for name, orig_value in orig_values.iteritems():
-      setattr(self, name, orig_value)
+      value = self.__dict__.get(name)
+      if value is not None:
+        memo[id(value)] = None
+    clone = copy.deepcopy(self, memo)
+    clone.data = _View(self.data)
     return clone
 
-  def GetFormattedChart(self):
-    """Get a copy of the chart with formatting applied."""
+  def GetFormattedChart(self, render_context=None):
+    """Get a copy of the chart with formatting applied.
+
+    Args:
+      render_context: Optional RenderContext describing the image being
+                      drawn, which is available to the formatters as
+                      chart.render_context.
+    """
     # Formatters need to mutate the chart, but we don't want to change it out
     # from under the user.  So, we work on a copy of the chart.
     scratchpad = self._Clone()
+    if render_context is not None:
+      scratchpad.render_context = render_context
     for formatter in self.formatters:
       formatter(scratchpad)
     return scratchpad
 
+  def _GetFormattedView(self, render_context=None):
+    """Like GetFormattedChart, but the series of the returned chart share
+    their points with this chart, even if they are accessed.  Only for callers
+    (like the backends) which promise not to modify the result.
+    """
+    if _HasDefaultFormatters(self.formatters):
+      # The default formatters only change the series' colors, the dependent
+      # axes' ranges & the legend, so the rest of the chart can be shared.
+      view = copy.copy(self)
+      view._axes = dict((position, [copy.copy(axis) for axis in axes])
+                        for position, axes in self._axes.iteritems())
+      view.data = _View(self.data, deep=False)
+      if render_context is not None:
+        view.render_context = render_context
+      for formatter in self.formatters:
+        formatter(view)
+    else:
+      view = self.GetFormattedChart(render_context)
+    if isinstance(view.data, ChartData):
+      view.data._copy_on_access = False
+    for series in _IterSeries(view.data):
+      series._copy_on_access = False
+    return view
+
   def GetMinMaxValues(self):
     """Get the largest & smallest values in this chart, returned as
     (min_value, max_value).  Takes into account complciations like stacked data
@@ -327,10 +925,15 @@ class BaseChart(object):
     would return (1, 6).  If the same chart was stacking the data series, it
     would return (5, 9).
     """
-    MinPoint = lambda data: min(x for x in data if x is not None)
-    MaxPoint = lambda data: max(x for x in data if x is not None)
-    mins  = [MinPoint(series.data) for series in self.data if series.data]
-    maxes = [MaxPoint(series.data) for series in self.data if series.data]
+    if isinstance(self.data, ChartData):
+      return self.data.GetMinMaxValues()
+    mins = []
+    maxes = []
+    for series in self.data:
+      low, high = series.GetMinMaxValues()
+      if low is not None:
+        mins.append(low)
+        maxes.append(high)
     if not mins or not maxes:
       return None, None # No data, just bail.
     return min(mins), max(maxes)
@@ -345,6 +948,7 @@ class BaseChart(object):
       the value of the axis parameter
     """
     self._axes.setdefault(position, []).append(axis)
+    self._Touch()
     return axis
 
   def GetAxis(self, position):
@@ -365,6 +969,7 @@ class BaseChart(object):
     else:
       axis = Axis()
       self._axes[position] = [axis]
+      self._Touch()
       return axis
 
   def SetAxis(self, position, axis):
@@ -379,6 +984,7 @@ class BaseChart(object):
       the value of the axis parameter
     """
     self._axes.setdefault(position, [None])[0] = axis
+    self._Touch()
     return axis
 
   def _GetAxes(self):
@@ -16,10 +16,12 @@
 
 """Tests for common.py."""
 
+import array
 import warnings
 
 from graphy import common
 from graphy import graphy_test
+from graphy import util
 from graphy.backends import google_chart_api
 
 
@@ -67,6 +69,221 @@ class CommonTest(graphy_test.GraphyTest):
     self.assertEqual([c.left, c.right, right2], c.GetDependentAxes())
     self.assertEqual([c.top, c.bottom, bottom2], c.GetIndependentAxes())
 
+  def testFormattedChartSharesPoints(self):
+    points = range(1000)
+    self.chart.AddLine(points)
+    view = self.chart._GetFormattedView()
+    self.assertTrue(view.data[0].data is points)
+    self.assertFalse(view.data[0] is self.chart.data[0])
+    self.assertFalse(view.data[0].style is self.chart.data[0].style)
+
+  def testFormattersCantModifyPointsInPlace(self):
+    points = [1, 2, 3]
+    self.chart.AddLine(points)
+    def Formatter(chart):
+      chart.data[0].data[0] = 100
+      chart.data[0].data.append(4)
+      chart.data[0].style.color = 'abcdef'
+    self.chart.AddFormatter(Formatter)
+    view = self.chart._GetFormattedView()
+    self.assertEqual([100, 2, 3, 4], view.data[0].data)
+    self.assertEqual([1, 2, 3], points)
+    self.assertTrue(self.chart.data[0].data is points)
+    self.assertEqual(None, self.chart.data[0].style.color)
+
+  def testFormattedChartCopiesPointsOnAccess(self):
+    points = [1, 2, 3]
+    self.chart.AddLine(points)
+    formatted = self.chart.GetFormattedChart()
+    formatted.data[0].data.append(4)
+    self.assertEqual([1, 2, 3], points)
+
+  def AssertChanges(self, change):
+    """Assert that calling change() bumps the chart's version."""
+    before = self.chart.version
+    change()
+    self.assertTrue(self.chart.version > before)
+
+  def testVersionBumpsOnChanges(self):
+    series = self.chart.AddLine([1, 2, 3])
+    def SetData():
+      series.data = [4, 5, 6]
+    def SetColor():
+      series.style.color = 'ff0000'
+    def SetAxisMin():
+      self.chart.left.min = 3
+    def ReplaceAxis():
+      self.chart.bottom = common.Axis()
+    def RemoveFormatter():
+      self.chart.formatters.remove(self.chart.auto_legend)
+    def SetScaleBuffer():
+      self.chart.auto_scale.buffer = 0
+    self.AssertChanges(lambda: self.chart.AddLine([7, 8, 9]))
+    self.AssertChanges(SetData)
+    self.AssertChanges(SetColor)
+    self.AssertChanges(SetAxisMin)
+    self.AssertChanges(ReplaceAxis)
+    self.AssertChanges(RemoveFormatter)
+    self.AssertChanges(SetScaleBuffer)
+    self.AssertChanges(self.chart.data.pop)
+
+  def testVersionStableWhenRendering(self):
+    self.chart.AddLine([1, 2, 3], label='A')
+    self.chart.bottom.labels = ['a', 'b']
+    before = self.chart.version
+    self.chart.display.Url(100, 100)
+    self.chart.GetFormattedChart()
+    self.assertEqual(before, self.chart.version)
+
+  def testAssignedListsAreTracked(self):
+    self.chart.data = []
+    self.AssertChanges(lambda: self.chart.data.append(common.DataSeries([1])))
+    self.chart.formatters = []
+    self.AssertChanges(lambda: self.chart.formatters.append(len))
+
+  def testFingerprint(self):
+    def MakeChart():
+      chart = google_chart_api.LineChart()
+      chart.AddLine([1, None, 3], label='A')
+      chart.bottom.labels = ['x', 'y']
+      return chart
+    chart = MakeChart()
+    fingerprint = chart.Fingerprint()
+    self.assertEqual(fingerprint, MakeChart().Fingerprint())
+    chart.display.Url(100, 100)
+    self.assertEqual(fingerprint, chart.Fingerprint())
+
+    changes = [lambda c: c.AddLine([4]),
+               lambda c: setattr(c.data[0], 'data', [1, None, 4]),
+               lambda c: setattr(c.data[0], 'data', [1, 0, 3]),
+               lambda c: setattr(c.data[0].style, 'width', 2),
+               lambda c: setattr(c.data[0], 'label', 'B'),
+               lambda c: setattr(c.bottom, 'labels', ['x', 'z']),
+               lambda c: setattr(c.left, 'max', 5),
+               lambda c: setattr(c.auto_scale, 'buffer', 0),
+               lambda c: c.formatters.remove(c.auto_legend)]
+    for change in changes:
+      chart = MakeChart()
+      change(chart)
+      self.assertNotEqual(fingerprint, chart.Fingerprint())
+
+  def testFingerprintIncludesClosureValues(self):
+    def Colorer(color):
+      def Color(chart):
+        for series in chart.data:
+          series.style.color = color
+      return Color
+    a = google_chart_api.LineChart([1, 2, 3])
+    b = google_chart_api.LineChart([1, 2, 3])
+    a.AddFormatter(Colorer('ff0000'))
+    b.AddFormatter(Colorer('00ff00'))
+    self.assertNotEqual(a.Fingerprint(), b.Fingerprint())
+    b.formatters[-1] = Colorer('ff0000')
+    self.assertEqual(a.Fingerprint(), b.Fingerprint())
+
+  def testLambdasIdentifiedByObject(self):
+    a = google_chart_api.LineChart([1, 2, 3])
+    b = google_chart_api.LineChart([1, 2, 3])
+    first, second = [lambda chart: None for _ in range(2)]
+    a.AddFormatter(first)
+    b.AddFormatter(second)
+    self.assertNotEqual(a.Fingerprint(), b.Fingerprint())
+    b.formatters[-1] = first
+    self.assertEqual(a.Fingerprint(), b.Fingerprint())
+
+  def testEncoderFingerprintIncludesSettings(self):
+    self.chart.AddLine([1, 2, 3])
+    fingerprint = self.chart.display.Fingerprint()
+    self.chart.display.enhanced_encoding = True
+    self.assertNotEqual(fingerprint, self.chart.display.Fingerprint())
+
+  def testSeriesMinMaxValues(self):
+    self.assertEqual((1, 3), common.DataSeries([3, None, 1]).GetMinMaxValues())
+    self.assertEqual((None, None), common.DataSeries([]).GetMinMaxValues())
+    self.assertEqual((None, None),
+                     common.DataSeries([None, None]).GetMinMaxValues())
+    nan = float('nan')
+    series = common.DataSeries(array.array('d', [nan, 2, -1, nan]))
+    self.assertEqual((-1, 2), series.GetMinMaxValues())
+    series = common.DataSeries(array.array('d', [nan]))
+    self.assertEqual((None, None), series.GetMinMaxValues())
+
+  def testSeriesMinMaxValuesIncremental(self):
+    scanned = []
+    orig_min_max = util.MinMax
+    def RecordingMinMax(points):
+      scanned.append(len(points))
+      return orig_min_max(points)
+    util.MinMax = RecordingMinMax
+    try:
+      points = [5, 6, 7]
+      series = common.DataSeries(points)
+      self.assertEqual((5, 7), series.GetMinMaxValues())
+      self.assertEqual((5, 7), series.GetMinMaxValues())
+      points.extend([1, 2])
+      self.assertEqual((1, 7), series.GetMinMaxValues())
+      self.assertEqual([3, 2], scanned)
+      series.data = [0]
+      self.assertEqual((0, 0), series.GetMinMaxValues())
+      self.assertEqual([3, 2, 1], scanned)
+    finally:
+      util.MinMax = orig_min_max
+
+  def testInvalidate(self):
+    points = [5, 6, 7]
+    series = common.DataSeries(points)
+    self.assertEqual((5, 7), series.GetMinMaxValues())
+    version = series.version
+    points[0] = 9
+    series.Invalidate()
+    self.assertTrue(series.version > version)
+    self.assertEqual((6, 9), series.GetMinMaxValues())
+
+  def testPointsAreNotCopied(self):
+    points = [1, 2, 3]
+    view = common.DataSeries(points)._View()
+    self.assertTrue(view.points is points)
+    self.assertFalse(view.data is points)
+    self.assertRaises(AttributeError, setattr, view, 'points', [])
+
+  def testMinMaxCacheSurvivesRendering(self):
+    series = self.chart.AddLine([1, 2, 3])
+    self.chart.display.Url(100, 100)
+    self.assertEqual((3, 1, 3), series._min_max)
+
+  def testCompactSeriesRenderLikeLists(self):
+    self.chart.auto_scale.buffer = 0
+    points = [1, None, 3, 2]
+    self.chart.AddLine(points, markers=[(2, common.Marker('x', '0000ff', 5))])
+    url = self.chart.display.Url(100, 100)
+    fingerprint = self.chart.Fingerprint()
+    series = self.chart.data[0].Compact()
+    self.assertEqual('d', series.data.typecode)
+    self.assertEqual(url, self.chart.display.Url(100, 100))
+    self.assertEqual(fingerprint, self.chart.Fingerprint())
+    self.chart.display.enhanced_encoding = True
+    self.assertEqual('e:AA__..gA',
+                     self.chart.display._Params(self.chart)['chd'])
+
+  def testFormattedViewDoesNotChangeChart(self):
+    series = self.chart.AddLine([1, 2], label='a')
+    series.markers.append((0, common.Marker('x', '0000ff', 5)))
+    view = self.chart._GetFormattedView()
+    self.assertEqual('0000ff', view.data[0].style.color)
+    self.assertEqual(None, series.style.color)
+    self.assertNotEqual(None, view.left.min)
+    self.assertEqual(None, self.chart.left.min)
+    self.assertTrue(view._show_legend)
+    self.assertFalse(self.chart._show_legend)
+    self.assertEqual(series.markers, view.data[0].markers)
+
+  def testSlots(self):
+    series = self.chart.AddLine([1, 2])
+    for obj in (series, series.style, self.chart.left,
+                common.Marker('x', '0000ff', 5)):
+      self.assertFalse(hasattr(obj, '__dict__'))
+    self.assertRaises(AttributeError, setattr, self.chart.left, 'bogus', 1)
+
   # TODO: remove once AddSeries is deleted
   def testAddSeries(self):
     warnings.filterwarnings('ignore')
@@ -104,5 +321,82 @@ class CommonTest(graphy_test.GraphyTest):
     self.assertEqual('label', d.label)
     self.assertEqual(style, d.style)
 
+
+class ChartDataTest(graphy_test.NumpyTest):
+
+  def setUp(self):
+    graphy_test.NumpyTest.setUp(self)
+    self.values = [[1, 2, None, 4], [5, -1, 0, 3], [2, 2, 2, 2]]
+    self.labels = ['a', None, 'c']
+    self.colors = ['ff0000', None, '00ff00']
+
+  def ListChart(self):
+    chart = google_chart_api.LineChart()
+    for points, label, color in zip(self.values, self.labels, self.colors):
+      chart.AddLine(points, label=label, color=color)
+    return chart
+
+  def FrameChart(self):
+    chart = google_chart_api.LineChart()
+    chart.AddLines(self.values, labels=self.labels, colors=self.colors)
+    return chart
+
+  def testRendersLikeSeries(self):
+    for enhanced in (False, True):
+      chart, frame_chart = self.ListChart(), self.FrameChart()
+      self.assertTrue(isinstance(frame_chart.data, common.ChartData))
+      chart.display.enhanced_encoding = enhanced
+      frame_chart.display.enhanced_encoding = enhanced
+      self.assertEqual(chart.display.Url(100, 100),
+                       frame_chart.display.Url(100, 100))
+    self.assertEqual((-1, 5), frame_chart.GetMinMaxValues())
+
+  def testSeriesViews(self):
+    chart = self.FrameChart()
+    frame = chart.data
+    self.assertEqual(3, len(frame))
+    self.assertEqual('a', frame[0].label)
+    self.assertEqual([5, -1, 0, 3], list(frame[1].data))
+    self.assertEqual((2, 2), frame[-1].GetMinMaxValues())
+    before = chart.version
+    frame[1].label = 'b'
+    self.assertEqual('b', frame.labels[1])
+    self.assertTrue(chart.version > before)
+    before = chart.version
+    frame[2].style.color = '0000ff'
+    self.assertTrue(chart.version > before)
+    frame[2].data = [7, 8, 9, 10]
+    self.assertEqual((-1, 10), chart.GetMinMaxValues())
+    self.assertRaises(ValueError, setattr, frame[2], 'data', [1])
+
+  def testAppendAndDelete(self):
+    chart = google_chart_api.LineChart()
+    chart.AddLine([1, 2, 3], label='first')
+    chart.AddLines([[4, 5, 6]])
+    series = chart.AddLine([7, 8, 9])
+    self.assertEqual(3, len(chart.data))
+    self.assertEqual('first', chart.data[0].label)
+    self.assertEqual([7, 8, 9], list(series.data))
+    self.assertRaises(ValueError, chart.AddLine, [1, 2])
+    del chart.data[0]
+    self.assertEqual((4, 9), chart.GetMinMaxValues())
+    popped = chart.data.pop()
+    self.assertEqual([7, 8, 9], list(popped.data))
+    self.assertEqual(1, len(chart.data))
+
+  def testFormattersDontLeak(self):
+    chart = self.FrameChart()
+    def Formatter(chart):
+      chart.data[0].data[0] = 100
+      chart.data[0].label = 'changed'
+    chart.AddFormatter(Formatter)
+    before = chart.Fingerprint()
+    formatted = chart.GetFormattedChart()
+    self.assertEqual(100, formatted.data[0].data[0])
+    self.assertEqual(1, chart.data[0].data[0])
+    self.assertEqual('a', chart.data[0].label)
+    self.assertEqual(None, chart.data[1].style.color)
+    self.assertEqual(before, chart.Fingerprint())
+
 if __name__ == '__main__':
   graphy_test.main()
@@ -0,0 +1,336 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Algorithms for reducing dense data series to a handful of points.
+
+A chart which is only a few hundred pixels wide can't show more than a few
+hundred distinct x-values, so there is no point in sending every point of a
+50,000-point series to the renderer.  Each algorithm here takes a list of
+equally-spaced y-values (None meaning "no data") and returns a shorter list of
+equally-spaced y-values which looks about the same when drawn.
+
+The available algorithms are:
+  LargestTriangleThreeBuckets: Keeps the points which contribute most to the
+      visual shape of the line.  Good general-purpose choice.
+  MinMaxBuckets: Keeps the smallest & largest point of each bucket, so spikes
+      are never lost.
+  MeanBuckets: Averages each bucket.  Smooths out noise.
+
+The points may also be a chunked series (like graphy.sources.MappedPoints),
+which is then read one window of buckets at a time.
+"""
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from graphy import util
+
+
+def _Buckets(start, end, num_buckets):
+  """Split range(start, end) into num_buckets (start, end) pairs of about the
+  same size.
+  """
+  size = end - start
+  bounds = [start + (i * size) // num_buckets for i in xrange(num_buckets + 1)]
+  return zip(bounds[:-1], bounds[1:])
+
+
+def _Valid(points, start, end, offset=0):
+  """Return (index, value) pairs for the non-missing points in a bucket.
+
+  points holds the points from index offset onwards.
+  """
+  return [(i, points[i - offset]) for i in xrange(start, end)
+          if points[i - offset] is not None and
+          points[i - offset] == points[i - offset]]
+
+
+def _Windows(buckets, chunk_size, lookahead=0):
+  """Group consecutive buckets into windows of at most about chunk_size points
+  (but at least one bucket each).
+
+  Each window also includes the lookahead buckets which follow it, so
+  consecutive windows overlap by that many buckets.
+  """
+  windows = []
+  i = 0
+  last = len(buckets) - lookahead
+  while i < last:
+    j = i + 1
+    while j < last and buckets[j + lookahead][1] - buckets[i][0] <= chunk_size:
+      j += 1
+    windows.append(buckets[i:j + lookahead])
+    i = j
+  return windows
+
+
+def _RunWindow(args):
+  """Run an algorithm's bucket function over one window of a chunked series.
+
+  Module-level so that process pools can pickle it.
+  """
+  function, points, buckets = args
+  start = buckets[0][0]
+  return function(points[start:buckets[-1][1]], start, buckets)
+
+
+def _MapBuckets(function, points, buckets):
+  """Run function(points, offset, buckets) over all buckets & concatenate the
+  results.
+
+  Chunked series (see util.IsChunked) are read one window of buckets at a
+  time (in parallel, if the series has a pool), so they are never loaded into
+  memory all at once.
+  """
+  if not util.IsChunked(points):
+    return function(points, 0, buckets)
+  tasks = [(function, points, window)
+           for window in _Windows(buckets, points.chunk_size)]
+  out = []
+  for result in points.Map(_RunWindow, tasks):
+    out.extend(result)
+  return out
+
+
+def LargestTriangleThreeBuckets(points, threshold):
+  """Downsample with the Largest-Triangle-Three-Buckets algorithm.
+
+  The first & last points are always kept.  The remaining points are split
+  into threshold - 2 buckets, and from each bucket we keep the point which
+  forms the largest triangle with the point kept from the previous bucket and
+  the average of the next bucket.  With a threshold below 3 there are no
+  buckets, and only the first point (and the last, for 2) is kept.
+
+  Args:
+    points: List of y-values.  None marks missing data.
+    threshold: Number of points to return.
+  Returns:
+    A list of at most threshold y-values.
+  """
+  num_points = len(points)
+  if threshold >= num_points:
+    return list(points)
+  if threshold < 3:
+    return [points[0], points[-1]][:max(threshold, 0)]
+  out = [points[0]]
+  buckets = _Buckets(1, num_points - 1, threshold - 2)
+  buckets.append((num_points - 1, num_points))
+  prev = (0, points[0])
+  if util.IsChunked(points):
+    # Each bucket depends on the point picked from the one before, so the
+    # windows have to be processed in order.
+    for window in _Windows(buckets, points.chunk_size, lookahead=1):
+      start = window[0][0]
+      values, prev = _LargestTriangles(points[start:window[-1][1]], start,
+                                       window, prev)
+      out.extend(values)
+  else:
+    values, prev = _LargestTriangles(points, 0, buckets, prev)
+    out.extend(values)
+  out.append(points[-1])
+  return out
+
+
+def _LargestTriangles(points, offset, buckets, prev):
+  """Pick a point from each bucket but the last (which is only used as the
+  next bucket of the one before it).
+
+  Args:
+    points: The points from index offset onwards.
+    offset: The index of points[0] in the whole series.
+    buckets: List of (start, end) index pairs.
+    prev: (x, y) of the point picked before the first bucket.
+  Returns:
+    (picked y-values, (x, y) of the last picked point)
+  """
+  out = []
+  prev_x, prev_y = prev
+  for i, (start, end) in enumerate(buckets[:-1]):
+    candidates = _Valid(points, start, end, offset)
+    if not candidates:
+      out.append(None)
+      continue
+    next_points = _Valid(points, buckets[i + 1][0], buckets[i + 1][1], offset)
+    if next_points:
+      next_x = sum(x for x, _ in next_points) / float(len(next_points))
+      next_y = sum(y for _, y in next_points) / float(len(next_points))
+    else:
+      next_x, next_y = candidates[-1]
+    if prev_y is None or prev_y != prev_y:
+      # The previous point is missing, so measure from this bucket's start.
+      prev_x, prev_y = candidates[0]
+    best = None
+    best_area = -1
+    for x, y in candidates:
+      area = abs((prev_x - next_x) * (y - prev_y) -
+                 (prev_x - x) * (next_y - prev_y))
+      if area > best_area:
+        best_area = area
+        best = (x, y)
+    out.append(best[1])
+    prev_x, prev_y = best
+  return out, (prev_x, prev_y)
+
+
+def MinMaxBuckets(points, threshold):
+  """Downsample by keeping the min & max point of each bucket.
+
+  The points are split into threshold / 2 buckets.  Each bucket contributes
+  its smallest & largest value, in the order they appear in the data, so the
+  output has the same extremes as the input.  Buckets without data contribute
+  two missing values.  With a threshold below 2 there are no buckets, and
+  only the first point is kept.
+
+  Args:
+    points: List of y-values.  None marks missing data.
+    threshold: Maximum number of points to return.
+  Returns:
+    A list of at most threshold y-values.
+  """
+  num_points = len(points)
+  num_buckets = threshold // 2
+  if threshold >= num_points:
+    return list(points)
+  if num_buckets < 1:
+    # No room for a min & a max: keep the first point, like LTTB does.
+    return list(points[:max(threshold, 0)])
+  buckets = _Buckets(0, num_points, num_buckets)
+  if numpy is not None:
+    return _MapBuckets(_MinMaxBucketsArray, points, buckets)
+  return _MapBuckets(_MinMaxBuckets, points, buckets)
+
+
+def _MinMaxBuckets(points, offset, buckets):
+  """Pure-python version of MinMaxBuckets, for points from index offset on."""
+  out = []
+  for start, end in buckets:
+    valid = _Valid(points, start, end, offset)
+    if not valid:
+      out.extend([None, None])
+      continue
+    low = min(valid, key=lambda p: p[1])
+    high = max(valid, key=lambda p: p[1])
+    if high[0] < low[0]:
+      low, high = high, low
+    out.extend([low[1], high[1]])
+  return out
+
+
+def _MinMaxBucketsArray(points, offset, buckets):
+  """Vectorized version of MinMaxBuckets, for points from index offset on."""
+  data = util.AsFloatArray(points)
+  missing = numpy.isnan(data)
+  # NaNs never win a comparison, so they can't be picked as min or max.
+  lows = numpy.where(missing, numpy.inf, data)
+  highs = numpy.where(missing, -numpy.inf, data)
+  out = []
+  for start, end in buckets:
+    start -= offset
+    end -= offset
+    if missing[start:end].all():
+      out.extend([None, None])
+      continue
+    low = start + lows[start:end].argmin()
+    high = start + highs[start:end].argmax()
+    if high < low:
+      low, high = high, low
+    out.extend([float(data[low]), float(data[high])])
+  return out
+
+
+def MeanBuckets(points, threshold):
+  """Downsample by averaging the points in each bucket.
+
+  Args:
+    points: List of y-values.  None marks missing data.
+    threshold: Number of points to return.
+  Returns:
+    A list of at most threshold y-values.  Buckets without data are None.
+  """
+  num_points = len(points)
+  if threshold >= num_points:
+    return list(points)
+  if threshold < 1:
+    return []
+  buckets = _Buckets(0, num_points, threshold)
+  if numpy is not None:
+    return _MapBuckets(_MeanBucketsArray, points, buckets)
+  return _MapBuckets(_MeanBuckets, points, buckets)
+
+
+def _MeanBuckets(points, offset, buckets):
+  """Pure-python version of MeanBuckets, for points from index offset on."""
+  out = []
+  for start, end in buckets:
+    valid = _Valid(points, start, end, offset)
+    if valid:
+      out.append(sum(y for _, y in valid) / float(len(valid)))
+    else:
+      out.append(None)
+  return out
+
+
+def _MeanBucketsArray(points, offset, buckets):
+  """Vectorized version of MeanBuckets, for points from index offset on."""
+  data = util.AsFloatArray(points)
+  starts = [start - offset for start, _ in buckets]
+  missing = numpy.isnan(data)
+  sums = numpy.add.reduceat(numpy.where(missing, 0, data), starts)
+  counts = numpy.add.reduceat(~missing, starts)
+  out = []
+  for total, count in zip(sums, counts):
+    if count:
+      out.append(float(total) / count)
+    else:
+      out.append(None)
+  return out
+
+
+ALGORITHMS = {
+  'lttb': LargestTriangleThreeBuckets,
+  'minmax': MinMaxBuckets,
+  'mean': MeanBuckets,
+}
+
+
+def Downsample(points, threshold, algorithm='lttb'):
+  """Reduce points to about threshold points.
+
+  Args:
+    points: List of y-values.  None marks missing data.
+    threshold: The number of points to aim for.
+    algorithm: One of the names in ALGORITHMS ('lttb', 'minmax', 'mean'), or
+        a callable taking (points, threshold).
+  Returns:
+    The downsampled list of y-values.  If points is already short enough it
+    is returned unchanged.
+  """
+  if len(points) <= threshold:
+    return points
+  if not callable(algorithm):
+    algorithm = ALGORITHMS[algorithm]
+  return algorithm(points, threshold)
+
+
+def RemapPosition(x, old_length, new_length):
+  """Map an x position (point index) in a series of old_length points to the
+  equivalent position in a series of new_length equally-spaced points.
+  """
+  if old_length <= 1 or new_length == old_length:
+    return x
+  return x * (new_length - 1) / float(old_length - 1)
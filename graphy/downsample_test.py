@@ -0,0 +1,97 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for downsample.py."""
+
+import math
+
+from graphy import downsample
+from graphy import graphy_test
+
+
+class DownsampleTest(graphy_test.GraphyTest):
+
+  def setUp(self):
+    self.sine = [math.sin(i / 50.0) for i in range(1000)]
+
+  def testShortSeriesUntouched(self):
+    points = [1, 2, 3]
+    for name in downsample.ALGORITHMS:
+      self.assertTrue(downsample.Downsample(points, 10, name) is points)
+
+  def testLttbKeepsEndpoints(self):
+    out = downsample.Downsample(self.sine, 100, 'lttb')
+    self.assertEqual(100, len(out))
+    self.assertEqual(self.sine[0], out[0])
+    self.assertEqual(self.sine[-1], out[-1])
+    for y in out:
+      self.assertTrue(y in self.sine)
+
+  def testLttbPicksSpike(self):
+    points = [0] * 100
+    points[42] = 50
+    self.assertTrue(50 in downsample.Downsample(points, 10, 'lttb'))
+
+  def testMinMaxKeepsExtremes(self):
+    points = [0] * 1000
+    points[10] = -7
+    points[999] = 12
+    out = downsample.Downsample(points, 20, 'minmax')
+    self.assertEqual(20, len(out))
+    self.assertEqual(-7, min(out))
+    self.assertEqual(12, max(out))
+
+  def testMinMaxPreservesOrder(self):
+    out = downsample.MinMaxBuckets([5, 1, 9, 3, 0, 2], 4)
+    self.assertEqual([1, 9, 3, 0], out)
+
+  def testTinyThresholds(self):
+    for name in downsample.ALGORITHMS:
+      for threshold in range(3):
+        out = downsample.Downsample(self.sine, threshold, name)
+        self.assertTrue(len(out) <= threshold, (name, threshold, out))
+    self.assertEqual([self.sine[0]],
+                     downsample.Downsample(self.sine, 1, 'minmax'))
+
+  def testMean(self):
+    out = downsample.Downsample([1, 3, 5, 7, 9, 11], 3, 'mean')
+    self.assertEqual([2, 6, 10], out)
+
+  def testMissingData(self):
+    points = [1, 2, None, None, None, None, 3, 4]
+    self.assertEqual([1.5, None, None, 3.5],
+                     downsample.Downsample(points, 4, 'mean'))
+    self.assertEqual([1, 2, None, None, None, None, 3, 4],
+                     downsample.Downsample(points, 8, 'minmax'))
+    self.assertEqual([1, 2, None, None, 3, 4],
+                     downsample.Downsample(points, 6, 'minmax'))
+    self.assertEqual([1, 2, None, 3, 4, 5],
+                     downsample.Downsample(points + [None, 5], 6, 'lttb'))
+
+  def testCustomAlgorithm(self):
+    every_other = lambda points, threshold: points[::2]
+    self.assertEqual([0, 2, 4],
+                     downsample.Downsample(range(6), 3, every_other))
+
+  def testRemapPosition(self):
+    self.assertEqual(5, downsample.RemapPosition(5, 10, 10))
+    self.assertEqual(0, downsample.RemapPosition(0, 101, 11))
+    self.assertEqual(10, downsample.RemapPosition(100, 101, 11))
+    self.assertEqual(5, downsample.RemapPosition(50, 101, 11))
+
+
+if __name__ == '__main__':
+  graphy_test.main()
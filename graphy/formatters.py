@@ -25,10 +25,15 @@ modify the chart in some (hopefully useful) way.  For example, the AutoColor
 formatter makes sure each DataSeries has a color applied to it.  The formatter
 should take the chart to format as its only argument.
 
-(The formatters work on a deepcopy of the user's chart, so modifications
-shouldn't leak back into the user's original chart)
+(The formatters work on a copy of the user's chart, so modifications
+shouldn't leak back into the user's original chart.  The points of each data
+series are only copied when a formatter accesses series.data, so formatters
+which just need to read the points can use series.points instead.)
 """
 
+from graphy import util
+
+
 def AutoLegend(chart):
   """Automatically fill out the legend based on series labels.  This will only
   fill out the legend if is at least one series with a label.
@@ -45,7 +50,7 @@ def AutoLegend(chart):
     chart._legend_labels = labels
 
 
-class AutoColor(object):
+class AutoColor(util.Versioned):
   """Automatically add colors to any series without colors.
 
   Object attributes:
@@ -56,7 +61,10 @@ class AutoColor(object):
     # TODO: Add a few more default colors.
     # TODO: Add a default styles too, so if you don't specify color or
     # style, you get a unique set of colors & styles for your data.
-    self.colors = ['0000ff', 'ff0000', '00dd00', '000000']
+    self.colors = util.VersionedList(['0000ff', 'ff0000', '00dd00', '000000'])
+
+  def _GetVersion(self):
+    return max(self._version, util.GetVersion(self.colors))
 
   def __call__(self, chart):
     index = -1
@@ -68,7 +76,7 @@ class AutoColor(object):
         series.style.color = self.colors[index]
 
 
-class AutoScale(object):
+class AutoScale(util.Versioned):
   """If you don't set min/max on the dependent axes, this fills them in
   automatically by calculating min/max dynamically from the data.
 
@@ -116,7 +124,7 @@ class AutoScale(object):
         axis.max = max_value + buffer
 
 
-class LabelSeparator(object):
+class LabelSeparator(util.Versioned):
 
   """Adjust the label positions to avoid having them overlap.  This happens for
   any axis with minimum_label_spacing set.
@@ -169,6 +177,121 @@ class LabelSeparator(object):
     axis.label_positions = label_positions
 
 
+class LabelThinner(util.Versioned):
+
+  """Drop axis labels which can't fit in the image, keeping an evenly spaced
+  subset of the rest.  For example, a chart with a label for each day of the
+  year only shows a few dozen of them when drawn 400 pixels wide.
+
+  The size of the image comes from chart.render_context, which the backends
+  set while rendering, so this does nothing on charts formatted without one
+  (like GetFormattedChart() without a render_context).  Labels of horizontal
+  axes are assumed to be glyph_width pixels per character, and labels of
+  vertical axes glyph_height pixels tall.  The labels which are kept stay
+  where they were: labels without label_positions are given the evenly spread
+  positions they would have been drawn at, except on the independent axes of
+  bar charts, where each label belongs to a group of bars and the dropped
+  labels are blanked out instead.
+
+  Add it after AutoScale, since it needs the ranges of the axes.
+
+  Object attributes:
+    glyph_width:  Estimated width of a character, in pixels.
+    glyph_height: Estimated height of a label, in pixels.
+    padding:      Minimum space between labels, in pixels.
+  """
+
+  uses_render_context = True  # Tells the backends the output depends on size.
+
+  def __init__(self, glyph_width=6, glyph_height=12, padding=4):
+    self.glyph_width = glyph_width
+    self.glyph_height = glyph_height
+    self.padding = padding
+
+  def __call__(self, chart):
+    context = getattr(chart, 'render_context', None)
+    if context is None:
+      return
+    # Bar charts (the only charts with a 'vertical' attribute) put the labels
+    # of their independent axes on the groups of bars.
+    bar_axes = []
+    if hasattr(chart, 'vertical'):
+      bar_axes = chart.GetIndependentAxes()
+    for code, axis in chart._GetAxes():
+      bars = any(axis is bar_axis for bar_axis in bar_axes)
+      if code in 'xt':
+        self.ThinLabels(axis, context.width, True, bars)
+      else:
+        self.ThinLabels(axis, context.height, False, bars)
+
+  def ThinLabels(self, axis, pixels, horizontal, bars=False):
+    """Thin out the labels of one axis which is pixels long.
+
+    Args:
+      axis: The Axis.
+      pixels: Length of the axis, in pixels.
+      horizontal: True for the top & bottom axes.
+      bars: True if labels without positions go one per group of bars (the
+            independent axes of bar charts).  Those labels are blanked out
+            instead of dropped, so the rest stay with their bars.
+    """
+    count = len(axis.labels)
+    if count <= 1 or pixels <= 0:
+      return
+    positions = axis.label_positions
+    if bars and not positions:
+      # The groups of bars are evenly spaced, one per label.
+      spacing = pixels / float(count)
+      step = self._Step([i * spacing for i in xrange(count)],
+                        self._Extents(axis.labels, horizontal))
+      if step > 1:
+        axis.labels = [label if i % step == 0 else ''
+                       for i, label in enumerate(axis.labels)]
+      return
+    low, high = axis.min, axis.max
+    if low is None or high is None:
+      low, high = 0, 100  # The scale used when the axis has no range.
+    if low == high:
+      return
+    if not positions:
+      # The labels are spread evenly along the axis.  Give them explicit
+      # positions, so the ones we keep stay put.
+      spacing = (high - low) / float(count - 1)
+      positions = [low + i * spacing for i in xrange(count)]
+    scale = pixels / float(abs(high - low))
+    order = sorted(xrange(count), key=lambda i: positions[i])
+    offsets = [positions[i] * scale for i in order]
+    step = self._Step(offsets, self._Extents([axis.labels[i] for i in order],
+                                             horizontal))
+    if step == 1:
+      return
+    kept = sorted(order[::step])
+    axis.labels = [axis.labels[i] for i in kept]
+    axis.label_positions = [positions[i] for i in kept]
+
+  def _Extents(self, labels, horizontal):
+    """Return how far each label reaches on either side of its position."""
+    if horizontal:
+      # Labels are centered on their position, so half of each one's width is
+      # on either side.
+      return [len(unicode(label)) * self.glyph_width / 2.0 for label in labels]
+    return [self.glyph_height / 2.0] * len(labels)
+
+  def _Step(self, offsets, extents):
+    """Return the smallest step for which every step-th label fits, given the
+    labels' offsets (in increasing order) and extents in pixels.
+    """
+    # Checking a step looks at count / step labels, so trying them all in turn
+    # is O(n log n).
+    count = len(offsets)
+    for step in xrange(1, count):
+      if all(offsets[j] - offsets[j - step] >=
+             extents[j] + extents[j - step] + self.padding
+             for j in xrange(step, count, step)):
+        return step
+    return count
+
+
 def InlineLegend(chart):
   """Provide a legend for line charts by attaching labels to the right
   end of each line.  Supresses the regular legend.
@@ -182,7 +305,7 @@ def InlineLegend(chart):
     else:
       labels.append(series.label)
       show = True
-    label_positions.append(series.data[-1])
+    label_positions.append(series.points[-1])
 
   if show:
     chart.right.min = chart.left.min
@@ -102,5 +102,80 @@ class AutoScaleTest(graphy_test.GraphyTest):
     self.assertEqual(19, self.chart.left.max)
 
 
+class LabelThinnerTest(graphy_test.GraphyTest):
+
+  def setUp(self):
+    self.chart = google_chart_api.LineChart([1, 2, 3])
+    self.chart.bottom.labels = ['day%03d' % i for i in range(365)]
+    self.chart.AddFormatter(formatters.LabelThinner())
+
+  def Format(self, width, height):
+    return self.chart.GetFormattedChart(common.RenderContext(width, height))
+
+  def testNeedsRenderContext(self):
+    self.assertEqual(365, len(self.chart.GetFormattedChart().bottom.labels))
+
+  def testLabelsWithoutPositions(self):
+    # 6 characters * 6 pixels + 4 pixels padding = 40 pixels per label, and the
+    # labels are 400 / 364 pixels apart, so we keep every 37th.
+    bottom = self.Format(400, 100).bottom
+    self.assertEqual(['day%03d' % i for i in range(0, 365, 37)], bottom.labels)
+    self.assertEqual([i * (100 / 364.0) for i in range(0, 365, 37)],
+                     bottom.label_positions)
+    self.assertEqual(365, len(self.chart.bottom.labels))
+    self.assertEqual([], self.chart.bottom.label_positions)
+
+  def testRemovesLabelsWithPositions(self):
+    self.chart.bottom.min = 0
+    self.chart.bottom.max = 100
+    self.chart.bottom.labels = ['c', 'a', 'b', 'd']
+    self.chart.bottom.label_positions = [50, 0, 25, 75]
+    bottom = self.Format(30, 100).bottom
+    self.assertEqual(['c', 'a'], bottom.labels)
+    self.assertEqual([50, 0], bottom.label_positions)
+    bottom = self.Format(400, 100).bottom
+    self.assertEqual(['c', 'a', 'b', 'd'], bottom.labels)
+
+  def testVerticalAxesUseHeight(self):
+    self.chart.left.labels = [str(i) for i in range(11)]
+    self.chart.left.min = 0
+    self.chart.left.max = 10
+    left = self.Format(100, 100).left
+    self.assertEqual(['0', '2', '4', '6', '8', '10'], left.labels)
+    self.assertEqual([0, 2, 4, 6, 8, 10], left.label_positions)
+    self.assertEqual(11, len(self.Format(100, 200).left.labels))
+
+  def testHorizontalBarLabelsStayWithTheirBars(self):
+    chart = google_chart_api.BarChart([1, 2, 3, 4, 5])
+    chart.vertical = False
+    chart.left.labels = ['a', 'b', 'c', 'd', 'e']
+    chart.AddFormatter(formatters.LabelThinner())
+    # 40 pixels for 5 bars is 8 pixels per bar, and a label needs 16.
+    left = chart.GetFormattedChart(common.RenderContext(100, 40)).left
+    self.assertEqual(['a', '', 'c', '', 'e'], left.labels)
+    self.assertEqual([], left.label_positions)
+    params = chart.display._Params(chart, common.RenderContext(100, 40))
+    self.assertEqual('0:|e||c||a', params['chxl'])
+
+  def testBarLabelsStayWithTheirBars(self):
+    chart = google_chart_api.BarChart(range(10))
+    chart.bottom.labels = list('abcdefghij')
+    chart.AddFormatter(formatters.LabelThinner())
+    bottom = chart.GetFormattedChart(common.RenderContext(60, 40)).bottom
+    self.assertEqual(['a', '', 'c', '', 'e', '', 'g', '', 'i', ''],
+                     bottom.labels)
+    self.assertEqual([], bottom.label_positions)
+    bottom = chart.GetFormattedChart(common.RenderContext(200, 40)).bottom
+    self.assertEqual(list('abcdefghij'), bottom.labels)
+
+  def testUrls(self):
+    sizes = [(100, 100), (1000, 100)]
+    urls = self.chart.display.Urls(sizes)
+    self.assertEqual([self.chart.display.Url(*size) for size in sizes], urls)
+    self.assertTrue(len(urls[0]) < len(urls[1]))
+    self.assertEqual(urls[0], self.chart.display.Compile().Render(
+        [[1, 2, 3]], 100, 100))
+
+
 if __name__ == '__main__':
   graphy_test.main()
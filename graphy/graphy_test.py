@@ -18,6 +18,8 @@
 
 import unittest
 
+from graphy import util
+
 
 class GraphyTest(unittest.TestCase):
   """Base class for other Graphy tests."""
@@ -34,6 +36,11 @@ class GraphyTest(unittest.TestCase):
       msg = '"%s" unexpectedly found in "%s"' % (a, b)
     self.assert_(a not in b, msg)
 
+  def RequireNumpy(self):
+    """Skip the calling test if numpy isn't installed."""
+    if util.numpy is None:
+      self.skipTest('numpy is not installed')
+
   def Param(self, param_name, chart=None):
     """Helper to look up a Google Chart API parameter for the given chart."""
     if chart is None:
@@ -41,6 +48,14 @@ class GraphyTest(unittest.TestCase):
     params = chart.display._Params(chart)
     return params[param_name]
 
+class NumpyTest(GraphyTest):
+  """Base class for tests which all need numpy.  They are reported as
+  skipped when it isn't installed.
+  """
+
+  def setUp(self):
+    self.RequireNumpy()
+
 def main():
   """Wrap unittest.main (for convenience of caller)."""
   return unittest.main()
@@ -47,6 +47,7 @@ class Segment(common.DataSeries):
   def _SetSize(self, value):
     assert value >= 0
     self.data[0] = value
+    self._Touch()
 
   size = property(_GetSize, _SetSize,
                   doc = """The relative size of this pie segment.""")
@@ -108,7 +109,7 @@ class PieChart(common.BaseChart):
     num_colors = len(colors or [])
     num_labels = len(labels or [])
     pie_index = len(self.data)
-    self.data.append([])
+    self.data.append(util.VersionedList())
     for i, pt in enumerate(points):
       label = None
       if i < num_labels:
@@ -151,7 +152,7 @@ class PieChart(common.BaseChart):
     assert segment.size >= 0
     if pie_index == 0 and not self.data:
       # Create the default pie
-      self.data.append([])
+      self.data.append(util.VersionedList())
     assert (pie_index >= 0 and pie_index < len(self.data))
     self.data[pie_index].append(segment)
     return segment
@@ -53,6 +53,33 @@ class PieChartTest(graphy_test.GraphyTest):
     segment = chart.AddSegment(10, label='Dummy', color='0000ff')
     self.assertRaises(AssertionError, segment._SetSize, -5)
 
+  def testVersionTracksSegments(self):
+    chart = pie_chart.PieChart([1, 2])
+    version = chart.version
+    chart.AddSegment(3)
+    self.assertTrue(chart.version > version)
+    version = chart.version
+    chart.data[0][0].size = 7
+    self.assertTrue(chart.version > version)
+    version = chart.version
+    chart.AddPie([4, 5])
+    self.assertTrue(chart.version > version)
+    version = chart.version
+    chart.data[1].pop()
+    self.assertTrue(chart.version > version)
+
+  def testFingerprintCoversAllPies(self):
+    chart = pie_chart.PieChart([1, 2])
+    chart.AddPie([3, 4], labels=['a', 'b'])
+    fingerprint = chart.Fingerprint()
+    other = pie_chart.PieChart([1, 2])
+    other.AddPie([3, 4], labels=['a', 'b'])
+    self.assertEqual(fingerprint, other.Fingerprint())
+    chart.data[1][1].size = 5
+    self.assertNotEqual(fingerprint, chart.Fingerprint())
+    other.data[1][0].color = 'ff0000'
+    self.assertNotEqual(fingerprint, other.Fingerprint())
+
   # TODO: remove once the deprecation warning is removed
   def testAddSegmentOrder(self):
     chart = pie_chart.PieChart()
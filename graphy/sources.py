@@ -0,0 +1,218 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Data series which are read from disk instead of being held in memory.
+
+These are "chunked" series (see util.IsChunked): everything which has to look
+at all the points, like finding the min & max, downsampling, encoding or
+fingerprinting, reads them a chunk at a time.  So a chart can show a file
+which is much larger than memory, as long as the chart itself (after
+downsampling) is reasonably small.
+"""
+
+import array
+import mmap
+import os
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+from graphy import util
+
+
+def _ItemSize(dtype):
+  """Return the size in bytes of one point of the given dtype."""
+  if numpy is not None:
+    return numpy.dtype(dtype).itemsize
+  return array.array(dtype).itemsize
+
+
+def _ChunkMinMax(args):
+  """Return (min, max) of points[start:end].  Module-level so that process
+  pools can pickle it.
+  """
+  points, start, end = args
+  return util.MinMax(points.Read(start, end))
+
+
+class MappedPoints(object):
+
+  """A read-only series of points stored in a flat binary file.
+
+  The file is memory-mapped, so only the parts which are being looked at are
+  in memory.  Use it in place of a list of points:
+    chart.AddLine(sources.MappedPoints('latency.bin', dtype='f'))
+
+  Indexing returns a float; slicing & Chunks() return float arrays (numpy
+  float64 arrays if numpy is available, otherwise array.array('d')).  For
+  floating point data, NaN marks missing points.
+
+  Object attributes:
+    path:       Name of the file.
+    offset:     Byte offset of the first point in the file.
+    length:     Number of points.  Defaults to as many as fit in the rest of
+                the file.
+    dtype:      Type of the points: an array module typecode (like 'd' or
+                'f', in native byte order) or, if numpy is available, anything
+                numpy.dtype accepts (like '>f4').
+    chunk_size: Number of points to read at a time.
+    pool:       Optional pool (like multiprocessing.Pool or
+                multiprocessing.pool.ThreadPool) whose map method is used to
+                process the chunks in parallel.  The tasks can be pickled, so
+                process pools work too.
+  """
+
+  def __init__(self, path, offset=0, length=None, dtype='d',
+               chunk_size=1 << 20, pool=None):
+    """Construct a MappedPoints.  See class docstring for details on args."""
+    self.path = path
+    self.offset = offset
+    self.dtype = dtype
+    self.chunk_size = chunk_size
+    self.pool = pool
+    self.itemsize = _ItemSize(dtype)
+    if length is None:
+      length = (os.path.getsize(path) - offset) // self.itemsize
+    self.length = length
+    self._mmap = None
+
+  def _Map(self):
+    """Return the memory map of the file, mapping it on first use."""
+    if self._mmap is None:
+      f = open(self.path, 'rb')
+      try:
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      finally:
+        f.close()
+    return self._mmap
+
+  def Close(self):
+    """Unmap the file.  It is mapped again if the points are used again."""
+    if self._mmap is not None:
+      self._mmap.close()
+      self._mmap = None
+
+  def Read(self, start, end):
+    """Return the points from index start up to (not including) end, as a
+    float array.
+    """
+    start = max(0, min(start, self.length))
+    end = max(start, min(end, self.length))
+    count = end - start
+    byte_start = self.offset + start * self.itemsize
+    if numpy is not None:
+      if not count:
+        return numpy.zeros(0)
+      raw = numpy.frombuffer(self._Map(), dtype=self.dtype, count=count,
+                             offset=byte_start)
+      return raw.astype(numpy.float64)
+    points = array.array(self.dtype)
+    if count:
+      points.fromstring(self._Map()[byte_start:
+                                    byte_start + count * self.itemsize])
+    if points.typecode != 'd':
+      points = array.array('d', points)
+    return points
+
+  def _ReadStrided(self, start, end, step):
+    """Return the points of the slice start:end:step (with step other than
+    1), reading chunks of about chunk_size points at a time.
+    """
+    indexes = xrange(start, end, step)
+    if not len(indexes):
+      return self.Read(0, 0)
+    low = min(indexes[0], indexes[-1])
+    high = max(indexes[0], indexes[-1]) + 1
+    stride = abs(step)
+    # Each read starts on one of the indexes, so it can be strided itself.
+    size = max(stride, self.chunk_size - self.chunk_size % stride)
+    pieces = [self.Read(chunk_start, min(chunk_start + size, high))[::stride]
+              for chunk_start in xrange(low, high, size)]
+    if numpy is not None:
+      points = numpy.concatenate(pieces)
+    else:
+      points = array.array('d')
+      for piece in pieces:
+        points.extend(piece)
+    if step < 0:
+      points = points[::-1]
+    return points
+
+  def _Ranges(self):
+    """Return the (start, end) index pairs of the chunks."""
+    return [(start, min(start + self.chunk_size, self.length))
+            for start in xrange(0, self.length, self.chunk_size)]
+
+  def Chunks(self):
+    """Yield the points as consecutive float arrays of up to chunk_size
+    points.
+    """
+    for start, end in self._Ranges():
+      yield self.Read(start, end)
+
+  def Map(self, function, args):
+    """Return map(function, args), using the pool if there is one."""
+    if self.pool is not None:
+      return self.pool.map(function, args)
+    return map(function, args)
+
+  def MinMax(self):
+    """Return (min, max) of the points, ignoring NaN, or (None, None) if there
+    are no such points.
+    """
+    results = self.Map(_ChunkMinMax, [(self, start, end)
+                                      for start, end in self._Ranges()])
+    results = [result for result in results if result[0] is not None]
+    if not results:
+      return None, None
+    return (min(low for low, _ in results), max(high for _, high in results))
+
+  def __len__(self):
+    return self.length
+
+  def __iter__(self):
+    for chunk in self.Chunks():
+      for x in chunk:
+        yield float(x)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      start, end, step = index.indices(self.length)
+      if step == 1:
+        return self.Read(start, end)
+      return self._ReadStrided(start, end, step)
+    if index < 0:
+      index += self.length
+    if index < 0 or index >= self.length:
+      raise IndexError('MappedPoints index out of range')
+    return float(self.Read(index, index + 1)[0])
+
+  # The points are read-only, so copies can share the file.
+  def __copy__(self):
+    return self
+
+  def __deepcopy__(self, memo):
+    return self
+
+  def __getstate__(self):
+    # Memory maps & pools can't be pickled.  The copy maps the file again,
+    # and processes its chunks itself.
+    state = self.__dict__.copy()
+    state['_mmap'] = None
+    state['pool'] = None
+    return state
@@ -0,0 +1,149 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for sources.py."""
+
+import array
+import os
+import pickle
+import tempfile
+from multiprocessing import pool as multiprocessing_pool
+
+from graphy import downsample
+from graphy import graphy_test
+from graphy import sources
+from graphy import util
+from graphy.backends import google_chart_api
+
+
+class MappedPointsTest(graphy_test.GraphyTest):
+
+  def setUp(self):
+    self.points = [float((i * 37) % 101) for i in range(1000)]
+    self.points[500] = 150
+    self.points[3:10] = [None] * 7
+    self.path = self.WriteFile(self.points, 'd')
+
+  def tearDown(self):
+    os.remove(self.path)
+
+  def WriteFile(self, points, typecode, header=''):
+    fd, path = tempfile.mkstemp()
+    f = os.fdopen(fd, 'wb')
+    f.write(header)
+    f.write(array.array(typecode, util.CompactPoints(points)).tostring())
+    f.close()
+    return path
+
+  def Mapped(self, **kwargs):
+    kwargs.setdefault('chunk_size', 64)
+    return sources.MappedPoints(self.path, **kwargs)
+
+  def testSequence(self):
+    points = self.Mapped()
+    self.assertEqual(1000, len(points))
+    self.assertEqual(self.points[2], points[2])
+    self.assertEqual(self.points[-1], points[-1])
+    self.assertTrue(points[5] != points[5])  # NaN
+    self.assertEqual(self.points[100:110], list(points[100:110]))
+    self.assertEqual(self.points[990:], list(points)[990:])
+    self.assertRaises(IndexError, points.__getitem__, 1000)
+
+  def testStridedSlicesReadChunks(self):
+    points = self.Mapped()
+    reads = []
+    orig_read = points.Read
+    def RecordingRead(start, end):
+      reads.append(end - start)
+      return orig_read(start, end)
+    points.Read = RecordingRead
+    for index in (slice(None, None, 3), slice(10, 900, 7), slice(5, 6, 2),
+                  slice(None, None, -1), slice(900, 10, -5), slice(3, 3, 2)):
+      actual = [x if x == x else None for x in points[index]]  # NaN -> None
+      self.assertEqual(self.points[index], actual)
+    self.assertTrue(max(reads) <= 64)
+
+  def testTinyThresholdsReadEnds(self):
+    points = self.Mapped()
+    self.assertEqual([self.points[0], self.points[-1]],
+                     downsample.LargestTriangleThreeBuckets(points, 2))
+    self.assertEqual([self.points[0]],
+                     downsample.LargestTriangleThreeBuckets(points, 1))
+    self.assertEqual([self.points[0]], downsample.MinMaxBuckets(points, 1))
+    self.assertEqual([], downsample.MeanBuckets(points, 0))
+
+  def testOffsetLengthAndType(self):
+    os.remove(self.path)
+    self.path = self.WriteFile([1, 2, 3, 4], 'f', header='header')
+    points = sources.MappedPoints(self.path, offset=6, length=3, dtype='f')
+    self.assertEqual([1, 2, 3], list(points))
+
+  def testMinMax(self):
+    self.assertEqual((0, 150), self.Mapped().MinMax())
+    self.assertEqual((0, 150), util.MinMax(self.Mapped()))
+
+  def testDownsampleMatchesLists(self):
+    for name in downsample.ALGORITHMS:
+      for threshold in (10, 101, 400):
+        self.assertEqual(downsample.Downsample(self.points, threshold, name),
+                         downsample.Downsample(self.Mapped(), threshold, name))
+
+  def testChartMatchesLists(self):
+    chart = google_chart_api.LineChart(self.points)
+    mapped_chart = google_chart_api.LineChart(self.Mapped())
+    self.assertEqual(chart.display.Url(200, 100),
+                     mapped_chart.display.Url(200, 100))
+    self.assertEqual(chart.Fingerprint(), mapped_chart.Fingerprint())
+    chart.display.downsampling = mapped_chart.display.downsampling = 'lttb'
+    self.assertEqual(chart.display.Url(200, 100),
+                     mapped_chart.display.Url(200, 100))
+
+  def testChunkedTextEncoding(self):
+    os.remove(self.path)
+    self.path = self.WriteFile([1, 2, 3, 4, 5], 'd')
+    for encoding in ('text', 'auto'):
+      chart = google_chart_api.LineChart([1, 2, 3, 4, 5])
+      mapped_chart = google_chart_api.LineChart(self.Mapped(chunk_size=2))
+      chart.display.encoding = mapped_chart.display.encoding = encoding
+      self.assertEqual(chart.display.Url(200, 100),
+                       mapped_chart.display.Url(200, 100))
+    mapped_chart.display.encoding = 'text'
+    self.assertEqual('t:5,27,50,73,95', self.Param('chd', mapped_chart))
+
+  def testPool(self):
+    pool = multiprocessing_pool.ThreadPool(2)
+    try:
+      points = self.Mapped(pool=pool)
+      self.assertEqual((0, 150), points.MinMax())
+      self.assertEqual(downsample.Downsample(self.points, 100, 'minmax'),
+                       downsample.Downsample(points, 100, 'minmax'))
+      chart = google_chart_api.LineChart(self.points)
+      mapped_chart = google_chart_api.LineChart(points)
+      self.assertEqual(chart.display.Url(200, 100),
+                       mapped_chart.display.Url(200, 100))
+    finally:
+      pool.close()
+      pool.join()
+
+  def testPickle(self):
+    points = self.Mapped()
+    points[0]
+    copy = pickle.loads(pickle.dumps(points))
+    self.assertEqual(list(points[100:200]), list(copy[100:200]))
+
+
+if __name__ == '__main__':
+  graphy_test.main()
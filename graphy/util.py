@@ -1,3 +1,22 @@
+"""Utility functions used by the core chart classes."""
+
+import array
+import copy
+import functools
+import itertools
+import os
+import struct
+import sys
+import threading
+import types
+import weakref
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
 def _IsColor(color):
   """Try to determine if color is a hex color string.  
   Labels that look like hex colors will match too, unfortunately."""
@@ -11,3 +30,480 @@ def _IsColor(color):
     if letter not in hex_letters:
       return False
   return True
+
+
+# Versions come from a single process-wide counter, so a version number is
+# never reused and newer changes always have higher versions.  (Calling next
+# on a count is atomic, so this is safe across threads.)
+NextVersion = itertools.count(1).next
+
+
+class Versioned(object):
+
+  """Mixin for objects which track changes to their attributes.
+
+  Every attribute assignment gives the object a new version, so comparing
+  version numbers is a cheap way to find out whether an object has changed.
+  Mutating a mutable attribute in place (like appending to a list) is not
+  noticed; assign the attribute again, or call Invalidate().
+
+  Object attributes:
+    version: Read-only.  A number which increases whenever the object changes.
+
+  Subclasses may define __slots__; they must include '_version' in them.
+  """
+
+  __slots__ = ()
+  _version = 0
+
+  def __setattr__(self, name, value):
+    object.__setattr__(self, name, value)
+    object.__setattr__(self, '_version', NextVersion())
+
+  def _Touch(self):
+    """Record a change which didn't go through attribute assignment."""
+    object.__setattr__(self, '_version', NextVersion())
+
+  def Invalidate(self):
+    """Tell the object it was changed in place (like changing some of the
+    points of a series), so caches which depend on it are refreshed.
+    """
+    self._Touch()
+
+  # copy & deepcopy are much faster this way than through their generic
+  # (__reduce_ex__) path for slotted objects, and charts copy a lot of these
+  # each time they are rendered.  The copy keeps the original's version.
+  def __copy__(self):
+    return self._Copy(None)
+
+  def __deepcopy__(self, memo):
+    return self._Copy(memo)
+
+  def _Copy(self, memo):
+    """Return a shallow copy of self, or a deep one if memo (the deepcopy
+    memo dict) isn't None.
+    """
+    cls = self.__class__
+    clone = cls.__new__(cls)
+    if memo is not None:
+      memo[id(self)] = clone
+    set_attribute = object.__setattr__
+    for name in _DataSlotNames(cls):
+      try:
+        value = getattr(self, name)
+      except AttributeError:
+        continue  # Never set.
+      if memo is not None:
+        value = copy.deepcopy(value, memo)
+      set_attribute(clone, name, value)
+    for name, value in getattr(self, '__dict__', {}).iteritems():
+      if memo is not None:
+        value = copy.deepcopy(value, memo)
+      set_attribute(clone, name, value)
+    return clone
+
+  def _GetVersion(self):
+    """Return the version.  Subclasses which contain other versioned objects
+    should override this to take theirs into account.
+    """
+    return self._version
+
+  version = property(lambda self: self._GetVersion(),
+                     doc="""Increases whenever this object changes.""")
+
+
+def _Mutator(base, name):
+  """Wrap the method called name of base (list or dict) so it also updates
+  the version.
+  """
+  method = getattr(base, name)
+  def Inner(self, *args, **kwargs):
+    self._version = NextVersion()
+    return method(self, *args, **kwargs)
+  Inner.__name__ = name
+  return Inner
+
+
+class VersionedList(list):
+
+  """A list which tracks changes to its contents (see Versioned)."""
+
+  _version = 0
+
+  for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'sort',
+                'reverse', '__setitem__', '__delitem__', '__setslice__',
+                '__delslice__', '__iadd__', '__imul__'):
+    locals()[_name] = _Mutator(list, _name)
+  del _name
+
+  version = property(lambda self: self._version)
+
+
+class VersionedDict(dict):
+
+  """A dict which tracks changes to its contents (see Versioned)."""
+
+  _version = 0
+
+  for _name in ('__setitem__', '__delitem__', 'clear', 'pop', 'popitem',
+                'setdefault', 'update'):
+    locals()[_name] = _Mutator(dict, _name)
+  del _name
+
+  version = property(lambda self: self._version)
+
+
+def GetVersion(obj):
+  """Return obj.version, or 0 for objects which don't track versions."""
+  return getattr(obj, 'version', 0)
+
+
+class LRUCache(object):
+
+  """A size-bounded mapping which evicts the least recently used entries.
+
+  Safe to share between threads.
+
+  Object attributes:
+    max_size: Maximum number of entries to keep.
+    hits:     Number of Get calls which found their key.
+    misses:   Number of Get calls which didn't.
+  """
+
+  # Indexes into the [prev, next, key, value] entries of the linked list.
+  _PREV, _NEXT, _KEY, _VALUE = range(4)
+
+  def __init__(self, max_size=128):
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self.Clear()
+
+  def Clear(self):
+    """Drop all entries (but keep the hit/miss counters)."""
+    self._lock.acquire()
+    try:
+      self._entries = {}
+      # Circular doubly-linked list, most recently used entry first.
+      self._root = []
+      self._root[:] = [self._root, self._root, None, None]
+    finally:
+      self._lock.release()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def Get(self, key, default=None):
+    """Return the value for key (marking it as recently used), or default."""
+    self._lock.acquire()
+    try:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return default
+      self.hits += 1
+      self._Unlink(entry)
+      self._LinkFirst(entry)
+      return entry[self._VALUE]
+    finally:
+      self._lock.release()
+
+  def Put(self, key, value):
+    """Store value under key, evicting the oldest entries if needed."""
+    self._lock.acquire()
+    try:
+      entry = self._entries.get(key)
+      if entry is not None:
+        self._Unlink(entry)
+        entry[self._VALUE] = value
+      else:
+        entry = [None, None, key, value]
+        self._entries[key] = entry
+      self._LinkFirst(entry)
+      while len(self._entries) > self.max_size:
+        oldest = self._root[self._PREV]
+        self._Unlink(oldest)
+        del self._entries[oldest[self._KEY]]
+    finally:
+      self._lock.release()
+
+  def _Unlink(self, entry):
+    entry[self._PREV][self._NEXT] = entry[self._NEXT]
+    entry[self._NEXT][self._PREV] = entry[self._PREV]
+
+  def _LinkFirst(self, entry):
+    first = self._root[self._NEXT]
+    entry[self._PREV] = self._root
+    entry[self._NEXT] = first
+    first[self._PREV] = entry
+    self._root[self._NEXT] = entry
+
+
+# Bookkeeping attributes which don't affect how anything is rendered.
+_UNHASHED_ATTRIBUTES = frozenset(['_version', '_copy_on_access', '_min_max',
+                                  '_origin'])
+
+_FUNCTION_TYPES = (types.FunctionType, types.BuiltinFunctionType,
+                   types.ClassType, type)
+
+
+def IsArray(points):
+  """Return True if points is stored in an array (as opposed to a list)."""
+  return isinstance(points, array.array) or (
+      numpy is not None and isinstance(points, numpy.ndarray))
+
+
+# The quiet NaN numpy uses for missing values.  (float('nan') may have its
+# sign bit set, which would make otherwise identical series hash differently.)
+NAN = struct.unpack('<d', '\x00\x00\x00\x00\x00\x00\xf8\x7f')[0]
+
+
+def IsChunked(points):
+  """Return True if points is a chunked series (like sources.MappedPoints),
+  which should be processed a chunk at a time instead of all at once.
+
+  Chunked series provide len(), indexing, slicing (which returns a float
+  array), Chunks() (which yields consecutive float arrays), MinMax(),
+  Map(function, args) (which is map, possibly spread over a pool) and a
+  chunk_size attribute.
+  """
+  return hasattr(points, 'Chunks')
+
+
+def AsFloatArray(points):
+  """Return points as a float64 numpy array, with NaN for None.
+
+  Arrays of doubles (array.array('d')) are wrapped without copying.  Requires
+  numpy.
+  """
+  if isinstance(points, array.array) and points.typecode == 'd':
+    return numpy.frombuffer(points, dtype=numpy.float64)
+  return numpy.asarray(points, dtype=numpy.float64)
+
+
+def CompactPoints(points):
+  """Return points as an array.array of doubles, with NaN for None.
+
+  This takes 8 bytes per point, instead of the 24 (or more) bytes of a boxed
+  float plus a list slot, and can be handed to numpy without copying.
+  """
+  if isinstance(points, array.array) and points.typecode == 'd':
+    return points
+  if numpy is not None and isinstance(points, numpy.ndarray):
+    compact = array.array('d')
+    compact.fromstring(AsFloatArray(points).tostring())
+    return compact
+  try:
+    return array.array('d', points)
+  except TypeError:
+    # There are gaps in the data.
+    return array.array('d', [NAN if x is None else x for x in points])
+
+
+def MinMax(points):
+  """Return (min, max) of points, ignoring None & NaN, or (None, None) if
+  there are no such points.
+  """
+  if IsChunked(points):
+    return points.MinMax()
+  if numpy is not None and IsArray(points):
+    points = AsFloatArray(points)
+    if not len(points):
+      return None, None
+    # fmin & fmax skip NaNs, so this doesn't need a filtered copy.
+    low = numpy.fmin.reduce(points)
+    if low != low:
+      return None, None  # All NaN.
+    return low.item(), numpy.fmax.reduce(points).item()
+  if IsArray(points):
+    points = [x for x in points if x == x]
+  elif None in points:
+    points = [x for x in points if x is not None]
+  if not len(points):
+    return None, None
+  return min(points), max(points)
+
+
+def PointsBuffer(points):
+  """Return the points of a data series as a string of packed doubles (with
+  NaN for None), for hashing.
+  """
+  if numpy is not None:
+    points = AsFloatArray(points)
+    missing = numpy.isnan(points)
+    if missing.any():
+      points = numpy.where(missing, NAN, points)
+    return points.tostring()
+  points = CompactPoints(points)
+  if [x for x in points if x != x]:
+    points = array.array('d', [NAN if x != x else x for x in points])
+  return points.tostring()
+
+
+def UpdatePointsDigest(digest, points):
+  """Feed the points of a data series into a hashlib digest, as packed doubles
+  (see PointsBuffer).  Chunked series are hashed a chunk at a time.
+  """
+  if IsChunked(points):
+    for chunk in points.Chunks():
+      digest.update(PointsBuffer(chunk))
+  else:
+    digest.update(PointsBuffer(points))
+
+
+def UpdateDigest(digest, value):
+  """Feed a stable representation of value into a hashlib digest.
+
+  Handles the builtin types, functions (see _UpdateFunctionDigest), and
+  objects (by class & attributes).  Objects can customize this by defining
+  _UpdateDigest(self, digest).
+  """
+  if value is None or isinstance(value, (bool, int, long, float, basestring)):
+    digest.update(repr(value))
+  elif isinstance(value, (list, tuple)):
+    digest.update('[')
+    for item in value:
+      UpdateDigest(digest, item)
+      digest.update(',')
+    digest.update(']')
+  elif isinstance(value, dict):
+    digest.update('{')
+    for key in sorted(value):
+      UpdateDigest(digest, key)
+      digest.update(':')
+      UpdateDigest(digest, value[key])
+      digest.update(',')
+    digest.update('}')
+  elif isinstance(value, array.array) or (
+      numpy is not None and isinstance(value, numpy.ndarray)):
+    buf = PointsBuffer(value)
+    digest.update('<%d:' % len(buf))
+    digest.update(buf)
+  elif isinstance(value, types.MethodType):
+    # Bound methods are identified by their function, not their (possibly
+    # self-referencing) object.
+    UpdateDigest(digest, value.im_func)
+  elif isinstance(value, types.FunctionType):
+    _UpdateFunctionDigest(digest, value)
+  elif isinstance(value, types.BuiltinMethodType) and not isinstance(
+      getattr(value, '__self__', None), (types.NoneType, types.ModuleType)):
+    # A builtin method bound to an object, like some_list.append.
+    digest.update('%s:' % value.__name__)
+    UpdateDigest(digest, value.__self__)
+  elif isinstance(value, _FUNCTION_TYPES):
+    digest.update('%s.%s' % (value.__module__, value.__name__))
+  elif isinstance(value, functools.partial):
+    UpdateDigest(digest, (functools.partial, value.func, value.args,
+                          value.keywords or {}))
+  elif hasattr(value, '_UpdateDigest'):
+    value._UpdateDigest(digest)
+  else:
+    UpdateDigest(digest, (value.__class__, GetState(value)))
+
+
+# Functions which can't be identified by name are identified by object, with
+# a serial number which is never reused (unlike id()).  The token keeps serial
+# numbers from different processes apart.
+_PROCESS_TOKEN = os.urandom(8).encode('hex')
+_function_serials = weakref.WeakKeyDictionary()
+_NextFunctionSerial = itertools.count(1).next
+_function_lock = threading.Lock()
+_digest_state = threading.local()
+
+
+def _FunctionSerial(func):
+  """Return a number which identifies func for as long as this process runs."""
+  _function_lock.acquire()
+  try:
+    serial = _function_serials.get(func)
+    if serial is None:
+      serial = _function_serials[func] = _NextFunctionSerial()
+    return serial
+  finally:
+    _function_lock.release()
+
+
+def _UpdateFunctionDigest(digest, func):
+  """Feed a function into a digest.
+
+  Module-level functions are identified by name.  Named nested functions (like
+  closures returned by a factory) are identified by where they are defined,
+  plus their default arguments and the contents of their closure, so closures
+  which captured different values get different digests.  Lambdas can't be
+  told apart by name or line, so they are identified by object: their digests
+  are only stable within this process.
+  """
+  code = func.func_code
+  name = '%s.%s:%s' % (func.__module__, func.__name__, code.co_firstlineno)
+  module = sys.modules.get(func.__module__)
+  if getattr(module, func.__name__, None) is func:
+    digest.update(name)
+    return
+  if func.__name__ == '<lambda>':
+    digest.update('%s#%s.%d' % (name, _PROCESS_TOKEN, _FunctionSerial(func)))
+    return
+  # A closure may refer to itself (or to another function which refers back
+  # to it), so keep track of the functions we're in the middle of.
+  active = getattr(_digest_state, 'functions', None)
+  if active is None:
+    active = _digest_state.functions = {}
+  if func in active:
+    digest.update('<%s:%d>' % (name, active[func]))
+    return
+  active[func] = len(active)
+  try:
+    digest.update('<%s:' % name)
+    UpdateDigest(digest, func.func_defaults)
+    cells = []
+    for cell in func.func_closure or ():
+      try:
+        cells.append(cell.cell_contents)
+      except ValueError:  # The variable hasn't been assigned yet.
+        cells.append(_EmptyCell)
+    UpdateDigest(digest, cells)
+    digest.update('>')
+  finally:
+    del active[func]
+
+
+class _EmptyCell(object):
+  """Stands in for the value of a closure variable which isn't bound yet."""
+
+
+def _SlotNames(cls):
+  """Return the names of the slots defined by cls and its base classes."""
+  names = []
+  for klass in cls.__mro__:
+    slots = klass.__dict__.get('__slots__', ())
+    if isinstance(slots, basestring):
+      slots = [slots]
+    names.extend(slots)
+  return names
+
+
+_data_slot_names = {}
+
+
+def _DataSlotNames(cls):
+  """Return the names of the slots of cls which hold attribute values (not
+  __weakref__, and not slots hidden by properties of subclasses).
+  """
+  names = _data_slot_names.get(cls)
+  if names is None:
+    names = [name for name in _SlotNames(cls)
+             if isinstance(getattr(cls, name, None), types.MemberDescriptorType)]
+    _data_slot_names[cls] = names
+  return names
+
+
+def GetState(obj):
+  """Return the attributes of obj which affect rendering, as a dict."""
+  state = {}
+  for name, value in getattr(obj, '__dict__', {}).iteritems():
+    if name not in _UNHASHED_ATTRIBUTES:
+      state[name] = value
+  for name in _SlotNames(obj.__class__):
+    if name not in _UNHASHED_ATTRIBUTES and hasattr(obj, name):
+      state[name] = getattr(obj, name)
+  return state
@@ -0,0 +1,149 @@
+#!/usr/bin/python2.4
+#
+# Copyright 2008 Google Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for util.py."""
+
+import array
+import copy
+import threading
+
+from graphy import graphy_test
+from graphy import util
+
+
+class _Thing(util.Versioned):
+  pass
+
+
+class _SlottedThing(util.Versioned):
+  __slots__ = ('_version', 'x')
+
+
+class VersionedTest(graphy_test.GraphyTest):
+
+  def testAssignmentBumpsVersion(self):
+    obj = _Thing()
+    self.assertEqual(0, obj.version)
+    obj.x = 1
+    first = obj.version
+    obj.x = 1
+    self.assertTrue(obj.version > first)
+
+  def testContainers(self):
+    items = util.VersionedList([1, 2])
+    for change in (lambda: items.append(3), lambda: items.pop(),
+                   lambda: items.__setitem__(0, 5), items.sort):
+      before = items.version
+      change()
+      self.assertTrue(items.version > before)
+    params = util.VersionedDict()
+    params['a'] = 1
+    before = params.version
+    params.update(b=2)
+    self.assertTrue(params.version > before)
+    self.assertEqual({'a': 1, 'b': 2}, params)
+
+  def testSlots(self):
+    obj = _SlottedThing()
+    obj.x = 1
+    self.assertTrue(obj.version > 0)
+    self.assertFalse(hasattr(obj, '__dict__'))
+    self.assertEqual({'x': 1}, util.GetState(obj))
+
+  def testCopy(self):
+    for obj in (_Thing(), _SlottedThing()):
+      obj.x = [1, 2]
+      shallow = copy.copy(obj)
+      deep = copy.deepcopy(obj)
+      for clone in (shallow, deep):
+        self.assertEqual(obj.__class__, clone.__class__)
+        self.assertEqual([1, 2], clone.x)
+        self.assertEqual(obj.version, clone.version)
+      self.assertTrue(shallow.x is obj.x)
+      self.assertFalse(deep.x is obj.x)
+    self.assertFalse(hasattr(copy.copy(_SlottedThing()), 'x'))
+
+
+class CompactPointsTest(graphy_test.GraphyTest):
+
+  def testGapsBecomeNaN(self):
+    points = util.CompactPoints([1, None, 3])
+    self.assertEqual('d', points.typecode)
+    self.assertEqual(1, points[0])
+    self.assertTrue(points[1] != points[1])
+    self.assertEqual(3, points[2])
+    self.assertEqual((1, 3), util.MinMax(points))
+
+  def testSameBytesAsList(self):
+    self.assertEqual(util.PointsBuffer([1, None, 2.5]),
+                     util.PointsBuffer(util.CompactPoints([1, None, 2.5])))
+
+  def testCompactPointsAreNotCopied(self):
+    points = array.array('d', [1, 2])
+    self.assertTrue(util.CompactPoints(points) is points)
+
+
+class LRUCacheTest(graphy_test.GraphyTest):
+
+  def testGetAndPut(self):
+    cache = util.LRUCache(2)
+    self.assertEqual(None, cache.Get('a'))
+    cache.Put('a', 1)
+    self.assertEqual(1, cache.Get('a'))
+    self.assertEqual('x', cache.Get('b', 'x'))
+    self.assertEqual(1, cache.hits)
+    self.assertEqual(2, cache.misses)
+
+  def testEvictsLeastRecentlyUsed(self):
+    cache = util.LRUCache(2)
+    cache.Put('a', 1)
+    cache.Put('b', 2)
+    cache.Get('a')
+    cache.Put('c', 3)
+    self.assertEqual(2, len(cache))
+    self.assertEqual(1, cache.Get('a'))
+    self.assertEqual(None, cache.Get('b'))
+    self.assertEqual(3, cache.Get('c'))
+
+  def testReplaceValue(self):
+    cache = util.LRUCache(2)
+    cache.Put('a', 1)
+    cache.Put('a', 2)
+    self.assertEqual(1, len(cache))
+    self.assertEqual(2, cache.Get('a'))
+
+  def testClear(self):
+    cache = util.LRUCache(2)
+    cache.Put('a', 1)
+    cache.Clear()
+    self.assertEqual(0, len(cache))
+    self.assertEqual(None, cache.Get('a'))
+
+  def testClearWaitsForLock(self):
+    cache = util.LRUCache(2)
+    cache.Put('a', 1)
+    cache._lock.acquire()
+    thread = threading.Thread(target=cache.Clear)
+    thread.start()
+    thread.join(0.1)
+    self.assertEqual(1, len(cache))
+    cache._lock.release()
+    thread.join()
+    self.assertEqual(0, len(cache))
+
+
+if __name__ == '__main__':
+  graphy_test.main()